@@ -5,6 +5,8 @@ import StatusPanel from './components/StatusPanel'
 import WorldMap, { INITIAL_COUNTRY_TO_FACTION } from './components/WorldMap'
 import FactionSelector from './components/FactionSelector'
 import RandomEventModal from './components/RandomEventModal'
+import { getGameId } from './gameId'
+import { streamTurn } from './turnStream'
 import './App.css'
 
 function App() {
@@ -43,7 +45,8 @@ function App() {
         if (session.gameStarted) {
           setGameStarted(true)
           setPlayerFaction(session.playerFaction)
-          setMessages(session.messages || [])
+          // A turn still streaming when the page was left never finished
+          setMessages((session.messages || []).filter(m => !m.streaming))
           setGameState(session.gameState)
           setRelationships(session.relationships || {})
           setTerritories(session.territories || INITIAL_COUNTRY_TO_FACTION)
@@ -112,7 +115,8 @@ function App() {
       const response = await axios.post('/api/briefing', {
         faction: faction.id,
         factionName: faction.name,
-        model: selectedModel
+        model: selectedModel,
+        game_id: getGameId()
       })
 
       const { narrative, stats, relationships: initialRelationships } = response.data
@@ -172,15 +176,37 @@ function App() {
     // Small delay to ensure "Processing..." indicator renders
     await new Promise(resolve => setTimeout(resolve, 100))
 
+    // The narrative is shown as it streams in, on a live line that the
+    // final result replaces
+    let streamedText = ''
+    const showStreamed = (text) => {
+      streamedText += text
+      setMessages(prev => {
+        const last = prev[prev.length - 1]
+        if (last?.streaming) {
+          return [...prev.slice(0, -1), { ...last, text: streamedText }]
+        }
+        return [...prev, { type: 'system', text: '' }, { type: 'system', text: streamedText, streaming: true }]
+      })
+    }
+    const clearStreamed = () => {
+      // Drop the live line and the spacer added with it
+      setMessages(prev => {
+        const index = prev.findIndex(m => m.streaming)
+        return index === -1 ? prev : prev.slice(0, index - 1)
+      })
+    }
+
     try {
-      const response = await axios.post('/api/turn', {
+      const data = await streamTurn({
         input: userInput,
-        history: messages,
         model: selectedModel,
-        faction: playerFaction?.id || 'usa' // Fallback to usa if not set
-      })
+        faction: playerFaction?.id || 'usa', // Fallback to usa if not set
+        game_id: getGameId()
+      }, { onNarrative: showStreamed })
+      clearStreamed()
 
-      const { narrative, stats, event, relationships: updatedRelationships } = response.data
+      const { narrative, stats, event, relationships: updatedRelationships } = data
 
       // Store event for WorldMap
       if (event && event.triggered) {
@@ -193,21 +219,21 @@ function App() {
       }
 
       // Update territories (Full sync prefers current_territories)
-      if (response.data.current_territories) {
-        setTerritories(response.data.current_territories)
-      } else if (response.data.territory_updates) {
+      if (data.current_territories) {
+        setTerritories(data.current_territories)
+      } else if (data.territory_updates) {
         setTerritories(prev => ({
           ...prev,
-          ...response.data.territory_updates
+          ...data.territory_updates
         }))
       }
 
       // Update military data for hover info
-      if (response.data.military_data) {
-        setMilitaryData(response.data.military_data)
+      if (data.military_data) {
+        setMilitaryData(data.military_data)
       }
-      if (response.data.intel_strength) {
-        setIntelStrength(response.data.intel_strength)
+      if (data.intel_strength) {
+        setIntelStrength(data.intel_strength)
       }
 
       // Check if a random event was triggered
@@ -250,6 +276,7 @@ function App() {
       }
     } catch (error) {
       console.error('Error processing turn:', error)
+      clearStreamed()
       setMessages(prev => [...prev,
       { type: 'system', text: 'ERROR: Communication with command center failed.' }
       ])
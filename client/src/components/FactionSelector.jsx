@@ -163,7 +163,8 @@ function FactionSelector({ onSelectFaction, isProcessing, availableModels = [],
                                 setIsResetting(true)
                                 try {
                                     const axios = (await import('axios')).default
-                                    await axios.post('/api/reset')
+                                    const { getGameId } = await import('../gameId')
+                                    await axios.post('/api/reset', { game_id: getGameId() })
                                     sessionStorage.removeItem('gameSession')
 
                                     // Show success notification
@@ -0,0 +1,12 @@
+// Server-side game this browser plays in. Kept in localStorage so the same
+// world survives reloads, like the single shared save file did before.
+export function getGameId() {
+  let gameId = localStorage.getItem('gameId')
+  if (!gameId) {
+    gameId = window.crypto?.randomUUID
+      ? window.crypto.randomUUID()
+      : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`
+    localStorage.setItem('gameId', gameId)
+  }
+  return gameId
+}
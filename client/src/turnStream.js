@@ -0,0 +1,48 @@
+// Client for POST /api/turn/stream (Server-Sent Events). onNarrative gets
+// each piece of narrative text as the model writes it; the promise resolves
+// with the `result` payload (same shape as /api/turn) and rejects on an
+// `error` event or a stream that ends without a result.
+export async function streamTurn(body, { onNarrative } = {}) {
+  const response = await fetch('/api/turn/stream', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body)
+  })
+  if (!response.ok || !response.body) {
+    throw new Error(`Turn request failed with status ${response.status}`)
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  for (;;) {
+    const { value, done } = await reader.read()
+    buffer += decoder.decode(value, { stream: !done })
+    let boundary
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const { event, data } = parseEvent(buffer.slice(0, boundary))
+      buffer = buffer.slice(boundary + 2)
+      if (event === 'narrative') {
+        onNarrative?.(data.text)
+      } else if (event === 'result') {
+        reader.cancel()
+        return data
+      } else if (event === 'error') {
+        reader.cancel()
+        throw new Error(data.detail)
+      }
+    }
+    if (done) break
+  }
+  throw new Error('Turn stream ended without a result')
+}
+
+function parseEvent(block) {
+  let event = 'message'
+  const data = []
+  for (const line of block.split('\n')) {
+    if (line.startsWith('event:')) event = line.slice(6).trim()
+    else if (line.startsWith('data:')) data.push(line.slice(5).trimStart())
+  }
+  return { event, data: data.length ? JSON.parse(data.join('\n')) : null }
+}
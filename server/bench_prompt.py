@@ -0,0 +1,72 @@
+"""
+Benchmark the military data representations sent to the LLM.
+
+Compares the estimated token count of the verbose military string with the
+compact columnar table (exact, rounded, and focused on one faction). With
+--live it also sends the same forces question through Ollama with each
+representation and reports prompt eval / generation latency.
+
+Usage: python bench_prompt.py [--live] [model]
+"""
+import asyncio
+import sys
+import time
+
+from game_state import GameState
+from llm_client import OllamaClient
+from prompt_builder import estimate_tokens
+from prompts import get_static_system_prompt, get_dynamic_state_prompt
+
+QUESTION = "What are Russia's forces?"
+
+
+def representations(gs):
+    return {
+        "verbose": gs.get_military_state_string(),
+        "compact": gs.get_military_table_string(),
+        "compact_3sf": gs.get_military_table_string(sig_figs=3),
+        "compact_focus": gs.get_military_table_string(focus_factions=["usa", "russia"]),
+    }
+
+
+async def live(reps, state, model):
+    client = OllamaClient()
+    try:
+        for name, military_str in reps.items():
+            messages = [
+                {"role": "system", "content": get_static_system_prompt()},
+                {"role": "system", "content": get_dynamic_state_prompt("usa", state, military_str, 90)},
+                {"role": "user", "content": QUESTION},
+            ]
+            start = time.perf_counter()
+            data = await client.chat(model, messages, options={"num_ctx": 16384})
+            elapsed = time.perf_counter() - start
+            print(f"{name:<15} total {elapsed:6.2f}s | prompt eval {data.get('prompt_eval_count', '?')} tok "
+                  f"{data.get('prompt_eval_duration', 0) / 1e9:.2f}s | generated {data.get('eval_count', '?')} tok "
+                  f"{data.get('eval_duration', 0) / 1e9:.2f}s")
+    finally:
+        await client.close()
+
+
+def main():
+    gs = GameState()
+    state = gs.initialize_default_state()
+    gs.state = state
+    reps = representations(gs)
+
+    baseline = estimate_tokens(reps["verbose"])
+    print(f"{'Representation':<15} {'Chars':>8} {'~Tokens':>8} {'vs verbose':>11}")
+    print("-" * 45)
+    for name, text in reps.items():
+        tokens = estimate_tokens(text)
+        print(f"{name:<15} {len(text):>8} {tokens:>8} {tokens / baseline:>10.0%}")
+
+    if "--live" in sys.argv:
+        args = [a for a in sys.argv[1:] if a != "--live"]
+        model = args[0] if args else "example:latest"
+        print(f"\nLive generation latency ({model}, question: {QUESTION!r})")
+        asyncio.run(live(reps, state, model))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Pool of pre-generated opening briefings.
+
+get_briefing_prompt() only depends on the faction and the model, not on any
+game state, so briefings can be written before a player picks a faction.
+BriefingPool keeps up to BRIEFING_POOL_SIZE of them per (faction, model),
+generated one at a time in the background. take() hands one out and starts
+writing its replacement, so a new game starts instantly and two games in a
+row still get different briefings.
+"""
+import asyncio
+import collections
+
+import metrics
+
+# Briefings kept ready per (faction, model)
+BRIEFING_POOL_SIZE = 2
+
+
+class BriefingPool:
+    def __init__(self, generate, size=BRIEFING_POOL_SIZE):
+        """
+        generate: coroutine function (faction_id, faction_name, model) ->
+        briefing dict, or None if the model's output was unusable
+        """
+        self.generate = generate
+        self.size = size
+        self.pools = collections.defaultdict(collections.deque)
+        # Generations in flight per (faction, model, name)
+        self.pending = collections.Counter()
+        # Faction name each pool was written for (it appears in the text)
+        self.names = {}
+        self.tasks = set()
+        self._lock = None
+
+    def fill(self, faction_id, faction_name, model):
+        """Start background generations until (faction, model) has `size` briefings. Returns how many."""
+        key = (faction_id, model)
+        if self.names.get(key) != faction_name:
+            self.pools[key].clear()
+            self.names[key] = faction_name
+        missing = self.size - len(self.pools[key]) - self.pending[key + (faction_name,)]
+        for _ in range(max(0, missing)):
+            self.pending[key + (faction_name,)] += 1
+            task = asyncio.ensure_future(self._fill_one(key, faction_name))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        return max(0, missing)
+
+    def refill(self):
+        """fill() every (faction, model) seen so far"""
+        return sum(self.fill(faction_id, name, model) for (faction_id, model), name in list(self.names.items()))
+
+    async def _fill_one(self, key, faction_name):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        briefing = None
+        try:
+            # One at a time: pre-generation shouldn't crowd out players' turns
+            async with self._lock:
+                briefing = await self.generate(key[0], faction_name, key[1])
+        except Exception as e:
+            print(f"Warning: Briefing pre-generation failed for {key[0]} ({key[1]}): {e}")
+        finally:
+            self.pending[key + (faction_name,)] -= 1
+        # Drop it if the pool was re-targeted at another name meanwhile
+        if briefing is not None and self.names.get(key) == faction_name:
+            self.pools[key].append(briefing)
+            metrics.incr("briefings_pregenerated")
+
+    def take(self, faction_id, faction_name, model):
+        """A ready briefing for (faction, model), or None; either way the pool is topped up"""
+        key = (faction_id, model)
+        pool = self.pools[key] if self.names.get(key) == faction_name else ()
+        briefing = pool.popleft() if pool else None
+        metrics.incr("briefing_pool_hits" if briefing is not None else "briefing_pool_misses")
+        self.fill(faction_id, faction_name, model)
+        return briefing
+
+    def cancel(self):
+        for task in list(self.tasks):
+            task.cancel()
@@ -0,0 +1,264 @@
+"""
+Deterministic combat and logistics resolver.
+
+parse_action() turns a player order ("attack Kazakhstan from Russia with
+50k troops", "move 20,000 troops from the US to South Korea") into an
+action intent; resolve_action() computes its outcome from state['military']
+and state['ownership']: casualties, troop and transport-ship transfers and
+territory changes, as military_updates/territory_updates deltas in the same
+shape the LLM used to produce. Randomness comes from a seeded RNG, so the
+same order on the same turn of the same game always has the same outcome.
+The model is only asked to narrate the result.
+"""
+import math
+import random
+import re
+
+from entity_matcher import match_entities
+from prompts import COUNTRY_NAMES, INITIAL_WORLD_STATE
+
+FORCE_KEYS = ("troops", "navy", "airforce")
+
+# Combat power per unit, in troop equivalents
+NAVY_POWER = 500
+AIR_POWER = 300
+# Defenders fight from prepared positions
+DEFENDER_BONUS = 1.3
+# Share of forces lost by the loser / the winner (from the old prompt rules)
+LOSER_LOSSES = (0.20, 0.40)
+WINNER_LOSSES = (0.05, 0.15)
+
+# Share of the origin's troops committed when the order names no number
+ATTACK_COMMIT_SHARE = 0.5
+MOVE_COMMIT_SHARE = 0.25
+
+# Crossing an ocean needs naval transport: one ship per this many troops
+TROOPS_PER_SHIP = 2000
+
+# Countries reachable over land from each other share a landmass; anything
+# not listed is on the Afro-Eurasian landmass
+AMERICAS = "US CA MX GT BZ SV HN NI CR PA CO VE GY SR GF EC PE BO BR PY UY AR CL"
+ISLANDS = "GB IE IS GL JP TW PH ID AU NZ CU JM PR TT LK MG CY MT BH BN TL"
+LANDMASS = {code: "americas" for code in AMERICAS.split()}
+LANDMASS.update({code: code for code in ISLANDS.split()})
+LANDMASS.update({"DO": "hispaniola", "HT": "hispaniola"})
+
+ATTACK_WORDS = re.compile(r"\b(attack|invade|invasion|assault|strike|seize|conquer|occupy|capture|storm)\b", re.I)
+# Operations that aren't a conventional assault stay with the LLM
+NON_KINETIC_WORDS = re.compile(r"\b(cyber|hack|sabotage|propaganda|covert|spy|nuclear|nuke|missiles?|drones?|sanctions?)\b", re.I)
+# Diplomacy and trade ("strike a trade deal", "send an envoy") never move troops
+DIPLOMATIC_WORDS = re.compile(r"\b(deals?|trade|talks|treaty|negotiat\w*|peace|ceasefire|envoys?|ambassadors?|"
+                              r"embassy|aid|summit|alliance|pact|agreement|diplomat\w*)\b", re.I)
+# The attack verb's object: what follows it up to the next clause
+ATTACK_OBJECT = re.compile(ATTACK_WORDS.pattern + r"\s+(?:on\s+|against\s+|of\s+|into\s+)?(.*?)"
+                           r"(?=\b(?:from|with|using|and|by|to)\b|$)", re.I)
+MOVE_WORDS = re.compile(r"\b(move|deploy|send|transfer|station|redeploy|reinforce|relocate)\b", re.I)
+ORIGIN_CLAUSE = re.compile(r"\bfrom\b(.*?)(?=\b(?:to|into|with|using|and)\b|$)", re.I)
+AMOUNT = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*(k|thousand|m|million)?\b\s*([a-z]+)?", re.I)
+AMOUNT_SCALE = {"k": 1_000, "thousand": 1_000, "m": 1_000_000, "million": 1_000_000}
+TROOP_UNITS = {"troops", "soldiers", "men"}
+# A number followed by one of these counts something other than troops
+OTHER_UNITS = {"jets", "planes", "aircraft", "fighters", "bombers", "ships", "warships", "vessels",
+               "carriers", "submarines", "subs", "tanks", "drones", "missiles", "helicopters"}
+
+
+def _name(code):
+    return COUNTRY_NAMES.get(code, code)
+
+
+def is_overseas(origin, target):
+    """True if moving between the two countries needs naval transport"""
+    return LANDMASS.get(origin, "afro_eurasia") != LANDMASS.get(target, "afro_eurasia")
+
+
+def parse_amount(text):
+    """Troop count named in the order, or None ("100 jets" is not a troop count)"""
+    for number, scale, unit in AMOUNT.findall(text):
+        unit = unit.lower()
+        if unit in OTHER_UNITS:
+            continue
+        value = float(number.replace(",", ""))
+        if scale:
+            value *= AMOUNT_SCALE[scale.lower()]
+        if scale or unit in TROOP_UNITS or value >= 100:
+            return int(value)
+    return None
+
+
+def parse_action(text, player_faction, state):
+    """
+    Action intent for a military order, or None if the order isn't a
+    single clear attack/move (the LLM then handles it as before):
+    {"type": "attack"|"move", "origin": code, "target": code, "troops": int|None}
+    """
+    if NON_KINETIC_WORDS.search(text) or DIPLOMATIC_WORDS.search(text):
+        return None
+    if ATTACK_WORDS.search(text):
+        kind = "attack"
+    elif MOVE_WORDS.search(text):
+        kind = "move"
+    else:
+        return None
+
+    ownership = state.get("ownership", {})
+    military = state.get("military", {})
+
+    def owner(code):
+        return ownership.get(code, INITIAL_WORLD_STATE.get(code, "neutral"))
+
+    origin_match = ORIGIN_CLAUSE.search(text)
+    origins = match_entities(origin_match.group(1))["countries"] if origin_match else set()
+    targets = match_entities(text)["countries"] - origins
+    if len(targets) != 1 or len(origins) > 1:
+        return None
+    target = targets.pop()
+
+    if origins:
+        origin = origins.pop()
+        if owner(origin) != player_faction:
+            return None
+    else:
+        # No origin named: the player's strongest country leads
+        own = [c for c in military if owner(c) == player_faction and c != target]
+        if not own:
+            return None
+        origin = max(own, key=lambda c: military[c].get("troops", 0))
+
+    if kind == "attack":
+        # The target must be what the attack verb acts on ("invade Kazakhstan",
+        # "launch an attack on Kazakhstan"), not just a country named somewhere
+        objects = set()
+        for match in ATTACK_OBJECT.finditer(text):
+            objects |= match_entities(match.group(2))["countries"]
+        if target not in objects or owner(target) == player_faction:
+            return None
+    if kind == "move" and owner(target) != player_faction:
+        return None
+    return {"type": kind, "origin": origin, "target": target, "troops": parse_amount(text)}
+
+
+def _power(forces):
+    return forces["troops"] + forces["navy"] * NAVY_POWER + forces["airforce"] * AIR_POWER
+
+
+def _losses(forces, share, enemy_power):
+    """
+    Losses of `forces` at the given share, scaled down when the enemy is
+    weaker: 100 troops can't destroy 15% of a 500,000-strong army.
+    """
+    share *= min(1.0, enemy_power / max(_power(forces), 1))
+    return {k: int(round(forces[k] * share)) for k in FORCE_KEYS}
+
+
+def _add(updates, code, sign, forces):
+    row = updates.setdefault(code, {k: 0 for k in FORCE_KEYS})
+    for k in FORCE_KEYS:
+        row[k] += sign * forces[k]
+
+
+def _describe(forces):
+    return f"{forces['troops']:,} troops, {forces['navy']:,} ships and {forces['airforce']:,} jets"
+
+
+def _commit(action, military, default_share):
+    """
+    Forces leaving the origin, capped by what it has and, overseas, by its
+    transport capacity. Returns (committed forces, blocking reason or None).
+    """
+    origin = military.get(action["origin"], {})
+    available = {k: origin.get(k, 0) for k in FORCE_KEYS}
+    troops = action["troops"] or int(available["troops"] * default_share)
+    troops = min(troops, available["troops"])
+    overseas = is_overseas(action["origin"], action["target"])
+    if overseas:
+        troops = min(troops, available["navy"] * TROOPS_PER_SHIP)
+    if troops <= 0:
+        if overseas and available["troops"]:
+            return None, f"{_name(action['origin'])} has no naval transports to carry troops overseas"
+        return None, f"{_name(action['origin'])} has no troops available"
+
+    share = troops / available["troops"]
+    ships = math.ceil(troops / TROOPS_PER_SHIP) if overseas else 0
+    return {
+        "troops": troops,
+        "navy": min(available["navy"], max(ships, int(available["navy"] * share))),
+        "airforce": int(available["airforce"] * share)
+    }, None
+
+
+def resolve_action(action, state, player_faction, seed):
+    """
+    Outcome of a parsed action:
+    {"action", "success", "military_updates", "territory_updates", "summary"}
+    """
+    military = state.get("military", {})
+    ownership = state.get("ownership", {})
+    origin, target = action["origin"], action["target"]
+    rng = random.Random(f"{seed}:{action['type']}:{origin}:{target}:{action['troops']}")
+    updates = {}
+    territory = {}
+
+    default_share = ATTACK_COMMIT_SHARE if action["type"] == "attack" else MOVE_COMMIT_SHARE
+    committed, blocked = _commit(action, military, default_share)
+    if blocked:
+        summary = f"The order cannot be carried out: {blocked}. No forces moved."
+        return {"action": action, "success": False, "military_updates": {},
+                "territory_updates": {}, "summary": summary}
+
+    if action["type"] == "move":
+        _add(updates, origin, -1, committed)
+        _add(updates, target, 1, committed)
+        summary = f"{_describe(committed)} redeployed from {_name(origin)} to {_name(target)} without incident."
+        return {"action": action, "success": True, "military_updates": updates,
+                "territory_updates": territory, "summary": summary}
+
+    defender = {k: military.get(target, {}).get(k, 0) for k in FORCE_KEYS}
+    attack = _power(committed)
+    defense = _power(defender) * DEFENDER_BONUS
+    # Lanchester-style odds: a 2:1 edge wins 80% of the time
+    win_chance = attack ** 2 / (attack ** 2 + defense ** 2) if defense else 1.0
+    success = rng.random() < win_chance
+    odds = f"{attack / defense:.1f}:1" if defense else "unopposed"
+
+    if success:
+        attacker_lost = _losses(committed, rng.uniform(*WINNER_LOSSES), defense)
+        defender_lost = _losses(defender, rng.uniform(*LOSER_LOSSES), attack)
+        survivors = {k: committed[k] - attacker_lost[k] for k in FORCE_KEYS}
+        # The invading force garrisons the country; the remaining defenders surrender
+        _add(updates, origin, -1, committed)
+        _add(updates, target, -1, defender)
+        _add(updates, target, 1, survivors)
+        territory[target] = player_faction
+        result = f"VICTORY. {_name(target)} falls and is now controlled by [{player_faction.upper()}]; the remaining defenders surrender."
+    else:
+        attacker_lost = _losses(committed, rng.uniform(*LOSER_LOSSES), defense)
+        defender_lost = _losses(defender, rng.uniform(*WINNER_LOSSES), attack)
+        # Survivors fall back to where they came from
+        _add(updates, origin, -1, attacker_lost)
+        _add(updates, target, -1, defender_lost)
+        result = f"DEFEAT. The assault is repulsed and {_name(target)} stays under [{ownership.get(target, 'neutral').upper()}] control."
+
+    summary = (
+        f"{_name(origin)} attacked {_name(target)} with {_describe(committed)} "
+        f"(attack-to-defense strength {odds}). {result} "
+        f"Attacker losses: {_describe(attacker_lost)}. Defender losses: {_describe(defender_lost)}."
+    )
+    return {"action": action, "success": success, "military_updates": updates,
+            "territory_updates": territory, "summary": summary}
+
+
+def resolve_order(text, player_faction, state, seed):
+    """parse_action() + resolve_action(), or None if the order wasn't understood"""
+    action = parse_action(text, player_faction, state)
+    if action is None:
+        return None
+    return resolve_action(action, state, player_faction, seed)
+
+
+def combat_directive(outcome):
+    """Prompt directive telling the model to narrate the computed outcome"""
+    return (
+        "COMBAT RESOLUTION (already computed by the war engine and applied to the game state): "
+        f"{outcome['summary']} Narrate exactly this outcome with these numbers. "
+        "Do NOT output military_updates or territory_updates for this action."
+    )
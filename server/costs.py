@@ -0,0 +1,99 @@
+"""
+Action cost table and affordability check.
+
+The server works out what an order costs and whether the player can pay for
+it before the LLM call, instead of the model doing that arithmetic in a
+`reasoning` field. The verdict goes into the prompt as one line, and
+apply_turn enforces it: an affordable action is charged exactly its listed
+cost, an unaffordable one changes nothing.
+"""
+import re
+
+from intent_classifier import DIPLOMATIC, MILITARY, OTHER
+
+# Resource names as the model and frontend use them -> state keys
+RESOURCE_KEYS = {"budget": "resources", "oil": "oil", "tech": "tech", "influence": "influence"}
+
+# (category, label, cost, pattern); the first matching category applies
+ACTION_COSTS = (
+    ("nuclear", "Nuclear operation", {"tech": 50, "oil": 20},
+     re.compile(r"\b(nuke|nuclear|warheads?|icbm)\b")),
+    ("cyber", "Cyber operation", {"tech": 20},
+     re.compile(r"\b(cyber|hack|malware|virus|ddos|infiltrate (their )?networks?)\b")),
+    ("espionage", "Intelligence operation", {"tech": 10, "budget": 50},
+     re.compile(r"\b(spy|spies|espionage|covert|sabotage|intel(ligence)? (op|operation|network))\b")),
+    ("attack", "Military offensive", {"oil": 30, "budget": 50},
+     re.compile(r"\b(attack|invade|invasion|assault|strike|airstrikes?|bomb|seize|conquer|occupy|blockade|offensive)\b")),
+    ("deployment", "Troop deployment", {"oil": 10},
+     re.compile(r"\b(move|deploy|send|transfer|station|redeploy|reinforce|relocate|mobili[sz]e)\b")),
+    ("research", "Research program", {"budget": 100, "tech": 5},
+     re.compile(r"\b(research|develop|r&d|laboratory|prototype|innovation)\b")),
+    ("infrastructure", "Infrastructure project", {"budget": 100},
+     re.compile(r"\b(build|construct|infrastructure|invest|upgrade|expand|fund)\b")),
+    ("diplomacy", "Diplomatic initiative", {"budget": 30},
+     re.compile(r"\b(negotiate|treaty|alliance|summit|envoy|ambassador|embassy|trade deal|pact|aid|sanctions?|embargo)\b")),
+)
+
+# Only orders are charged; questions and data queries are free
+COSTED_INTENTS = (MILITARY, DIPLOMATIC, OTHER)
+
+# Categories tried first for an intent label, so a diplomatic order with a
+# movement verb ("send an envoy", "move our embassy") is priced as diplomacy
+PREFERRED_CATEGORIES = {DIPLOMATIC: ("diplomacy",)}
+
+
+def _format(resource, amount):
+    return f"${amount:,}" if resource == "budget" else f"{amount:,} {resource.capitalize()}"
+
+
+def check_cost(text, intent, state):
+    """
+    Cost and affordability of an order, or None if it costs nothing:
+    {"category", "label", "cost": {resource: amount}, "affordable",
+     "shortfall": {resource: missing amount}, "verdict": one-line prompt text}
+    """
+    if intent["label"] not in COSTED_INTENTS:
+        return None
+    lowered = text.lower()
+    preferred = PREFERRED_CATEGORIES.get(intent["label"], ())
+    for category, label, cost, pattern in sorted(ACTION_COSTS, key=lambda c: c[0] not in preferred):
+        if pattern.search(lowered):
+            break
+    else:
+        return None
+
+    shortfall = {}
+    for resource, amount in cost.items():
+        available = state.get(RESOURCE_KEYS[resource], 0)
+        if available < amount:
+            shortfall[resource] = amount - available
+
+    price = ", ".join(_format(r, a) for r, a in cost.items())
+    if shortfall:
+        missing = ", ".join(_format(r, a) for r, a in shortfall.items())
+        verdict = (f"COST CHECK: {label} costs {price}. NOT AFFORDABLE (short by {missing}). "
+                   f"REJECT the action: narrate why it is cancelled and change nothing.")
+    else:
+        deltas = ", ".join(f"{r}: -{a}" for r, a in cost.items())
+        verdict = (f"COST CHECK: {label} costs {price}. AFFORDABLE. "
+                   f"Use exactly these resource_updates ({deltas}) and mention the cost in the narrative.")
+    return {"category": category, "label": label, "cost": cost,
+            "affordable": not shortfall, "shortfall": shortfall, "verdict": verdict}
+
+
+def enforce_cost(game_response, cost_check):
+    """
+    Make a parsed response match the verdict: charge the listed cost, or for
+    a rejected action drop every cost and military/territory change.
+    """
+    updates = game_response.setdefault("resource_updates", {})
+    if cost_check["affordable"]:
+        for resource, amount in cost_check["cost"].items():
+            updates[resource] = -amount
+        return game_response
+    for resource in RESOURCE_KEYS:
+        if updates.get(resource, 0) < 0:
+            updates[resource] = 0
+    game_response.pop("military_updates", None)
+    game_response.pop("territory_updates", None)
+    return game_response
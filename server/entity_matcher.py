@@ -0,0 +1,191 @@
+"""
+Fast country/faction entity matcher for player input.
+
+Country names, common aliases/demonyms and faction names are compiled once
+into an Aho-Corasick automaton, so matching is a single pass over the input
+regardless of how many names exist. Upper-case ISO codes ("KZ", "IR") are
+matched separately, case-sensitively, so words like "in" or "it" are not
+mistaken for countries.
+"""
+import re
+from collections import deque
+
+from prompts import COUNTRY_NAMES, FACTIONS, INITIAL_WORLD_STATE
+
+# Extra names players commonly use: alias -> country code
+COUNTRY_ALIASES = {
+    'america': 'US', 'american': 'US', 'americans': 'US', 'the states': 'US', 'united states of america': 'US',
+    'russian': 'RU', 'russians': 'RU', 'russian federation': 'RU',
+    'chinese': 'CN', 'prc': 'CN',
+    'britain': 'GB', 'great britain': 'GB', 'british': 'GB', 'uk': 'GB', 'england': 'GB',
+    'indian': 'IN', 'iranian': 'IR', 'iranians': 'IR', 'iraqi': 'IQ', 'israeli': 'IL',
+    'ukrainian': 'UA', 'kazakh': 'KZ', 'japanese': 'JP', 'german': 'DE', 'germans': 'DE',
+    'french': 'FR', 'italian': 'IT', 'spanish': 'ES', 'polish': 'PL', 'turkish': 'TR',
+    'türkiye': 'TR', 'turkiye': 'TR', 'syrian': 'SY', 'saudi': 'SA', 'egyptian': 'EG',
+    'pakistani': 'PK', 'afghan': 'AF', 'canadian': 'CA', 'mexican': 'MX', 'brazilian': 'BR',
+    'venezuelan': 'VE', 'cuban': 'CU', 'taiwanese': 'TW', 'vietnamese': 'VN',
+    'north korean': 'KP', 'dprk': 'KP', 'south korean': 'KR', 'korea': 'KR',
+    'drc': 'CD', 'congo': 'CG', 'uae': 'AE', 'emirates': 'AE', 'burma': 'MM',
+    'holland': 'NL', 'dutch': 'NL', 'swiss': 'CH', 'swedish': 'SE', 'norwegian': 'NO',
+    'finnish': 'FI', 'greek': 'GR', 'serbian': 'RS', 'belarusian': 'BY', 'georgian': 'GE',
+}
+
+# Extra names players commonly use: alias -> faction id
+FACTION_ALIASES = {
+    'usa': 'usa', 'nato': 'usa', 'north american alliance': 'usa',
+    'china': 'china', 'tianxia': 'china', "people's republic of china": 'china',
+    'russia': 'russia', 'soviet': 'russia', 'soviets': 'russia', 'russian federation': 'russia',
+    'eu': 'eu', 'european union': 'eu', 'europe': 'eu', 'european': 'eu', 'europeans': 'eu',
+    'india': 'india', 'republic of india': 'india',
+    'corporate': 'corporate', 'corporations': 'corporate', 'corporate council': 'corporate',
+    'mega-corporation coalition': 'corporate', 'megacorps': 'corporate',
+    'rogue ai': 'rogue', 'rogue': 'rogue', 'rogue ai collective': 'rogue',
+    'neutral': 'neutral', 'non-aligned': 'neutral', 'unaligned': 'neutral',
+}
+
+ISO_CODE_PATTERN = re.compile(r"\b[A-Z]{2}\b")
+
+
+class EntityMatcher:
+    def __init__(self, patterns, codes):
+        """
+        patterns: {lowercase phrase: set of ("country", code) / ("faction", id)}
+        codes: set of upper-case ISO codes recognised on their own
+        """
+        self.codes = set(codes)
+        # Aho-Corasick automaton: goto transitions, failure links, outputs
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for phrase, entities in patterns.items():
+            self._add(phrase, entities)
+        self._build_failure_links()
+
+    @classmethod
+    def from_game_data(cls):
+        patterns = {}
+
+        def add(phrase, entity):
+            patterns.setdefault(phrase.lower(), set()).add(entity)
+
+        for code, name in COUNTRY_NAMES.items():
+            add(name, ("country", code))
+        for alias, code in COUNTRY_ALIASES.items():
+            add(alias, ("country", code))
+        for faction_id, info in FACTIONS.items():
+            add(info['name'], ("faction", faction_id))
+        for alias, faction_id in FACTION_ALIASES.items():
+            add(alias, ("faction", faction_id))
+
+        return cls(patterns, set(COUNTRY_NAMES) | set(INITIAL_WORLD_STATE))
+
+    def _add(self, phrase, entities):
+        node = 0
+        for ch in phrase:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(phrase), frozenset(entities)))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                if self._fail[nxt] == nxt:
+                    self._fail[nxt] = 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _phrases(self, lowered):
+        """Non-overlapping (start, end, entities) name matches in lowered text"""
+        hits = []
+        node = 0
+        for i, ch in enumerate(lowered):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for length, entities in self._out[node]:
+                start = i - length + 1
+                # Whole words only ("oman" must not match inside "romania")
+                if start > 0 and lowered[start - 1].isalnum():
+                    continue
+                if i + 1 < len(lowered) and lowered[i + 1].isalnum():
+                    continue
+                hits.append((start, i + 1, entities))
+
+        # Keep the longest phrase when matches overlap ("north korea" beats "korea")
+        hits.sort(key=lambda h: (h[0], -(h[1] - h[0])))
+        phrases = []
+        covered_until = -1
+        for start, end, entities in hits:
+            if end <= covered_until:
+                continue
+            covered_until = max(covered_until, end)
+            phrases.append((start, end, entities))
+        return phrases
+
+    def match(self, text):
+        """Return {"countries": set of codes, "factions": set of faction ids}"""
+        countries = set()
+        factions = set()
+        for _, _, entities in self._phrases(text.lower()):
+            for kind, value in entities:
+                (countries if kind == "country" else factions).add(value)
+
+        for code in ISO_CODE_PATTERN.findall(text):
+            if code in self.codes:
+                countries.add(code)
+
+        return {"countries": countries, "factions": factions}
+
+    def strip(self, text):
+        """Lowercased text with every matched country/faction name blanked out"""
+        codes = ISO_CODE_PATTERN.sub(lambda m: " " if m.group() in self.codes else m.group(), text)
+        lowered = codes.lower()
+        for start, end, _ in reversed(self._phrases(lowered)):
+            lowered = lowered[:start] + " " + lowered[end:]
+        return lowered
+
+
+DEFAULT_MATCHER = EntityMatcher.from_game_data()
+
+
+def match_entities(text):
+    """Match countries and factions mentioned in text using the default matcher"""
+    return DEFAULT_MATCHER.match(text)
+
+
+def strip_entities(text):
+    """text without the country and faction names the default matcher finds"""
+    return DEFAULT_MATCHER.strip(text)
+
+
+def get_relevant_entities(texts, player_faction, ownership):
+    """
+    Countries and factions implicated by the given texts: every mentioned
+    country, its current owner, every mentioned faction and the player's own.
+    The neutral bloc is not a real alliance, so mentioning a neutral country
+    does not pull in every other neutral country.
+    Returns (focus_factions, focus_countries).
+    """
+    focus_countries = set()
+    focus_factions = {player_faction}
+    for text in texts:
+        found = match_entities(text)
+        focus_countries |= found["countries"]
+        focus_factions |= found["factions"]
+    for code in focus_countries:
+        owner = ownership.get(code, INITIAL_WORLD_STATE.get(code, 'neutral'))
+        if owner != 'neutral':
+            focus_factions.add(owner)
+    return focus_factions, focus_countries
@@ -0,0 +1,243 @@
+"""
+Event director: decides when a random world event fires and which one.
+
+Events come from a data-driven template library (crises, resource shocks,
+diplomatic incidents, breakthroughs, cyber attacks). A template is
+instantiated for a concrete country, picked by its scope (the player's own
+territory, a rival's, or anywhere it makes sense), and its numeric impact
+scales with DEFCON. Everything is drawn from an RNG seeded with the game id
+and turn, so a given game replays the same events. The LLM only writes a
+short flavor narrative for the chosen event (see get_event_flavor_messages).
+
+Because the choice is deterministic, the event the next turn will fire is
+known as soon as a turn has been applied. EventSlot holds that event's
+narrative, generated in the background while the player reads, for as long
+as the state it was predicted from is unchanged.
+"""
+import asyncio
+import random
+
+import metrics
+from prompts import COUNTRY_NAMES, FACTIONS, INITIAL_WORLD_STATE
+
+# Turns since the last event before one may fire, and the chance per extra turn
+EVENT_MIN_GAP = 4
+EVENT_CHANCE_PER_TURN = 25  # percent: 75% at 4 turns, 100% at 5
+
+MAJOR_FACTIONS = ("usa", "china", "russia", "eu", "india")
+
+# Countries a template can be set in (None: any country in its scope)
+QUAKE_ZONES = "JP TW TR IR CL PE MX ID PH NP IT GR NZ PK AF CN"
+STORM_ZONES = "US MX CU DO HT JM PH BD IN MM VN CN JP TW MZ MG"
+OIL_PRODUCERS = "SA IQ IR KW AE QA OM VE NG RU LY DZ KZ AO NO CA US"
+TECH_HUBS = "US CN JP KR TW DE GB FR IN IL SG SE FI NL"
+
+# scope: "own" (a player country), "rival" (a major rival's country), "any"
+# impact: resource -> (min, max) before DEFCON scaling
+# defcon: (lowest, highest) DEFCON at which the template can appear
+EVENT_LIBRARY = (
+    {"id": "earthquake", "type": "CRISIS", "scope": "any", "where": QUAKE_ZONES, "weight": 3,
+     "title": "CRISIS: Earthquake in {country}",
+     "description": "A magnitude {magnitude} earthquake devastates {country}. Relief efforts strain budgets across the {faction_name}.",
+     "impact": {"budget": (-150, -60), "influence": (-4, -1)}},
+    {"id": "superstorm", "type": "CRISIS", "scope": "any", "where": STORM_ZONES, "weight": 2,
+     "title": "CRISIS: Superstorm Hits {country}",
+     "description": "A category 5 superstorm makes landfall in {country}, crippling ports and power grids.",
+     "impact": {"budget": (-120, -50), "oil": (-20, -5)}},
+    {"id": "pandemic", "type": "CRISIS", "scope": "any", "where": None, "weight": 2,
+     "title": "CRISIS: Outbreak in {country}",
+     "description": "A fast-spreading respiratory virus emerges in {country}. Borders close and markets panic.",
+     "impact": {"budget": (-180, -80), "influence": (-5, -2)}},
+    {"id": "terror_attack", "type": "CRISIS", "scope": "own", "where": None, "weight": 2, "defcon": (1, 4),
+     "title": "CRISIS: Coordinated Attacks in {country}",
+     "description": "Coordinated attacks strike infrastructure in {country}. Your security services scramble to respond.",
+     "impact": {"budget": (-100, -40), "influence": (-6, -2)}},
+    {"id": "pipeline_failure", "type": "RESOURCE_SHOCK", "scope": "any", "where": OIL_PRODUCERS, "weight": 3,
+     "title": "RESOURCE_SHOCK: Pipeline Rupture in {country}",
+     "description": "A major pipeline in {country} ruptures. Global crude supplies tighten overnight.",
+     "impact": {"oil": (-40, -15), "budget": (-60, -20)}},
+    {"id": "oil_embargo", "type": "RESOURCE_SHOCK", "scope": "rival", "where": OIL_PRODUCERS, "weight": 2, "defcon": (1, 4),
+     "title": "RESOURCE_SHOCK: {faction_name} Oil Embargo",
+     "description": "The {faction_name} halts oil exports from {country} to your bloc in a show of force.",
+     "impact": {"oil": (-60, -25), "influence": (-3, 0)}},
+    {"id": "market_crash", "type": "RESOURCE_SHOCK", "scope": "any", "where": None, "weight": 2,
+     "title": "RESOURCE_SHOCK: Markets Crash",
+     "description": "Algorithmic trading systems trigger a cascading sell-off that starts in {country} and spreads worldwide.",
+     "impact": {"budget": (-200, -80)}},
+    {"id": "spy_scandal", "type": "DIPLOMATIC", "scope": "rival", "where": None, "weight": 2,
+     "title": "DIPLOMATIC: Spy Ring Exposed in {country}",
+     "description": "The {faction_name} exposes one of your intelligence networks operating out of {country}.",
+     "impact": {"influence": (-8, -3), "tech": (-10, -3)}},
+    {"id": "summit_collapse", "type": "DIPLOMATIC", "scope": "rival", "where": None, "weight": 1, "defcon": (1, 3),
+     "title": "DIPLOMATIC: Arms Summit Collapses",
+     "description": "Arms-control talks with the {faction_name} in {country} collapse amid mutual accusations.",
+     "impact": {"influence": (-6, -2)}},
+    {"id": "border_incident", "type": "DIPLOMATIC", "scope": "rival", "where": None, "weight": 2, "defcon": (1, 4),
+     "title": "DIPLOMATIC: Border Incident Near {country}",
+     "description": "Patrols of the {faction_name} and your forces exchange fire near {country}. Both sides blame the other.",
+     "impact": {"influence": (-5, -1), "oil": (-10, -3)}},
+    {"id": "ai_breakthrough", "type": "BREAKTHROUGH", "scope": "own", "where": None, "weight": 2, "defcon": (3, 5),
+     "title": "BREAKTHROUGH: AI Research Leap in {country}",
+     "description": "Laboratories in {country} unveil a new generation of strategic AI, boosting your technological edge.",
+     "impact": {"tech": (15, 40), "budget": (20, 80)}},
+    {"id": "economic_boom", "type": "BREAKTHROUGH", "scope": "own", "where": None, "weight": 1, "defcon": (4, 5),
+     "title": "BREAKTHROUGH: Economic Boom in {country}",
+     "description": "Record growth in {country} floods your treasury with revenue.",
+     "impact": {"budget": (100, 250), "influence": (1, 4)}},
+    {"id": "grid_hack", "type": "CYBER_ATTACK", "scope": "own", "where": None, "weight": 2,
+     "title": "CYBER_ATTACK: Power Grid Breach in {country}",
+     "description": "Hackers believed to work for the {rival_name} take down power grids across {country}.",
+     "impact": {"tech": (-25, -8), "budget": (-80, -30)}},
+    {"id": "data_leak", "type": "CYBER_ATTACK", "scope": "any", "where": TECH_HUBS, "weight": 1,
+     "title": "CYBER_ATTACK: Classified Data Leak",
+     "description": "Terabytes of classified defense research leak from servers in {country}.",
+     "impact": {"tech": (-20, -5), "influence": (-4, -1)}},
+)
+
+
+def should_fire(state, rng):
+    """Event chance grows with the turns since the last one"""
+    turns_since = state.get("turn_count", 0) - state.get("last_event_turn", -5)
+    if turns_since < EVENT_MIN_GAP:
+        return False
+    return rng.randint(0, 100) < (turns_since - 1) * EVENT_CHANCE_PER_TURN
+
+
+def _severity(defcon):
+    """Impact multiplier: 1.0 in peacetime, up to 2.0 at DEFCON 1"""
+    return 1 + (5 - defcon) * 0.25
+
+
+def _owner(state, code):
+    return state.get("ownership", {}).get(code, INITIAL_WORLD_STATE.get(code, "neutral"))
+
+
+def _candidates(template, state, player_faction):
+    """Countries a template can be set in"""
+    codes = sorted(state.get("ownership", INITIAL_WORLD_STATE))
+    if template["where"]:
+        allowed = set(template["where"].split())
+        codes = [c for c in codes if c in allowed]
+    if template["scope"] == "own":
+        return [c for c in codes if _owner(state, c) == player_faction]
+    if template["scope"] == "rival":
+        return [c for c in codes if _owner(state, c) in MAJOR_FACTIONS and _owner(state, c) != player_faction]
+    return codes
+
+
+def pick_event(state, player_faction, rng):
+    """
+    Instantiate one template for the current state. Returns an event dict
+    (type "random_event" with its library category, title, description,
+    impact, template id) or None if no template fits.
+    """
+    defcon = state.get("defcon", 5)
+    last_template = (state.get("last_event_data") or {}).get("template")
+    options = []
+    for template in EVENT_LIBRARY:
+        low, high = template.get("defcon", (1, 5))
+        if not low <= defcon <= high or template["id"] == last_template:
+            continue
+        countries = _candidates(template, state, player_faction)
+        if countries:
+            options.append((template, countries))
+    if not options:
+        return None
+
+    template, countries = rng.choices(options, weights=[t["weight"] for t, _ in options])[0]
+    country = rng.choice(countries)
+    owner = _owner(state, country)
+    rivals = [f for f in MAJOR_FACTIONS if f != player_faction]
+    params = {
+        "country": COUNTRY_NAMES.get(country, country),
+        "faction_name": FACTIONS.get(owner, FACTIONS["neutral"])["name"],
+        "rival_name": FACTIONS[rng.choice(rivals)]["name"],
+        "magnitude": f"{rng.uniform(6.5, 8.9):.1f}",
+    }
+    severity = _severity(defcon)
+    impact = {resource: int(round(rng.randint(low, high) * severity))
+              for resource, (low, high) in template["impact"].items()}
+    return {
+        "type": "random_event",
+        "category": template["type"],
+        "triggered": True,
+        "title": template["title"].format(**params),
+        "description": template["description"].format(**params),
+        "impact": impact,
+        "country": country,
+        "template": template["id"],
+    }
+
+
+def direct_event(state, player_faction, seed):
+    """The event for this turn, or None. Same seed, same answer."""
+    rng = random.Random(f"{seed}:events")
+    if not should_fire(state, rng):
+        return None
+    return pick_event(state, player_faction, rng)
+
+
+def _format_impact(impact):
+    return ", ".join(f"{resource} {amount:+d}" for resource, amount in impact.items())
+
+
+def get_event_flavor_messages(event, player_faction, year):
+    """Messages for the short LLM call that narrates an already chosen event"""
+    faction_name = FACTIONS.get(player_faction, FACTIONS["neutral"])["name"]
+    return [
+        {"role": "system", "content": (
+            'You are the narrator of "Age of Tension", a tense geopolitical strategy game. '
+            "Write breaking-news style narration in plain text, no JSON, no lists."
+        )},
+        {"role": "user", "content": (
+            f"Year {year}. The player commands the {faction_name}.\n"
+            f"EVENT: {event['title']}\n{event['description']}\n"
+            f"Effect on the player: {_format_impact(event['impact'])}.\n"
+            "Narrate this event in 2-3 dramatic sentences. Do not invent other events or numbers."
+        )},
+    ]
+
+
+class EventSlot:
+    """
+    One game's speculatively narrated next event. park() starts narrating
+    the event expected on the next turn; claim() hands that narration over
+    when the director fires the same event from the same state, and
+    discards it otherwise.
+    """
+    def __init__(self):
+        self.key = None
+        self.event = None
+        self.task = None
+
+    def park(self, key, event, narrate):
+        """
+        key: identifies the state the event was predicted from
+        narrate: coroutine function returning the narrative
+        Returns False if this event is already parked for key.
+        """
+        if self.task is not None and self.key == key and self.event == event:
+            return False
+        self.discard()
+        self.key = key
+        self.event = event
+        self.task = asyncio.ensure_future(narrate())
+        metrics.incr("event_speculations")
+        return True
+
+    def claim(self, key, event):
+        """The parked narrative task if it was made for this event and state, else None"""
+        task = self.task
+        if task is not None and self.key == key and self.event == event:
+            self.task = self.key = self.event = None
+            metrics.incr("event_speculation_hits")
+            return task
+        if task is not None:
+            metrics.incr("event_speculation_misses")
+        self.discard()
+        return None
+
+    def discard(self):
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+        self.task = self.key = self.event = None
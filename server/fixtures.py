@@ -0,0 +1,32 @@
+"""
+Shared test helpers: game states backed by throwaway files, so running the
+tests never touches ./world_state.json. The temporary directories are
+removed when the test process exits.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+from game_state import GameState
+
+_temp_dirs = []
+
+
+def temp_path(name="state.json"):
+    """Path to `name` inside a fresh temporary directory"""
+    directory = tempfile.mkdtemp(prefix="age_of_tension_test_")
+    _temp_dirs.append(directory)
+    return os.path.join(directory, name)
+
+
+def make_state(**kwargs):
+    """GameState saved to a temporary file (kwargs go to GameState)"""
+    return GameState(temp_path(), **kwargs)
+
+
+@atexit.register
+def remove_temp_dirs():
+    for directory in _temp_dirs:
+        shutil.rmtree(directory, ignore_errors=True)
+    _temp_dirs.clear()
@@ -1,83 +1,328 @@
-import json
+import itertools
 import os
+from contextlib import contextmanager
+
+import metrics
 from prompts import INITIAL_WORLD_STATE
+from storage import FileStorage, SQLiteStorage, StateConflictError, JOURNAL_SUFFIX, SNAPSHOT_EVERY
 
 STATE_FILE = "world_state.json"
 
+# Write-behind persistence: mutations only mark the state dirty and a
+# flush writes it out. DURABILITY selects when that happens:
+#   "turn"      - once at the end of every turn (default)
+#   "interval"  - from a background timer every FLUSH_INTERVAL seconds
+#   "immediate" - on every mutation (the old behaviour)
+DURABILITY = "turn"
+FLUSH_INTERVAL = 5.0
+
+# Storage backend (see storage.py):
+#   "journal"  - JSON snapshot + append-only journal of changed entries,
+#                compacted into a snapshot every SNAPSHOT_EVERY records
+#   "snapshot" - rewrite the whole STATE_FILE on every flush
+#   "sqlite"   - normalized tables in SQLITE_DB (WAL); required to run
+#                several uvicorn workers against the same games
+STORAGE_MODE = "journal"
+JOURNAL_FILE = os.path.splitext(STATE_FILE)[0] + JOURNAL_SUFFIX
+
+# Prompt sections with their own version number (bumped when their data
+# changes), so rendered prompt fragments can be cached between turns.
+# Top-level keys not listed here belong to "stats".
+PROMPT_SECTIONS = ("ownership", "military", "relationships", "stats")
+SECTION_OF_KEY = {"ownership": "ownership", "military": "military", "relationships": "relationships"}
+
+# Process-wide, so a game reloaded after eviction never reuses a version
+_section_version_counter = itertools.count(1)
+
+# Keys whose change alone doesn't change the world (world_version ignores them)
+BOOKKEEPING_KEYS = ("turn_count",)
+
+def open_storage(storage_mode=STORAGE_MODE, save_file=STATE_FILE, game_id="default"):
+    if storage_mode == "sqlite":
+        return SQLiteStorage(game_id)
+    return FileStorage(save_file, journal=(storage_mode == "journal"))
+
 class GameState:
-    def __init__(self):
-        self.SAVE_FILE = STATE_FILE
+    def __init__(self, save_file=STATE_FILE, durability=DURABILITY, storage_mode=STORAGE_MODE, storage=None):
+        self.SAVE_FILE = save_file
+        self.storage = storage or open_storage(storage_mode, save_file)
+        self.durability = durability
+        self.dirty = False
+        self._clear_changes()
+        # Bumped on every mutation, so readers can tell if the state moved on.
+        # base_version is the version last loaded from / saved to storage.
+        self.version = 0
+        self.base_version = None
         self.state = self.load_state()
         # Ensure we write the initial state if it doesn't exist
-        if not os.path.exists(self.SAVE_FILE):
+        if not self.storage.exists():
             self.save_state()
 
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, value):
+        self._state = value
+        self.rebuild_index()
+        self._bump_sections(*PROMPT_SECTIONS)
+
+    def _bump_sections(self, *sections, world=True):
+        """
+        New versions for the given prompt sections. world=False for pure
+        bookkeeping changes (turn counter) that leave world_version alone,
+        so informational answers cached against it stay valid.
+        """
+        if not hasattr(self, 'section_versions'):
+            self.section_versions = {}
+        for section in sections:
+            self.section_versions[section] = next(_section_version_counter)
+        if world:
+            self.world_version = next(_section_version_counter)
+
+    def get_section_version(self, *sections):
+        """Version tuple of the given prompt sections (changes whenever their data does)"""
+        return tuple(self.section_versions[s] for s in sections)
+
+    def rebuild_index(self):
+        """
+        Rebuild the faction -> countries index and per-faction military totals.
+        Done whenever the whole state is replaced; update_territory and
+        update_military keep both up to date incrementally afterwards.
+        """
+        self.faction_countries = {}
+        self.faction_totals = {}
+        # Each faction's countries in map order, kept until its territory changes
+        self._ordered_countries = {}
+        ownership = self._state.get('ownership', INITIAL_WORLD_STATE)
+        military = self._state.get('military', {})
+        # Stable listing order (the original map order) for grouped output
+        self._code_order = {code: i for i, code in enumerate(military)}
+        for code in military:
+            faction = ownership.get(code, 'neutral')
+            self.faction_countries.setdefault(faction, set()).add(code)
+            self._adjust_totals(faction, military[code], 1, 1)
+
+    def _adjust_totals(self, faction, forces, sign, countries=0):
+        t = self.faction_totals.setdefault(faction, {'countries': 0, 'troops': 0, 'navy': 0, 'airforce': 0})
+        t['countries'] += countries * sign
+        t['troops'] += forces.get('troops', 0) * sign
+        t['navy'] += forces.get('navy', 0) * sign
+        t['airforce'] += forces.get('airforce', 0) * sign
+        if t['countries'] == 0:
+            del self.faction_totals[faction]
+
+    def get_faction_countries(self, faction):
+        """Countries currently owned by faction (a set; do not modify)"""
+        return self.faction_countries.get(faction, set())
+
+    def get_faction_totals(self, faction):
+        """{'countries', 'troops', 'navy', 'airforce'} for faction (zeros if it owns nothing)"""
+        return self.faction_totals.get(faction, {'countries': 0, 'troops': 0, 'navy': 0, 'airforce': 0})
+
+    def _faction_codes_in_order(self, faction):
+        codes = self._ordered_countries.get(faction)
+        if codes is None:
+            codes = sorted(self.faction_countries.get(faction, ()), key=self._code_order.__getitem__)
+            self._ordered_countries[faction] = codes
+        return codes
+
+    def _grouped_codes(self, codes=None):
+        """[(faction, [codes])] from the ownership index, in map order; codes: only these countries"""
+        groups = []
+        for faction, owned in self.faction_countries.items():
+            ordered = self._faction_codes_in_order(faction)
+            if codes is not None and not owned <= codes:
+                if owned.isdisjoint(codes):
+                    continue
+                ordered = [code for code in ordered if code in codes]
+            if ordered:
+                groups.append((faction, ordered))
+        # Factions in the order of their first country, as on the map
+        groups.sort(key=lambda group: self._code_order[group[1][0]])
+        return groups
+
+    @property
+    def journal_records(self):
+        return getattr(self.storage, "journal_records", 0)
+
     def load_state(self):
-        if os.path.exists(STATE_FILE):
-            try:
-                with open(STATE_FILE, 'r') as f:
-                    state = json.load(f)
-                    
-                    # Migration: Ensure all required keys exist
-                    defaults = self.initialize_default_state()
-                    
-                    if 'year' not in state:
-                        state['year'] = 2027
-                    if 'intel_network' not in state:
-                        state['intel_network'] = defaults['intel_network']
-                    if 'ownership' not in state:
-                         state['ownership'] = defaults['ownership']
-                    if 'oil' not in state:
-                        state['oil'] = defaults['oil']
-                    if 'tech' not in state:
-                        state['tech'] = defaults['tech']
-                    if 'last_event_turn' not in state:
-                        state['last_event_turn'] = -5 # Ensure early event possibility
-                    if 'last_event_data' not in state:
-                        state['last_event_data'] = None
-                        
-                    return state
-            except json.JSONDecodeError:
-                print("Error decoding state file, starting fresh.")
+        state = self.storage.load()
+        if state is None:
+            return self.initialize_default_state()
+
+        stored_version = self.storage.version()
+        if stored_version is not None:
+            self.version = self.base_version = stored_version
+
+        # Migration: Ensure all required keys exist
+        defaults = self.initialize_default_state()
         
-        return self.initialize_default_state()
+        if 'year' not in state:
+            state['year'] = 2027
+        if 'intel_network' not in state:
+            state['intel_network'] = defaults['intel_network']
+        if 'ownership' not in state or not state['ownership']:
+             state['ownership'] = defaults['ownership']
+        if 'oil' not in state:
+            state['oil'] = defaults['oil']
+        if 'tech' not in state:
+            state['tech'] = defaults['tech']
+        if 'last_event_turn' not in state:
+            state['last_event_turn'] = -5 # Ensure early event possibility
+        if 'last_event_data' not in state:
+            state['last_event_data'] = None
+            
+        return state
 
-    def save_state(self):
-        import shutil
-        temp_file = f"{STATE_FILE}.tmp"
+    def refresh(self):
+        """
+        Reload if another process saved a newer version (shared backends only).
+        Returns True if the state was reloaded.
+        """
+        stored_version = self.storage.version()
+        if stored_version is None or stored_version == self.base_version:
+            return False
+        if self.dirty:
+            print(f"WARNING: Discarding unsaved changes, game was updated elsewhere (v{stored_version})")
+        self.dirty = False
+        self._clear_changes()
+        self.state = self.load_state()
+        metrics.incr("state_refreshes")
+        return True
+
+    @contextmanager
+    def transaction(self):
+        """
+        Read-modify-write block: with a shared backend, other processes can't
+        write this game until it ends. Starts from the latest stored state and
+        saves everything changed inside it before committing.
+        """
+        if not self.storage.shared:
+            yield self
+            return
         try:
-            with open(temp_file, 'w') as f:
-                json.dump(self.state, f, indent=4)
-            os.replace(temp_file, STATE_FILE)
+            with self.storage.transaction():
+                self.refresh()
+                yield self
+                self.flush()
+        except Exception:
+            # Rolled back: drop in-memory changes that never reached storage
+            self.dirty = False
+            self._clear_changes()
+            self.state = self.load_state()
+            raise
+
+    def _clear_changes(self):
+        self.changed_keys = set()
+        self.changed_military = set()
+        self.changed_ownership = set()
+        self.needs_snapshot = False
+
+    def _change_set(self):
+        """Changed entries with their absolute values (None: unknown, save everything)"""
+        if self.needs_snapshot:
+            return None
+        return {
+            "set": {k: self.state.get(k) for k in self.changed_keys},
+            "military": {c: self.state['military'][c] for c in self.changed_military},
+            "ownership": {c: self.state['ownership'][c] for c in self.changed_ownership},
+        }
+
+    def _write(self, changes):
+        try:
+            self.storage.save(self.state, changes, self.version, self.base_version)
+        except StateConflictError as e:
+            # Another worker saved first: adopt its state rather than overwrite it
+            print(f"WARNING: {e}; reloading")
+            metrics.incr("state_conflicts")
+            self.dirty = False
+            self._clear_changes()
+            self.state = self.load_state()
+            return
         except Exception as e:
             print(f"Error saving state: {e}")
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
+            return
+        self.base_version = self.version
+        self.dirty = False
+        self._clear_changes()
+
+    def save_state(self):
+        """Write the full state"""
+        self._write(None)
+
+    def mark_dirty(self, key=None, bump=True):
+        """
+        Record that the in-memory state changed since the last save.
+        key: the top-level key that changed; without it the backend can't
+        tell what changed and the next flush writes the full state.
+        bump=False: the value was rewritten unchanged, prompt versions stay.
+        """
+        if key is None:
+            self.needs_snapshot = True
+            self._bump_sections(*PROMPT_SECTIONS)
+        else:
+            self.changed_keys.add(key)
+            if bump:
+                self._bump_sections(SECTION_OF_KEY.get(key, "stats"), world=key not in BOOKKEEPING_KEYS)
+        self._changed()
+
+    def _changed(self):
+        self.version += 1
+        self.dirty = True
+        if self.durability == "immediate":
+            self.flush()
+
+    def flush(self):
+        """Save the state if it changed. Returns True if a write happened."""
+        if not self.dirty:
+            return False
+        self._write(self._change_set())
+        return True
+
+    def end_turn(self):
+        """Called once per turn: flushes under the "turn" durability policy"""
+        if self.durability == "turn":
+            self.flush()
+
+    def set_value(self, key, value):
+        # A scalar rewritten with its current value (zero delta) keeps the versions
+        unchanged = not isinstance(value, (dict, list)) and key in self.state and self.state[key] == value
+        self.state[key] = value
+        if key in ('military', 'ownership'):
+            self.rebuild_index()
+        self.mark_dirty(key, bump=not unchanged)
+
+    def apply_delta(self, key, delta):
+        """Add delta to a numeric stat (clamped at 0) and return the new value"""
+        new_val = max(0, self.state.get(key, 0) + delta)
+        self.set_value(key, new_val)
+        return new_val
 
     def reset(self):
         """Explicitly reset the game state"""
-        import os
-        import time
-        
-        # Try to remove, but don't fail if we can't (e.g. file locked)
-        if os.path.exists(self.SAVE_FILE):
-             try:
-                 os.remove(self.SAVE_FILE)
-             except OSError as e:
-                 print(f"Warning: Could not remove save file (might be locked): {e}")
-                 # Wait a beat in case it helps
-                 time.sleep(0.1)
-        
-        # Force a fresh state
-        self.state = self.initialize_default_state()
-        
-        # Ensure we can save this new state
-        try:
-            self.save_state()
-        except Exception as e:
-            # Fallback: if save fails, at least in-memory state is reset
-            print(f"CRITICAL: Failed to save reset state: {e}")
-            raise e
+        with self.storage.transaction():
+            # Continue from the latest version so other workers notice the reset
+            self.refresh()
+            # Counted in the state itself, so every worker sees it; turns
+            # built before a reset compare it to discard themselves
+            reset_count = self.state.get("reset_count", 0) + 1
+            self.storage.clear()
+            
+            # Force a fresh state
+            self.state = self.initialize_default_state()
+            self.state["reset_count"] = reset_count
+            self.version += 1
+            self.base_version = None
+            
+            # Ensure we can save this new state
+            try:
+                self.save_state()
+            except Exception as e:
+                # Fallback: if save fails, at least in-memory state is reset
+                print(f"CRITICAL: Failed to save reset state: {e}")
+                raise e
             
     def initialize_default_state(self):
         """Initialize military forces based on faction alignment"""
@@ -203,17 +448,23 @@ class GameState:
         if not updates:
             return
 
+        ownership = self.state.get('ownership', INITIAL_WORLD_STATE)
         for code, changes in updates.items():
             if code in self.state['military']:
                 current = self.state['military'][code]
+                faction = ownership.get(code, 'neutral')
+                self._adjust_totals(faction, current, -1)
                 if 'troops' in changes:
                     current['troops'] = max(0, current['troops'] + changes['troops'])
                 if 'navy' in changes:
                     current['navy'] = max(0, current['navy'] + changes['navy'])
                 if 'airforce' in changes:
                     current['airforce'] = max(0, current['airforce'] + changes['airforce'])
+                self._adjust_totals(faction, current, 1)
+                self.changed_military.add(code)
         
-        self.save_state()
+        self._bump_sections("military")
+        self._changed()
 
     def update_territory(self, updates):
         """
@@ -228,30 +479,37 @@ class GameState:
             if code in self.state.get('ownership', {}):
                 old_faction = self.state['ownership'].get(code, 'unknown')
                 self.state['ownership'][code] = new_faction
+                if code in self.state.get('military', {}) and old_faction != new_faction:
+                    forces = self.state['military'][code]
+                    self.faction_countries.get(old_faction, set()).discard(code)
+                    if not self.faction_countries.get(old_faction, True):
+                        del self.faction_countries[old_faction]
+                    self.faction_countries.setdefault(new_faction, set()).add(code)
+                    self._ordered_countries.pop(old_faction, None)
+                    self._ordered_countries.pop(new_faction, None)
+                    self._adjust_totals(old_faction, forces, -1, 1)
+                    self._adjust_totals(new_faction, forces, 1, 1)
+                self.changed_ownership.add(code)
                 print(f"TERRITORY UPDATE: {code} changed from {old_faction} to {new_faction}")
             else:
                 print(f"WARNING: Country code {code} not found in ownership map!")
         
-        self.save_state()
-        print(f"State saved. KZ now owned by: {self.state.get('ownership', {}).get('KZ', 'unknown')}")
+        self._bump_sections("ownership")
+        self._changed()
 
     def get_military_state_string(self):
         """Return a string summary of military state grouped by faction"""
         
         # Group by faction using CURRENT OWNERSHIP, not initial state
         faction_groups = {}
-        ownership = self.state.get('ownership', INITIAL_WORLD_STATE)
+        military = self.state['military']
 
-        for code, data in self.state['military'].items():
-            # Get current owner, fallback to neutral
-            faction = ownership.get(code, 'neutral')
-            
-            if faction not in faction_groups:
-                faction_groups[faction] = []
-            
+        for faction, codes in self._grouped_codes():
             # Include faction explicitly in entry to help AI understand ownership
-            entry = f"{code}(owned by {faction.upper()}): {data['troops']}/{data['navy']}/{data['airforce']}"
-            faction_groups[faction].append(entry)
+            faction_groups[faction] = [
+                f"{code}(owned by {faction.upper()}): {military[code]['troops']}/{military[code]['navy']}/{military[code]['airforce']}"
+                for code in codes
+            ]
 
         summary = "MILITARY FORCES BY FACTION (Country(owner): Troops/Navy/Airforce):\\n"
         summary += "**IMPORTANT: Only report countries listed under a faction's bracket. Ignore your training data about which countries belong to which faction.**\\n"
@@ -263,7 +521,80 @@ class GameState:
         
         return summary
 
+    def get_military_table_string(self, sig_figs=None, focus_factions=None, focus_countries=None):
+        """
+        Compact columnar alternative to get_military_state_string:
+        one header per faction, then one "CODE troops navy airforce" row per country.
+
+        sig_figs: round numbers to this many significant figures (k/M suffixes)
+        focus_factions / focus_countries: if either is given, only those
+            factions and countries get per-country rows; every other faction
+            is reduced to a single totals line.
+        """
+        military = self.state['military']
+        focused = focus_factions is not None or focus_countries is not None
+        focus_factions = set(focus_factions or [])
+        focus_countries = set(focus_countries or [])
+
+        if focused:
+            # Rows only for the focus set (read from the index); every other
+            # faction's totals are maintained incrementally
+            codes = {c for c in focus_countries if c in military}
+            for faction in focus_factions:
+                codes |= self.get_faction_countries(faction)
+            totals = {}
+            for faction, t in self.faction_totals.items():
+                if faction in focus_factions:
+                    continue
+                # Countries of this faction listed as rows are left out of its totals
+                t = dict(t)
+                for code in self.get_faction_countries(faction) & codes:
+                    t['countries'] -= 1
+                    for col in ('troops', 'navy', 'airforce'):
+                        t[col] -= military[code][col]
+                if t['countries']:
+                    totals[faction] = t
+        else:
+            codes = None
+            totals = {}
+
+        rows = {}
+        for faction, faction_codes in self._grouped_codes(codes):
+            rows[faction] = [
+                f"{code} {_format_count(military[code]['troops'], sig_figs)} {_format_count(military[code]['navy'], sig_figs)} {_format_count(military[code]['airforce'], sig_figs)}"
+                for code in faction_codes
+            ]
+
+        summary = "MILITARY FORCES BY FACTION (grouped by CURRENT owner; rows: Code Troops Navy Airforce"
+        summary += ", k=thousand M=million)\n" if sig_figs else ")\n"
+        for faction, entries in rows.items():
+            summary += f"[{faction.upper()}]\n" + "\n".join(entries) + "\n"
+        if totals:
+            summary += "OTHER FACTIONS, TOTALS ONLY (Countries Troops Navy Airforce):\n"
+            for faction, t in totals.items():
+                summary += f"[{faction.upper()}] {t['countries']} {_format_count(t['troops'], sig_figs)} {_format_count(t['navy'], sig_figs)} {_format_count(t['airforce'], sig_figs)}\n"
+        return summary
+
+    def get_military_summary_string(self):
+        """Return aggregate military totals per faction (used when the prompt is over budget)"""
+        summary = "MILITARY TOTALS BY FACTION (Countries: Troops/Navy/Airforce):\n"
+        for faction, t in self.faction_totals.items():
+            summary += f"[{faction.upper()}] {t['countries']} countries: {t['troops']}/{t['navy']}/{t['airforce']}\n"
+        return summary
+
     def get_intel_strength(self, faction_code):
         """Return the intel strength for a specific faction"""
         # Default to 50 if missing (e.g. old save file)
         return self.state.get('intel_network', {}).get(faction_code, 50)
+
+
+def _format_count(value, sig_figs=None):
+    """Format a force count, optionally rounded to significant figures (k/M suffix when exact)"""
+    if not sig_figs or value == 0:
+        return str(value)
+    rounded = int(float(f"{value:.{sig_figs}g}"))
+    if rounded % 1_000_000 == 0:
+        return f"{rounded // 1_000_000}M"
+    if rounded % 1_000 == 0:
+        return f"{rounded // 1_000}k"
+    return str(rounded)
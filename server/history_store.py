@@ -0,0 +1,220 @@
+"""
+Server-side conversation memory for a game.
+
+Keeps the last few messages verbatim plus a short rolling summary of
+everything older. The summary is refreshed in the background after each
+turn, so the prompt (and the client's request payload) stays bounded no
+matter how long the game runs.
+
+The history lives in a JSON file, or with a shared storage backend
+(SQLiteStorage) in the game's database row, versioned like GameState so
+every worker sees the other workers' exchanges and resets.
+"""
+import asyncio
+import json
+import os
+from contextlib import contextmanager
+
+import metrics
+
+HISTORY_FILE = "history.json"
+
+# Messages kept verbatim (3 exchanges)
+KEEP_RECENT_MESSAGES = 6
+
+# Upper bound for the rolling summary (characters)
+MAX_SUMMARY_CHARS = 1200
+
+# Long assistant answers (e.g. Markdown tables) are clipped when kept verbatim
+MAX_MESSAGE_CHARS = 1500
+
+SUMMARY_PROMPT = """You maintain the running summary of a strategy game session.
+Merge the EXISTING SUMMARY with the NEW EXCHANGES into one updated summary of at most 6 short sentences.
+Keep: player decisions, wars and conquests, treaties, crises, resource problems. Drop: data tables, greetings, repetition.
+Output ONLY the summary text."""
+
+
+class HistoryStore:
+    def __init__(self, path=HISTORY_FILE, keep_recent=KEEP_RECENT_MESSAGES, storage=None):
+        """storage: shared backend to keep the history in instead of the file at path"""
+        self.path = path
+        self.keep_recent = keep_recent
+        self.storage = storage
+        # Version last loaded from / saved to the shared storage
+        self.version = None
+        self.summary = ""
+        self.recent = []   # [{"role": ..., "content": ...}]
+        self.pending = []  # evicted from `recent`, not yet folded into the summary
+        # Bumped by reset(), so a summary started for the previous game is discarded
+        self.generation = 0
+        self._lock = asyncio.Lock()
+        self.load()
+
+    def load(self):
+        if self.storage is not None:
+            self.version, data = self.storage.load_history()
+            if data is not None:
+                self._set_data(data)
+            return
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self._set_data(data)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Error loading history, starting fresh: {e}")
+
+    def _set_data(self, data):
+        self.summary = data.get("summary", "")
+        self.recent = data.get("recent", [])
+        self.pending = data.get("pending", [])
+        self.generation = data.get("generation", self.generation)
+
+    def refresh(self):
+        """
+        Reload if another worker saved a newer version (shared storage only).
+        Returns True if the history was reloaded.
+        """
+        if self.storage is None or self.storage.history_version() == self.version:
+            return False
+        self.load()
+        metrics.incr("history_refreshes")
+        return True
+
+    @contextmanager
+    def transaction(self):
+        """
+        Read-modify-write block: starts from the latest stored history, and
+        with shared storage other workers can't write it until it ends.
+        """
+        if self.storage is None:
+            yield self
+            return
+        with self.storage.transaction():
+            self.refresh()
+            yield self
+
+    def save(self):
+        data = {"summary": self.summary, "recent": self.recent, "pending": self.pending,
+                "generation": self.generation}
+        if self.storage is not None:
+            try:
+                self.version = self.storage.save_history(data)
+            except Exception as e:
+                print(f"Error saving history: {e}")
+            return
+        temp_file = f"{self.path}.tmp"
+        try:
+            with open(temp_file, 'w') as f:
+                json.dump(data, f)
+            os.replace(temp_file, self.path)
+        except Exception as e:
+            print(f"Error saving history: {e}")
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+    def reset(self, opening=None):
+        """Start over, optionally with `opening` as the first assistant message"""
+        with self.transaction():
+            self.generation += 1
+            self.summary = ""
+            self.recent = []
+            self.pending = []
+            if opening:
+                self.add_message("assistant", opening)
+            self.save()
+
+    def is_empty(self):
+        return not (self.summary or self.recent or self.pending)
+
+    def add_message(self, role, content):
+        if not content:
+            return
+        if len(content) > MAX_MESSAGE_CHARS:
+            content = content[:MAX_MESSAGE_CHARS] + " [...]"
+        self.recent.append({"role": role, "content": content})
+        overflow = len(self.recent) - self.keep_recent
+        if overflow > 0:
+            self.pending.extend(self.recent[:overflow])
+            self.recent = self.recent[overflow:]
+
+    def add_exchange(self, user_text, assistant_text):
+        with self.transaction():
+            self.add_message("user", user_text)
+            self.add_message("assistant", assistant_text)
+            self.save()
+
+    def seed_from_client(self, history):
+        """Import a client-side history list (legacy clients that still send it)"""
+        with self.transaction():
+            for msg in history:
+                role = "user" if msg.get("type") == "user" else "assistant"
+                self.add_message(role, msg.get("text"))
+            self.save()
+
+    def get_recent_messages(self):
+        return list(self.recent)
+
+    def get_summary_string(self):
+        """Summary section for the prompt (older turns, plus any not yet summarized)"""
+        parts = []
+        if self.summary:
+            parts.append(self.summary)
+        if self.pending:
+            # Summary refresh still running: give the gist of what it will cover
+            parts.extend(_first_sentence(m["content"]) for m in self.pending if m["role"] == "assistant")
+        if not parts:
+            return ""
+        return "STORY SO FAR (summary of earlier turns):\n" + " ".join(parts)
+
+    async def update_summary(self, summarize):
+        """
+        Fold pending messages into the rolling summary.
+        summarize: async callable(prompt_messages) -> str; on failure the
+        summary falls back to the first sentence of each evicted answer.
+        """
+        async with self._lock:
+            self.refresh()
+            if not self.pending:
+                return
+            batch = list(self.pending)
+            generation = self.generation
+            exchanges = "\n".join(f"{m['role'].upper()}: {m['content']}" for m in batch)
+            messages = [
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": f"EXISTING SUMMARY:\n{self.summary or '(none)'}\n\nNEW EXCHANGES:\n{exchanges}"}
+            ]
+            try:
+                new_summary = (await summarize(messages)).strip()
+            except Exception as e:
+                print(f"WARNING: Summary update failed, using extractive fallback: {e}")
+                new_summary = ""
+            with self.transaction():
+                if self.generation != generation or self.pending[:len(batch)] != batch:
+                    # The game was reset while the summary was being written,
+                    # or another worker already folded these messages in
+                    return
+                if not new_summary:
+                    extra = " ".join(_first_sentence(m["content"]) for m in batch if m["role"] == "assistant")
+                    new_summary = f"{self.summary} {extra}".strip()
+
+                self.summary = _clip(new_summary, MAX_SUMMARY_CHARS)
+                self.pending = self.pending[len(batch):]
+                self.save()
+
+
+def _first_sentence(text):
+    text = text.strip().split("\n")[0]
+    for end in (". ", "! ", "? "):
+        idx = text.find(end)
+        if idx != -1:
+            return text[:idx + 1]
+    return text[:200]
+
+
+def _clip(text, limit):
+    if len(text) <= limit:
+        return text
+    # Keep the most recent part of the story
+    return "..." + text[-limit:]
@@ -0,0 +1,132 @@
+"""
+Lightweight local intent classifier for player input.
+
+Every input gets one label: a data query (answered from the state by
+query_engine), a question, a diplomatic action, a military action, or some
+other action. Labels come from weighted keyword/regex scores, so classifying
+takes a few microseconds and needs no model or network. Each decision can be
+appended to a JSON-lines log for tuning the weights.
+"""
+import json
+import re
+import time
+
+import metrics
+from query_engine import match_query
+
+DATA_QUERY = "data_query"
+QUESTION = "question"
+DIPLOMATIC = "diplomatic"
+MILITARY = "military"
+OTHER = "other"
+
+# Pipeline per label: "local" (query engine, no LLM), "fast" (small model),
+# "full" (game master model)
+ROUTES = {
+    DATA_QUERY: "local",
+    QUESTION: "fast",
+    DIPLOMATIC: "full",
+    MILITARY: "full",
+    OTHER: "full",
+}
+
+# Decisions are appended here as JSON lines (None disables the log)
+INTENT_LOG_FILE = "intent_log.jsonl"
+
+QUESTION_OPENERS = re.compile(
+    r"^(what|how|why|who|when|where|which|is|are|do|does|did|has|have|"
+    r"assess|status|report|brief|describe|summari[sz]e|explain)\b"
+)
+# "Can we negotiate..." is usually a polite order, so these count for less
+MODAL_OPENERS = re.compile(r"^(can|could|will|would|should|shall)\b")
+
+# (label, pattern, weight per match)
+KEYWORD_WEIGHTS = (
+    (MILITARY, re.compile(r"\b(attack|invade|invasion|airstrikes?|bomb|nuke|nuclear|missiles?|"
+                          r"deploy|mobili[sz]e|blockade|occupy|conquer|annex|reinforce|fortify|withdraw|"
+                          r"retreat|war|assault|offensive|shell|raid)\b"), 2),
+    (MILITARY, re.compile(r"\b(troops|army|navy|fleet|jets|air ?force|soldiers|forces|border)\b"), 1),
+    (DIPLOMATIC, re.compile(r"\b(negotiate|treaty|alliance|ally|sanctions?|embargo|trade deal|deal|propose|"
+                            r"offer|summit|peace|ceasefire|talks|envoy|ambassador|embassy|diplomatic|"
+                            r"recogni[sz]e|condemn|apologi[sz]e|aid|pact|agreement)\b"), 2),
+    (DIPLOMATIC, re.compile(r"\b(relations|relationship|message|speech|un|united nations)\b"), 1),
+    (QUESTION, QUESTION_OPENERS, 3),
+    (QUESTION, MODAL_OPENERS, 1),
+    (QUESTION, re.compile(r"\?\s*$"), 2),
+    (QUESTION, re.compile(r"\b(intel|intelligence|situation|latest|news|advice|recommend)\b"), 1),
+)
+
+# Verbs that also open diplomatic phrases ("strike a trade deal", "launch
+# peace talks"): they only count as military when no diplomatic term is present
+DUAL_USE_VERBS = re.compile(r"\b(strike|launch)\b")
+DUAL_USE_WEIGHT = 2
+
+# Tie-break order: the riskier label wins, so an ambiguous order still
+# reaches the full model
+LABEL_PRIORITY = (MILITARY, DIPLOMATIC, QUESTION)
+
+
+def classify(text, player_faction):
+    """
+    Return {"label", "scores", "query"}; "query" is the query_engine match
+    for data queries, else None.
+    """
+    query = match_query(text, player_faction)
+    if query is not None:
+        return {"label": DATA_QUERY, "scores": {}, "query": query}
+
+    lowered = " ".join(text.lower().split())
+    scores = {label: 0 for label in LABEL_PRIORITY}
+    for label, pattern, weight in KEYWORD_WEIGHTS:
+        scores[label] += weight * len(pattern.findall(lowered))
+    if not scores[DIPLOMATIC]:
+        scores[MILITARY] += DUAL_USE_WEIGHT * len(DUAL_USE_VERBS.findall(lowered))
+
+    label = OTHER
+    best = 0
+    for candidate in LABEL_PRIORITY:
+        if scores[candidate] > best:
+            label, best = candidate, scores[candidate]
+    return {"label": label, "scores": scores, "query": None}
+
+
+def route(intent):
+    """Pipeline name for a classified intent (see ROUTES)"""
+    return ROUTES[intent["label"]]
+
+
+def is_question(intent):
+    """True for inputs that only ask for information (no event, nothing to apply)"""
+    return intent["label"] in (DATA_QUERY, QUESTION)
+
+
+def classify_and_log(text, player_faction, game_id=None):
+    """classify() plus metrics and a log line. Returns (intent, route)."""
+    start = time.perf_counter()
+    intent = classify(text, player_faction)
+    pipeline = route(intent)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    metrics.incr(f"intent_{intent['label']}")
+    metrics.record("intent_classify_ms", round(elapsed_ms, 3))
+    log_decision(text, intent, pipeline, elapsed_ms, game_id)
+    return intent, pipeline
+
+
+def log_decision(text, intent, pipeline, elapsed_ms, game_id=None):
+    """Append one decision to INTENT_LOG_FILE"""
+    if not INTENT_LOG_FILE:
+        return
+    record = {
+        "time": round(time.time(), 3),
+        "game_id": game_id,
+        "input": text,
+        "label": intent["label"],
+        "scores": intent["scores"],
+        "route": pipeline,
+        "ms": round(elapsed_ms, 3)
+    }
+    try:
+        with open(INTENT_LOG_FILE, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        print(f"Warning: Could not write intent log: {e}")
@@ -0,0 +1,179 @@
+"""
+Shared asynchronous client for the Ollama HTTP API.
+
+Every endpoint goes through one pooled httpx.AsyncClient so that a long
+generation for one player never blocks the event loop for everyone else.
+"""
+import asyncio
+import json
+
+import httpx
+
+OLLAMA_BASE_URL = "http://localhost:11434"
+
+# Connection pool: keep sockets to Ollama alive between turns
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 120  # seconds
+
+# Default per-call timeouts (seconds)
+CHAT_TIMEOUT = 120
+TAGS_TIMEOUT = 5
+CONNECT_TIMEOUT = 5
+
+# How long Ollama keeps the model (and its prompt cache) loaded after a call.
+# Passed on every request so the model is not unloaded between player turns.
+KEEP_ALIVE = "30m"
+
+
+class LLMError(Exception):
+    """Raised when Ollama cannot be reached or returns an unusable answer"""
+
+    def __init__(self, message, status_code=500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LLMConnectionError(LLMError):
+    def __init__(self, message):
+        super().__init__(message, status_code=503)
+
+
+class LLMTimeoutError(LLMError):
+    def __init__(self, message):
+        super().__init__(message, status_code=504)
+
+
+class OllamaClient:
+    def __init__(self, base_url=OLLAMA_BASE_URL, transport=None):
+        """transport: optional httpx transport (e.g. httpx.MockTransport in tests)"""
+        self.base_url = base_url
+        self.transport = transport
+        self._client = None
+
+    @property
+    def client(self):
+        # Created lazily so the pool is bound to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(CHAT_TIMEOUT, connect=CONNECT_TIMEOUT),
+                transport=self.transport,
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(self, method, path, timeout, **kwargs):
+        """Send a request, mapping transport failures to LLMError subclasses"""
+        try:
+            # wait_for gives a hard deadline for the whole call (including body
+            # download) and lets the caller cancel the in-flight request.
+            return await asyncio.wait_for(
+                self.client.request(method, path, timeout=timeout, **kwargs),
+                timeout=timeout,
+            )
+        except httpx.ConnectError as e:
+            raise LLMConnectionError(f"Cannot connect to Ollama: {e}")
+        except (httpx.TimeoutException, asyncio.TimeoutError):
+            raise LLMTimeoutError(f"Ollama request timed out after {timeout}s")
+        except httpx.HTTPError as e:
+            raise LLMError(f"Ollama request failed: {e}")
+
+    async def chat(self, model, messages, format="json", options=None, timeout=CHAT_TIMEOUT, keep_alive=KEEP_ALIVE):
+        """
+        Run a non-streaming chat completion.
+        Returns the full Ollama response body (dict).
+        """
+        payload = {
+            "model": model,
+            "messages": messages,
+            "stream": False,
+        }
+        if format:
+            payload["format"] = format
+        if options:
+            payload["options"] = options
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+
+        response = await self._request("POST", "/api/chat", timeout, json=payload)
+        if response.status_code != 200:
+            raise LLMError(f"Ollama API error: {response.text}")
+
+        try:
+            return response.json()
+        except json.JSONDecodeError as e:
+            raise LLMError(f"Ollama returned invalid JSON envelope: {e}")
+
+    async def chat_stream(self, model, messages, format="json", options=None, timeout=CHAT_TIMEOUT, keep_alive=KEEP_ALIVE):
+        """
+        Run a streaming chat completion.
+        Yields each decoded Ollama chunk (dict); the last one has "done": true
+        and carries the timing/token statistics. `timeout` bounds the wait
+        for each chunk, not the whole generation.
+        """
+        payload = {
+            "model": model,
+            "messages": messages,
+            "stream": True,
+        }
+        if format:
+            payload["format"] = format
+        if options:
+            payload["options"] = options
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+
+        try:
+            async with self.client.stream("POST", "/api/chat", json=payload, timeout=timeout) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    raise LLMError(f"Ollama API error: {body.decode(errors='replace')}")
+
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    try:
+                        chunk = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if "error" in chunk:
+                        raise LLMError(f"Ollama API error: {chunk['error']}")
+                    yield chunk
+                    if chunk.get("done"):
+                        return
+        except httpx.ConnectError as e:
+            raise LLMConnectionError(f"Cannot connect to Ollama: {e}")
+        except httpx.TimeoutException:
+            raise LLMTimeoutError(f"Ollama stream stalled for more than {timeout}s")
+        except httpx.HTTPError as e:
+            raise LLMError(f"Ollama request failed: {e}")
+
+    async def chat_content(self, model, messages, **kwargs):
+        """Convenience wrapper returning only the assistant message text"""
+        data = await self.chat(model, messages, **kwargs)
+        return data.get("message", {}).get("content", "")
+
+    async def list_models(self, timeout=TAGS_TIMEOUT):
+        """Return the names of the models installed in Ollama"""
+        response = await self._request("GET", "/api/tags", timeout)
+        if response.status_code != 200:
+            raise LLMError("Failed to fetch models from Ollama")
+        return [model["name"] for model in response.json().get("models", [])]
+
+    async def ping(self, timeout=TAGS_TIMEOUT):
+        """Return True if Ollama answers on /api/tags"""
+        try:
+            response = await self._request("GET", "/api/tags", timeout)
+            return response.status_code == 200
+        except LLMError:
+            return False
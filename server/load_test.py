@@ -0,0 +1,57 @@
+"""
+Concurrency load test for the backend.
+
+Fires N simultaneous /api/turn requests and compares the wall time with a
+single request. With the async Ollama client the N requests should overlap
+(limited only by Ollama's own parallelism, see OLLAMA_NUM_PARALLEL).
+
+Usage: python load_test.py [N] [model]
+"""
+import asyncio
+import sys
+import time
+
+import httpx
+
+SERVER_URL = "http://localhost:8000"
+FACTIONS = ["usa", "china", "russia", "eu", "india"]
+
+
+async def send_turn(client, i, model):
+    start = time.perf_counter()
+    response = await client.post(
+        f"{SERVER_URL}/api/turn",
+        json={
+            "input": "Assess the current situation",
+            "history": [],
+            "model": model,
+            "faction": FACTIONS[i % len(FACTIONS)]
+        }
+    )
+    elapsed = time.perf_counter() - start
+    print(f"  request {i}: status {response.status_code} in {elapsed:.2f}s")
+    return elapsed
+
+
+async def run(n, model):
+    async with httpx.AsyncClient(timeout=300) as client:
+        print("Single request baseline...")
+        start = time.perf_counter()
+        await send_turn(client, 0, model)
+        single = time.perf_counter() - start
+
+        print(f"\n{n} concurrent requests...")
+        start = time.perf_counter()
+        await asyncio.gather(*(send_turn(client, i, model) for i in range(n)))
+        concurrent = time.perf_counter() - start
+
+    print("\n" + "-" * 50)
+    print(f"Single request:      {single:.2f}s")
+    print(f"{n} concurrent:       {concurrent:.2f}s")
+    print(f"Ratio (ideal ~1.0):  {concurrent / single:.2f}")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    model = sys.argv[2] if len(sys.argv) > 2 else "example:latest"
+    asyncio.run(run(n, model))
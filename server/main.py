@@ -1,15 +1,37 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import requests
 import json
-from prompts import get_game_master_prompt
-from game_state import GameState
+from prompts import (
+    get_game_master_prompt, get_static_system_prompt, get_game_state_string,
+    get_ownership_changes_string, get_ownership_changes_compact_string, get_relationships_string,
+    assemble_dynamic_state_prompt
+)
+from prompt_builder import (
+    PromptBuilder, PROMPT_TOKEN_BUDGET, drop_oldest_message,
+    estimate_message_tokens, choose_num_ctx, cached_fragment
+)
+from entity_matcher import get_relevant_entities
+from response_cache import ResponseCache, is_non_mutating
+from query_engine import answer_query
+from intent_classifier import classify_and_log, is_question, MILITARY
+from combat import resolve_order, combat_directive
+from costs import check_cost, enforce_cost
+from event_director import direct_event, get_event_flavor_messages
+from briefing_pool import BriefingPool
+import metrics
+from game_state import DURABILITY, FLUSH_INTERVAL
+from sessions import SessionManager, DEFAULT_GAME_ID, GAME_ID_PATTERN, SESSION_SWEEP_INTERVAL
+from llm_client import OllamaClient, LLMError, OLLAMA_BASE_URL
+from stream_parser import StreamingJSONParser, parse_partial, FIELD_CHUNK, FIELD_COMPLETE
 
+import asyncio
+import copy
 import datetime
 
 app = FastAPI()
-state_manager = GameState()
+sessions = SessionManager()
+llm_client = OllamaClient(OLLAMA_BASE_URL)
 
 # Logging helper
 def log(msg):
@@ -27,15 +49,118 @@ app.add_middleware(
 
 class PlayerInput(BaseModel):
     input: str
-    history: list = []
+    history: list = []  # Deprecated: the server keeps history; only used to seed an empty store
     model: str = "example:latest"  # Default model
     faction: str = "usa" # Default faction if not provided
+    game_id: str = DEFAULT_GAME_ID
+
+class GameRef(BaseModel):
+    game_id: str = DEFAULT_GAME_ID
 
-OLLAMA_URL = "http://localhost:11434/api/chat"
 MODEL_NAME = "example:latest"  # Changed to match installed model
 
+# Prompt assembly: "cached" keeps a byte-identical static system prompt first
+# and sends volatile state last (Ollama reuses its prompt cache across turns);
+# "legacy" interleaves the rules and the state in one system message.
+PROMPT_LAYOUT = "cached"
+
+# Military data in the prompt: "compact" (columnar table, one header per
+# faction) or "verbose" (legacy CODE(owned by FACTION): t/n/a entries).
+# MILITARY_SIG_FIGS rounds the compact table (None keeps exact numbers).
+MILITARY_FORMAT = "compact"
+MILITARY_SIG_FIGS = None
+
+# Only send per-country military rows for countries/factions mentioned in the
+# player's input (plus their owners and the player's faction); every other
+# faction is reduced to totals. Applies to the compact format.
+RELEVANCE_FILTER = True
+
+# Opt-in: answer a repeated informational question (same game, faction,
+# model and wording) from memory while nothing in the world has changed.
+RESPONSE_CACHE = False
+response_cache = ResponseCache()
+
+# Answer plain data queries ("my forces", "territories owned by China",
+# "resources") from the game state without calling the LLM
+LOCAL_QUERIES = True
+
+# Smaller model for plain questions (e.g. "llama3.2:3b"); None keeps the
+# player's selected model for every turn
+FAST_MODEL = None
+
+# Resolve clear attack/move orders with the combat engine (combat.py); the
+# model only narrates the computed casualties and territory changes
+COMBAT_ENGINE = True
+
+# Price orders and check affordability on the server (costs.py); the model
+# gets a one-line verdict instead of doing the arithmetic itself
+COST_ENGINE = True
+
+# Pick random events in Python from the event library (event_director.py);
+# the model only writes a short flavor narrative for them, in parallel with
+# the turn. False: the model invents events when the director forces one.
+EVENT_DIRECTOR = True
+EVENT_FLAVOR_TOKENS = 160
+
+# After each turn, narrate the event the director will fire next turn (if
+# any) in the background, so event turns cost no more than normal ones
+SPECULATIVE_EVENTS = True
+
+# Keep a few opening briefings per (faction, model) written in the background
+# (briefing_pool.py), so picking a faction starts the game instantly.
+# BRIEFING_FACTIONS are pre-generated at startup on MODEL_NAME, with the
+# names the client's faction selector sends (they appear in the prompt).
+BRIEFING_POOL = True
+BRIEFING_FACTIONS = {
+    "usa": "North American Alliance",
+    "china": "People's Republic of China",
+    "eu": "European Union",
+    "russia": "Russian Federation",
+    "india": "Republic of India",
+    "corporate": "Mega-Corporation Coalition",
+    "rogue": "Rogue AI Collective",
+}
+
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+
+@app.on_event("startup")
+async def start_background_tasks():
+    if DURABILITY == "interval":
+        asyncio.create_task(flush_state_periodically())
+    asyncio.create_task(evict_idle_sessions())
+    if BRIEFING_POOL:
+        prefill_briefings()
+
+async def flush_state_periodically():
+    """Background write-behind for the "interval" durability policy"""
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL)
+        try:
+            sessions.flush_all()
+        except Exception as e:
+            log(f"ERROR: Background state flush failed: {e}")
+
+async def evict_idle_sessions():
+    """Unload games nobody has played for a while (they reload from disk)"""
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+        try:
+            evicted = sessions.evict_idle()
+            if evicted:
+                log(f"SESSIONS: Unloaded {evicted} idle games, {len(sessions.sessions)} in memory")
+        except Exception as e:
+            log(f"ERROR: Session eviction failed: {e}")
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    briefing_pool.cancel()
+    sessions.close()
+    await llm_client.close()
+
+def check_game_id(game_id):
+    if not GAME_ID_PATTERN.match(game_id or ""):
+        raise HTTPException(status_code=400, detail=f"Invalid game id: {game_id!r}")
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request, exc):
@@ -45,133 +170,831 @@ async def validation_exception_handler(request, exc):
         content={"detail": str(exc)},
     )
 
-@app.post("/api/turn")
-async def process_turn(data: PlayerInput):
+def route_turn(data, session):
     """
-    Process a player's turn by sending it to Ollama and returning the response
+    Classify the player's input and pick its pipeline ("local", "fast" or
+    "full"). Fast turns run on FAST_MODEL when one is configured.
+    Returns (intent, pipeline, data).
     """
-    log(f"--> RECEIVED /api/turn REQUEST from {data.faction}")
-    log(f"    Input: {data.input}")
-    log(f"    History Length: {len(data.history)}")
+    intent, pipeline = classify_and_log(data.input, data.faction, session.game_id)
+    if pipeline == "local" and not LOCAL_QUERIES:
+        pipeline = "fast"
+    if pipeline == "fast" and FAST_MODEL:
+        data = data.copy(update={"model": FAST_MODEL})
+    log(f"ROUTER: {intent['label']} -> {pipeline} pipeline (model {data.model})")
+    return intent, pipeline, data
+
+
+def event_key(data, session):
+    """(director seed, world version, faction, model): what an event narrative was made for"""
+    state_manager = session.state
+    seed = f"{session.game_id}:{state_manager.state.get('turn_count', 0)}"
+    return (seed, state_manager.world_version, data.faction, data.model)
+
+
+def build_turn_messages(data, session, intent):
+    """
+    Assemble the Ollama message list for a turn of the given game session.
+    Returns a turn dict: messages, force_event, intel_strength,
+    prompt_tokens (estimate), num_ctx, the session, the state version
+    the prompt was built from and the input's intent.
+    """
+    state_manager = session.state
+    history_store = session.history
+    # Pick up changes saved by other worker processes (shared storage only)
+    state_manager.refresh()
+    history_store.refresh()
+
+    # Build conversation history for context
+    messages = []
     
+    # Get Intel Strength for this faction
     try:
-        # Build conversation history for context
-        messages = []
-        
-        # Get Intel Strength for this faction
-        try:
-            intel_strength = state_manager.get_intel_strength(data.faction)
-        except Exception as e:
-            print(f"ERROR getting intel strength: {e}")
-            intel_strength = 50
+        intel_strength = state_manager.get_intel_strength(data.faction)
+    except Exception as e:
+        print(f"ERROR getting intel strength: {e}")
+        intel_strength = 50
 
-        # Add system prompt
-        try:
-            military_str = state_manager.get_military_state_string()
-            # Debug: Show which faction each country belongs to
-            print(f"DEBUG: Military state groupings being sent to AI:")
-            for line in military_str.split("\\n")[:20]:  # First 20 lines
-                print(f"  {line}")
-            prompt_content = get_game_master_prompt(
+    # Event Director Logic
+    current_turn = state_manager.state.get("turn_count", 0)
+    last_event = state_manager.state.get("last_event_turn", -5)
+    turns_since = current_turn - last_event
+    
+    # Don't force event if player is asking a question (let them get their answer)
+    force_event = False
+    director_event = None
+    director_key = event_key(data, session)
+    if not is_question(intent):
+        if EVENT_DIRECTOR:
+            # Seeded by game and turn, so a game always replays the same events
+            director_event = direct_event(state_manager.state, data.faction, director_key[0])
+            force_event = director_event is not None
+        elif turns_since >= 4:
+            # Increasing probability: 75% at 4 turns, 100% at 5
+            import random
+            prob = (turns_since - 1) * 25
+            force_event = random.randint(0, 100) < prob
+
+    directives = []
+    if director_event:
+        log(f"DIRECTOR: Firing event '{director_event['title']}' (Turns since last: {turns_since})")
+    elif force_event:
+        log(f"DIRECTOR: Forcing Random Event (Turns since last: {turns_since})")
+        directives.append("SYSTEM DIRECTIVE: You MUST generate a Random Event (CRISIS, RESOURCE_SHOCK, etc.) in this response. Do not defer it. Make it relevant to the current situation.")
+    
+    cost_check = check_cost(data.input, intent, state_manager.state) if COST_ENGINE else None
+    if cost_check:
+        log(f"COSTS: {cost_check['verdict']}")
+        directives.append(cost_check["verdict"])
+
+    # Deterministic combat: computed here, narrated by the model, applied in apply_turn
+    combat = None
+    if COMBAT_ENGINE and intent["label"] == MILITARY and (cost_check is None or cost_check["affordable"]):
+        combat = resolve_order(data.input, data.faction, state_manager.state, f"{session.game_id}:{current_turn}")
+        if combat:
+            log(f"COMBAT: {combat['summary']}")
+            directives.append(combat_directive(combat))
+
+    # Recent Event Continuity (Memory Injection)
+    # If an event happened recently (within 3 turns), force the AI to remember it
+    recent_event_data = state_manager.state.get("last_event_data")
+    if recent_event_data and turns_since < 3:
+        log(f"DIRECTOR: Injecting Recent Event Context: {recent_event_data.get('title')}")
+        directives.append(f"WORLD STATE UPDATE: A major event recently occurred ({recent_event_data.get('title')}: {recent_event_data.get('description')}). Ensure your narrative reflects the ongoing consequences of this crisis if the player ignores it.")
+
+    # Conversation memory is kept server-side: the last few exchanges
+    # verbatim plus a rolling summary of everything older
+    if data.history and history_store.is_empty():
+        log(f"HISTORY: Seeding server-side history from client ({len(data.history)} messages)")
+        history_store.seed_from_client(data.history)
+    history_messages = history_store.get_recent_messages()
+    summary_str = history_store.get_summary_string()
+
+    def fragment(name, sections, render, *params):
+        """Rendered state fragment, reused until one of its sections changes"""
+        key = (session.game_id, name, state_manager.get_section_version(*sections)) + params
+        return cached_fragment(key, render)
+
+    # Add system prompt
+    try:
+        if MILITARY_FORMAT == "compact" and RELEVANCE_FILTER:
+            # Include the last player messages so follow-ups ("continue the
+            # attack") keep the countries they refer to
+            recent_inputs = [m["content"] for m in history_messages if m["role"] == "user"][-2:]
+            focus_factions, focus_countries = get_relevant_entities(
+                recent_inputs + [data.input],
+                data.faction,
+                state_manager.state.get("ownership", {})
+            )
+            log(f"PROMPT: military detail for factions {sorted(focus_factions)}, countries {sorted(focus_countries)}")
+            military_str = fragment(
+                "military_focused", ("military", "ownership"),
+                lambda: state_manager.get_military_table_string(
+                    sig_figs=MILITARY_SIG_FIGS,
+                    focus_factions=focus_factions,
+                    focus_countries=focus_countries
+                ),
+                MILITARY_SIG_FIGS, frozenset(focus_factions), frozenset(focus_countries)
+            )
+        elif MILITARY_FORMAT == "compact":
+            military_str = fragment("military_table", ("military", "ownership"),
+                                    lambda: state_manager.get_military_table_string(sig_figs=MILITARY_SIG_FIGS),
+                                    MILITARY_SIG_FIGS)
+        else:
+            military_str = fragment("military_verbose", ("military", "ownership"),
+                                    state_manager.get_military_state_string)
+        # Debug: Show which faction each country belongs to
+        print(f"DEBUG: Military state groupings being sent to AI:")
+        for line in military_str.replace("\\n", "\n").split("\n")[:20]:  # First 20 lines
+            print(f"  {line}")
+        if PROMPT_LAYOUT == "cached":
+            # Static rules first (identical every turn -> KV cache hit),
+            # volatile state last, right before the player's command.
+            # Sections are trimmed lowest-priority first to fit the token budget.
+            state = state_manager.state
+            builder = PromptBuilder(PROMPT_TOKEN_BUDGET)
+            builder.add("static", get_static_system_prompt(), required=True)
+            builder.add("game_state", fragment("game_state", ("stats",),
+                                               lambda: get_game_state_string(data.faction, state, intel_strength),
+                                               data.faction, intel_strength), required=True)
+            builder.add("directives", "\n".join(directives), required=True)
+            builder.add("input", data.input, required=True)
+            # Only countries whose owner differs from the baseline blocs
+            # (the blocs themselves are in the cached static prompt). Never
+            # dropped: without it the model assumes every conquest was undone.
+            builder.add("ownership", fragment("ownership", ("ownership",), lambda: get_ownership_changes_string(state)),
+                        priority=10, droppable=False,
+                        reducers=[lambda _: fragment("ownership_compact", ("ownership",),
+                                                     lambda: get_ownership_changes_compact_string(state))])
+            builder.add("history", history_messages, priority=20,
+                        reducers=[drop_oldest_message])
+            builder.add("summary", summary_str, priority=25)
+            builder.add("military", military_str, priority=30,
+                        reducers=[lambda _: fragment("military_summary", ("military", "ownership"),
+                                                     state_manager.get_military_summary_string)])
+            builder.add("relationships", fragment("relationships", ("relationships",), lambda: get_relationships_string(state)),
+                        priority=40,
+                        reducers=[lambda _: fragment("relationships_compact", ("relationships",),
+                                                     lambda: get_relationships_string(state, compact=True))])
+            builder.fit()
+            prompt_report = builder.report()
+            if prompt_report["trimmed"]:
+                log(f"PROMPT: over budget, trimmed sections: {prompt_report['trimmed']}")
+
+            prefix_content = builder.get("static")
+            history_messages = builder.get("history")
+            state_content = assemble_dynamic_state_prompt(
+                builder.get("ownership"),
+                builder.get("game_state"),
+                builder.get("relationships"),
+                builder.get("military"),
+                directives,
+                builder.get("summary")
+            )
+        else:
+            prefix_content = get_game_master_prompt(
                 data.faction, 
                 state_manager.state, 
                 military_str,
                 intel_strength
             )
-        except Exception as e:
-            print("CRITICAL ERROR generating system prompt!")
-            import traceback
-            traceback.print_exc()
-            raise HTTPException(status_code=500, detail=f"Prompt generation failed: {str(e)}")
+    except Exception as e:
+        print("CRITICAL ERROR generating system prompt!")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Prompt generation failed: {str(e)}")
 
-        messages.append({
-            "role": "system",
-            "content": prompt_content
-        })
-        
-        # Event Director Logic
-        current_turn = state_manager.state.get("turn_count", 0)
-        last_event = state_manager.state.get("last_event_turn", -5)
-        turns_since = current_turn - last_event
-        
-        # Increasing probability: 0% at 0 turns, 20% at 1, 40% at 2 ... 100% at 5
-        import random
-        force_event = False
-        if turns_since >= 4:
-            prob = (turns_since - 1) * 25 # 75%, 100%
-            if random.randint(0, 100) < prob:
-                force_event = True
-        
-        # Don't force event if player is asking a question (let them get their answer)
-        # Simple heuristic: if input starts with question words
-        if data.input.lower().strip().split(' ')[0] in ["what", "how", "why", "who", "when", "where"]:
-            force_event = False
+    messages.append({
+        "role": "system",
+        "content": prefix_content
+    })
 
-        if force_event:
-            log(f"DIRECTOR: Forcing Random Event (Turns since last: {turns_since})")
+    if PROMPT_LAYOUT != "cached":
+        if summary_str:
             messages.append({
                 "role": "system",
-                "content": "SYSTEM DIRECTIVE: You MUST generate a Random Event (CRISIS, RESOURCE_SHOCK, etc.) in this response. Do not defer it. Make it relevant to the current situation."
+                "content": summary_str
             })
-        
-        # Recent Event Continuity (Memory Injection)
-        # If an event happened recently (within 3 turns), force the AI to remember it
-        recent_event_data = state_manager.state.get("last_event_data")
-        if recent_event_data and turns_since < 3:
-             log(f"DIRECTOR: Injecting Recent Event Context: {recent_event_data.get('title')}")
-             messages.append({
+        for directive in directives:
+            messages.append({
                 "role": "system",
-                "content": f"WORLD STATE UPDATE: A major event recently occurred ({recent_event_data.get('title')}: {recent_event_data.get('description')}). Ensure your narrative reflects the ongoing consequences of this crisis if the player ignores it."
-             })
-
-        # Add recent history (last 5 exchanges to manage context window)
-        recent_history = data.history[-10:] if len(data.history) > 10 else data.history
-        for msg in recent_history:
-            role = "user" if msg.get("type") == "user" else "assistant"
-            if msg.get("text"):
-                messages.append({
-                    "role": role,
-                    "content": msg["text"]
-                })
+                "content": directive
+            })
+
+    messages.extend(history_messages)
+
+    if PROMPT_LAYOUT == "cached":
+        messages.append({
+            "role": "system",
+            "content": state_content
+        })
+    
+    # Add current player input
+    messages.append({
+        "role": "user",
+        "content": data.input
+    })
+
+    # Right-size the context window from the measured prompt size
+    prompt_tokens = estimate_message_tokens(messages)
+    num_ctx = choose_num_ctx(data.model, prompt_tokens)
+    log(f"PROMPT: ~{prompt_tokens} tokens (budget {PROMPT_TOKEN_BUDGET}), num_ctx {num_ctx}")
+    metrics.record("prompt_tokens_estimated", prompt_tokens)
+    metrics.record("num_ctx", num_ctx)
+
+    return {
+        "messages": messages,
+        "force_event": force_event,
+        "intel_strength": intel_strength,
+        "prompt_tokens": prompt_tokens,
+        "num_ctx": num_ctx,
+        "session": session,
+        "state_version": state_manager.version,
+        "reset_count": state_manager.state.get("reset_count", 0),
+        "intent": intent,
+        "combat": combat,
+        "cost": cost_check,
+        "event": director_event,
+        "event_key": director_key
+    }
+
+
+async def narrate_event(data, event, year, num_ctx):
+    """Short flavor narrative for a director event (its description if the call fails)"""
+    messages = get_event_flavor_messages(event, data.faction, year)
+    try:
+        # Same model and num_ctx as the turn, so Ollama does not reload it
+        text = await llm_client.chat_content(
+            data.model,
+            messages,
+            format=None,
+            options={"num_ctx": num_ctx, "num_predict": EVENT_FLAVOR_TOKENS},
+            timeout=60
+        )
+    except LLMError as e:
+        log(f"WARNING: Event narrative request failed: {e}")
+        text = ""
+    return text.strip() or event["description"]
+
+
+def start_event_flavor(data, turn):
+    """
+    Narrate the director's event (if any): reuse the narrative pre-generated
+    for this exact event and state, or start a short LLM call running
+    alongside the turn's.
+    """
+    event = turn["event"]
+    if not event:
+        return
+    session = turn["session"]
+    task = session.event_slot.claim(turn["event_key"], event)
+    if task is not None:
+        log("DIRECTOR: Using the pre-generated event narrative")
+    else:
+        year = session.state.state.get("year", 2027)
+        task = asyncio.create_task(narrate_event(data, event, year, turn["num_ctx"]))
+    turn["event_flavor"] = task
+
+
+def speculate_next_event(data, session, num_ctx):
+    """
+    After a turn: if the director will fire an event on the next turn (given
+    the current state), narrate it now in the background and park it.
+    """
+    state_manager = session.state
+    key = event_key(data, session)
+    event = direct_event(state_manager.state, data.faction, key[0])
+    if event is None:
+        session.event_slot.discard()
+        return
+    year = state_manager.state.get("year", 2027)
+    if session.event_slot.park(key, event, lambda: narrate_event(data, event, year, num_ctx)):
+        log(f"DIRECTOR: Pre-generating the narrative of next turn's event '{event['title']}'")
+
+
+def log_prompt_eval(ollama_data):
+    """Log Ollama's prompt evaluation stats (drops sharply on a prompt cache hit)"""
+    prompt_tokens = ollama_data.get("prompt_eval_count")
+    if prompt_tokens is None:
+        return
+    prompt_ms = ollama_data.get("prompt_eval_duration", 0) / 1e6
+    eval_tokens = ollama_data.get("eval_count", 0)
+    eval_ms = ollama_data.get("eval_duration", 0) / 1e6
+    metrics.record("prompt_tokens_measured", prompt_tokens)
+    metrics.record("prompt_eval_ms", round(prompt_ms))
+    metrics.record("eval_tokens", eval_tokens)
+    log(f"PERF: prompt eval {prompt_tokens} tokens in {prompt_ms:.0f} ms, generated {eval_tokens} tokens in {eval_ms:.0f} ms")
+
+
+def remember_exchange(data, history_store, narrative, num_ctx):
+    """Store the exchange and refresh the rolling summary in the background"""
+    history_store.add_exchange(data.input, narrative)
+    if not history_store.pending:
+        return
+
+    async def summarize(messages):
+        # Same model and num_ctx as the turn, so Ollama does not reload it
+        return await llm_client.chat_content(
+            data.model,
+            messages,
+            format=None,
+            options={"num_ctx": num_ctx, "num_predict": 256},
+            timeout=60
+        )
+
+    asyncio.create_task(history_store.update_summary(summarize))
+
+
+async def complete_turn(data, game_response, assistant_message, turn):
+    """
+    Finish a parsed LLM response (continuations, key fixes) and apply it to
+    the game state through the session's single-writer queue. Answers that
+    left the world unchanged go to the response cache (see cached_turn).
+    Returns the frontend payload.
+    """
+    messages = turn["messages"]
+    intel_strength = turn["intel_strength"]
+
+    # Debug logging to see what the LLM returned
+    log(f"DEBUG: LLM Response keys: {list(game_response.keys())}")
+    
+    if "territory_updates" in game_response:
+        log(f"DEBUG: territory_updates received: {game_response['territory_updates']}")
+    else:
+        log("WARNING: No territory_updates field in LLM response")
+    
+    # Absolute stats as the LLM reported them (applied in apply_turn)
+    reported_stats = dict(game_response["stats"]) if "stats" in game_response else None
+
+    # Check for truncation and retry up to 2 times
+    max_retries = 2
+    retry_count = 0
+    narrative = game_response.get("narrative", "")
+    
+    while narrative.strip().endswith("...") and retry_count < max_retries:
+        retry_count += 1
+        log(f"WARNING: Detected truncated response (attempt {retry_count}/{max_retries}), requesting continuation...")
         
-        # Add current player input
+        # Add the truncated response to messages and ask for continuation
+        messages.append({
+            "role": "assistant",
+            "content": json.dumps(game_response)
+        })
         messages.append({
             "role": "user",
-            "content": data.input
+            "content": "Your previous response was incomplete. Please continue and complete the narrative. Do not repeat what you already said, just continue from where you left off."
         })
         
-        # Call Ollama API
-        log(f"Sending request to Ollama (Model: {data.model}, Context: 16384)...")
+        # Retry with continuation request
         try:
-            ollama_response = requests.post(
-                OLLAMA_URL,
-                json={
-                    "model": data.model,  # Use model from request
-                    "messages": messages,
-                    "stream": False,
-                    "format": "json",  # Request JSON format
-                    "options": {
-                        "num_ctx": 16384
-                    }
-                },
-                timeout=120
+            retry_message = await llm_client.chat_content(
+                data.model,
+                messages,
+                options={"num_ctx": turn["num_ctx"]},
+                timeout=60
             )
+        except LLMError as e:
+            log(f"WARNING: Retry request failed: {e}")
+            break
+
+        try:
+            # Parse the continuation
+            continuation = json.loads(retry_message)
+            # Combine narratives by removing ellipsis and adding continuation
+            if "narrative" in continuation:
+                continuation_text = continuation["narrative"].strip()
+                # Remove leading ellipsis from continuation if present
+                if continuation_text.startswith("..."):
+                    continuation_text = continuation_text[3:].strip()
+                
+                game_response["narrative"] = narrative.rstrip(".").rstrip() + " " + continuation_text
+                narrative = game_response["narrative"]
+                log(f"Combined narrative, new length: {len(narrative)}")
+            else:
+                log("WARNING: Continuation missing narrative field")
+                break
+        except json.JSONDecodeError as e:
+            log(f"WARNING: Continuation failed to parse as JSON: {e}")
+            break
+    
+    if retry_count > 0:
+        if narrative.strip().endswith("..."):
+            log(f"WARNING: Response still truncated after {retry_count} retries")
+        else:
+            log(f"SUCCESS: Completed truncated response after {retry_count} retries")
+    
+    # FIX: Handle common hallucinations where LLM wraps narrative in "response", "answer", etc.
+    if "narrative" not in game_response:
+        # Check for common hallucinated keys
+        for bad_key in ["response", "answer", "content", "result", "output"]:
+            if bad_key in game_response:
+                log(f"WARNING: Found hallucinated key '{bad_key}', mapping to 'narrative'")
+                game_response["narrative"] = game_response[bad_key]
+                break
+    
+    # FIX: Handle structured data responses (e.g. "forces" list or dict) by converting to Markdown table
+    # Normalize keys: check for forces, military_forces, and allied_territories
+    forces_list = []
+    should_convert = False
+    
+    # Helper to process a potential forces container (list or dict)
+    def process_forces_container(container, context_label=""):
+        items = []
+        if isinstance(container, list):
+            items = container
+        elif isinstance(container, dict):
+             for k, v in container.items():
+                 if isinstance(v, dict):
+                     v["country"] = v.get("country", k)
+                     items.append(v)
+                 # Handle single flat dict as one entry if it has troops
+                 elif isinstance(v, (int, float)) and "troops" in container:
+                     container["country"] = container.get("country", context_label)
+                     items.append(container)
+                     break
+        return items
+
+    # Check "forces"
+    if "forces" in game_response:
+        should_convert = True
+        forces_list.extend(process_forces_container(game_response["forces"]))
+    
+    # Check "military_forces"
+    if "military_forces" in game_response:
+        should_convert = True
+        forces_list.extend(process_forces_container(game_response["military_forces"], game_response.get("country", "Unknown")))
+
+    # Check "allied_territories"
+    if "allied_territories" in game_response:
+        should_convert = True
+        forces_list.extend(process_forces_container(game_response["allied_territories"]))
+
+    if should_convert and forces_list:
+        log("WARNING: Found structured military data. Converting to Markdown table.")
+        
+        # Create table header
+        table_md = "\n\n| Country | Troops | Navy (Ships) | Air Force (Jets) |\n|---|---|---|---|\n"
+        
+        # Deduplicate by country name if needed, but for now just list them
+        for force in forces_list:
+            # Handle different potential keys the LLM might use
+            country = force.get("country", force.get("name", "Unknown"))
+            troops = force.get("troops", force.get("army", 0))
+            navy = force.get("ships", force.get("navy", force.get("naval_vessels", force.get("naval_units", 0))))
+            air = force.get("aircraft", force.get("air_force", force.get("jets", 0)))
             
-            if ollama_response.status_code != 200:
-                log(f"Ollama API Error: {ollama_response.status_code} - {ollama_response.text}")
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Ollama API error: {ollama_response.text}"
-                )
-        except Exception as e:
-            log(f"FAILED to connect to Ollama: {e}")
-            import traceback
-            traceback.print_exc()
-            raise HTTPException(status_code=500, detail=f"LLM Connection Failed: {str(e)}")
+            # Format numbers with commas
+            table_md += f"| {country} | {troops:,} | {navy:,} | {air:,} |\n"
+        
+        # Append totals if available
+        if "total_troops" in game_response:
+            table_md += f"\n**Total Strength**: {game_response.get('total_troops', 0):,} Troops, {game_response.get('total_ships', game_response.get('total_naval_units', 0)):,} Ships, {game_response.get('total_aircraft', 0):,} Aircraft"
+
+        # Use provided message or default intro
+        intro = game_response.get("message", "Here is the detailed breakdown of military forces:")
+        game_response["narrative"] = f"{intro}\n{table_md}"
+    
+    # Ensure stats object exists and inject current true values where possible
+    if "stats" not in game_response:
+        game_response["stats"] = {}
+        
+    # Inject current Intel Strength so frontend can display it
+    game_response["stats"]["intel"] = intel_strength
+    
+    # Validate required fields
+    if "narrative" not in game_response:
+        log("WARNING: Missing 'narrative' field in response")
+        # Fallback: If it's a string, use it. If it's a dict, try to convert to string
+        if isinstance(assistant_message, str):
+            game_response["narrative"] = assistant_message
+        else:
+             game_response["narrative"] = str(assistant_message)
+    
+    if "relationships" not in game_response:
+        game_response["relationships"] = {
+            "usa": {"sentiment": 0, "status": "neutral"},
+            "china": {"sentiment": 0, "status": "neutral"},
+            "russia": {"sentiment": 0, "status": "neutral"},
+            "eu": {"sentiment": 0, "status": "neutral"},
+            "india": {"sentiment": 0, "status": "neutral"}
+        }
+    
+    if turn["event"]:
+        # The director's event replaces anything the model put in "event"
+        game_response["event"] = dict(turn["event"])
+        flavor = await turn["event_flavor"]
+        game_response["narrative"] = f"{game_response['narrative']}\n\n{flavor}".strip()
+
+    session = turn["session"]
+    if "cache_key" in turn and is_non_mutating(game_response, reported_stats, session.state.state):
+        turn["cacheable_response"] = copy.deepcopy((game_response, reported_stats))
+    result = await session.writer.submit(apply_turn_atomically, data, game_response, reported_stats, turn)
+    # Store only if applying the answer really left the world untouched
+    if "cacheable_response" in turn and session.state.world_version == turn["cache_key"][1]:
+        response_cache.put(turn["cache_key"], turn["cacheable_response"])
+    if EVENT_DIRECTOR and SPECULATIVE_EVENTS:
+        speculate_next_event(data, session, turn["num_ctx"])
+    return result
+
+
+async def cached_turn(data, session, turn):
+    """
+    Payload for a question already answered in the same world, applied like
+    a fresh answer; None otherwise. On a miss the turn gets its cache key,
+    so complete_turn() stores the answer.
+    """
+    if not RESPONSE_CACHE or turn["force_event"] or not is_question(turn["intent"]):
+        return None
+    cache_key = ResponseCache.make_key(session.game_id, session.state.world_version,
+                                       data.faction, data.model, data.input)
+    cached = response_cache.get(cache_key)
+    if cached is None:
+        turn["cache_key"] = cache_key
+        return None
+    log("CACHE: World unchanged since this question was answered, reusing the answer")
+    game_response, reported_stats = copy.deepcopy(cached)
+    return await session.writer.submit(apply_turn_atomically, data, game_response, reported_stats, turn)
+
+
+def apply_turn_atomically(data, game_response, reported_stats, turn):
+    """apply_turn inside a storage transaction (serializes worker processes on shared storage)"""
+    with turn["session"].state.transaction():
+        return apply_turn(data, game_response, reported_stats, turn)
+
+
+def apply_turn(data, game_response, reported_stats, turn):
+    """
+    Apply a finished turn to the game state and build the frontend payload.
+    Runs on the session's state writer, one turn at a time.
+    """
+    state_manager = turn["session"].state
+    force_event = turn["force_event"]
+    intel_strength = turn["intel_strength"]
+
+    # The game was reset while this turn was generating: it belongs to the
+    # old game, so none of it is applied or remembered
+    if state_manager.state.get("reset_count", 0) != turn["reset_count"]:
+        log("SCHEDULER: Game was reset while this turn was generating; discarding it")
+        metrics.incr("discarded_turns")
+        game_response["stats"] = frontend_stats(state_manager, intel_strength)
+        game_response["event"] = {"type": "player_response", "triggered": False}
+        attach_world(game_response, state_manager, data.faction)
+        return game_response
+
+    # The prompt was built from an older state if another turn of this game
+    # was applied while this one was generating. Deltas still apply on top of
+    # the newer state; absolute values would overwrite it, so they are dropped.
+    stale = state_manager.version != turn["state_version"]
+    if stale:
+        log(f"SCHEDULER: Turn built on state v{turn['state_version']}, now v{state_manager.version}; dropping absolute stats")
+        metrics.incr("stale_turns")
+
+    # With the director on, random events only come from it
+    if EVENT_DIRECTOR and not turn["event"] and (game_response.get("event") or {}).get("triggered"):
+        log(f"WARNING: Ignoring event invented by the model: {game_response['event'].get('title')}")
+        game_response["event"] = {"type": "player_response", "triggered": False}
+
+    # Charge the server-side price, or undo a rejected action entirely
+    if turn["cost"]:
+        enforce_cost(game_response, turn["cost"])
+
+    # The combat engine's outcome replaces any numbers the model came up with
+    if turn["combat"]:
+        game_response["military_updates"] = turn["combat"]["military_updates"]
+        game_response["territory_updates"] = turn["combat"]["territory_updates"]
+
+    # Process military updates
+    if "military_updates" in game_response:
+        state_manager.update_military(game_response["military_updates"])
+
+    # Process territory updates
+    if "territory_updates" in game_response:
+        state_manager.update_territory(game_response["territory_updates"])
+
+    # Process global stats updates (Resources, Turn Count, etc.)
+    if reported_stats and not stale:
+        # Update individual keys to preserve existing ones not returned
+        for key, value in reported_stats.items():
+            state_manager.set_value(key, value)
+        
+        # Use budget/resources mapping fallback for backend consistency if needed
+        if "budget" in reported_stats:
+            state_manager.set_value("resources", reported_stats["budget"])
+
+    # ------------------------------------------------------------------
+    # STATE UPDATE LOGIC (DELTAS)
+    # ------------------------------------------------------------------
+    # 1. Handle Global Stats (Absolute)
+    if "general_stats" in game_response and not stale:
+        gen_stats = game_response["general_stats"]
+        if "defcon" in gen_stats:
+            state_manager.set_value("defcon", gen_stats["defcon"])
+        if "year" in gen_stats:
+            state_manager.set_value("year", gen_stats["year"])
+    
+    # 2. Handle Resource Updates (Deltas)
+    if "resource_updates" in game_response:
+        updates = game_response["resource_updates"]
+        apply_delta = state_manager.apply_delta  # Delta with clamp at 0
+
+        apply_delta("resources", updates.get("budget", 0)) # Mapped to 'resources' internally
+        apply_delta("oil", updates.get("oil", 0))
+        apply_delta("tech", updates.get("tech", 0))
+        apply_delta("influence", updates.get("influence", 0))
+
+        # Increment turn count if not explicit
+        state_manager.set_value("turn_count", state_manager.state.get("turn_count", 0) + 1)
+    
+    # 2b. Apply Event Impact (if relevant)
+    # The AI might put negative costs in event.impact for Crises
+    if "event" in game_response and game_response["event"].get("triggered"):
+         impact = game_response["event"].get("impact", {})
+         if impact:
+             log(f"EVENT IMPACT DETECTED: {impact}")
+             apply_delta = state_manager.apply_delta
+             apply_delta("resources", impact.get("budget", 0))
+             apply_delta("oil", impact.get("oil", 0))
+             apply_delta("tech", impact.get("tech", 0))
+             apply_delta("influence", impact.get("influence", 0))
+
+    # 3. Fallback for legacy 'stats' object (if LLM ignores instructions)
+    elif "stats" in game_response and not stale:
+        # If LLM returns absolute stats, we try to use them but warn
+        log("WARNING: LLM returned absolute 'stats' instead of 'resource_updates'. Using as absolute values.")
+        old_stats = game_response["stats"]
+        for k, v in old_stats.items():
+            if k == 'budget': k = 'resources' # Map back
+            if k in state_manager.state:
+                 state_manager.set_value(k, v)
+
+    # ------------------------------------------------------------------
+    # CONSTRUCT FRONTEND RESPONSE
+    # ------------------------------------------------------------------
+    # Replace/Inject into game_response for frontend
+    game_response["stats"] = frontend_stats(state_manager, intel_strength)
+    
+    if "event" not in game_response:
+        game_response["event"] = {
+            "type": "player_response",
+            "triggered": False
+        }
+    else:
+        # Validate event type - if it looks like a direct response to player input, 
+        # it shouldn't be a random_event
+        event = game_response.get("event", {})
+        
+        # Safety check: if narrative seems to be answering the player's question,
+        # it should not be marked as random_event
+        if event.get("type") == "random_event":
+            # Check if the recent player input is being directly addressed
+            # BUT if we forced the event, trust the Director
+            if not force_event and is_question(turn["intent"]):
+                log(f"WARNING: Correcting event type - player asked a question: '{data.input[:50]}'")
+                game_response["event"] = {
+                    "type": "player_response",
+                    "triggered": False
+                }
+            
+        # Update Last Event Turn if a real event triggered
+        if game_response["event"].get("triggered") and game_response["event"].get("type") != "player_response":
+            state_manager.set_value("last_event_turn", state_manager.state.get("turn_count", 0))
+            state_manager.set_value("last_event_data", {
+                "title": game_response["event"].get("title", "Unknown Event"),
+                "description": game_response["event"].get("description", "No description provided."),
+                "template": game_response["event"].get("template")
+            })
+            log(f"EVENT TRIGGERED: Recorded at turn {state_manager.state['last_event_turn']}")
+
+    # Single coalesced write for everything this turn changed
+    state_manager.end_turn()
+
+    attach_world(game_response, state_manager, data.faction)
+
+    remember_exchange(data, turn["session"].history, game_response.get("narrative", ""), turn["num_ctx"])
+
+    return game_response
+
+
+def attach_world(game_response, state_manager, faction):
+    """Inject the territory and military state the frontend syncs its map from"""
+    game_response["current_territories"] = state_manager.state.get("ownership", {})
+    # Military data for the hover info panel
+    game_response["military_data"] = state_manager.state.get("military", {})
+    game_response["intel_strength"] = state_manager.get_intel_strength(faction)
+
+
+def frontend_stats(state_manager, intel_strength):
+    """Frontend expects a single flattened 'stats' object with absolute values"""
+    return {
+        "defcon": state_manager.state.get("defcon", 5),
+        "year": state_manager.state.get("year", 2027),
+        "budget": state_manager.state.get("resources", 1000),
+        "oil": state_manager.state.get("oil", 100),
+        "tech": state_manager.state.get("tech", 50),
+        "influence": state_manager.state.get("influence", 50),
+        "turn_count": state_manager.state.get("turn_count", 0),
+        "intel": intel_strength # Inject current intel
+    }
+
+
+def local_query_response(data, session, query):
+    """
+    Frontend payload for a data query (from the intent classifier) answered
+    from the game state, without the LLM. Reading data doesn't use up a turn.
+    """
+    state_manager = session.state
+    state_manager.refresh()
+    narrative = answer_query(data.input, data.faction, state_manager, session.game_id, query)
+    log("QUERY: Answered data query locally from the game state")
+    metrics.incr("local_queries")
+    intel_strength = state_manager.get_intel_strength(data.faction)
+    # Keep the exchange in the history so follow-ups to the model have context
+    remember_exchange(data, session.history, narrative, choose_num_ctx(data.model, 0))
+    return {
+        "narrative": narrative,
+        "stats": frontend_stats(state_manager, intel_strength),
+        "event": {"type": "player_response", "triggered": False},
+        "relationships": state_manager.state.get("relationships", {}),
+        "current_territories": state_manager.state.get("ownership", {}),
+        "military_data": state_manager.state.get("military", {}),
+        "intel_strength": intel_strength
+    }
+
+
+def llm_error_detail(e):
+    """User-facing message for an LLMError"""
+    if e.status_code == 503:
+        return "Cannot connect to Ollama. Make sure Ollama is running (ollama serve)"
+    if e.status_code == 504:
+        return "Ollama request timed out. The model might be processing."
+    return f"LLM Connection Failed: {str(e)}"
+
+
+def fallback_turn_response(assistant_message):
+    """Response used when the LLM output is not valid JSON"""
+    log(f"Raw response: {assistant_message[:200]}...")
+    return {
+        "narrative": assistant_message if assistant_message else "Error: The AI system encountered an issue generating a response. Please try again.",
+        "stats": {
+            "defcon": 5,
+            "year": 2027,
+            "resources": 1000,
+            "influence": 50,
+            "turn_count": 1
+        },
+        "event": {
+            "type": "player_response",
+            "triggered": False
+        },
+        "relationships": {
+            "usa": {"sentiment": 0, "status": "neutral"},
+            "china": {"sentiment": 0, "status": "neutral"},
+            "russia": {"sentiment": 0, "status": "neutral"},
+            "eu": {"sentiment": 0, "status": "neutral"},
+            "india": {"sentiment": 0, "status": "neutral"}
+        }
+    }
+
+
+@app.post("/api/turn")
+async def process_turn(data: PlayerInput):
+    """
+    Process a player's turn by sending it to Ollama and returning the response
+    """
+    log(f"--> RECEIVED /api/turn REQUEST from {data.faction} (game {data.game_id})")
+    log(f"    Input: {data.input}")
+    check_game_id(data.game_id)
+    with sessions.use(data.game_id) as session:
+        return await run_turn(data, session)
+
+
+async def run_turn(data, session):
+    try:
+        intent, pipeline, data = route_turn(data, session)
+        if pipeline == "local":
+            return local_query_response(data, session, intent["query"])
+
+        turn = build_turn_messages(data, session, intent)
+        cached = await cached_turn(data, session, turn)
+        if cached is not None:
+            return cached
+
+        start_event_flavor(data, turn)
+
+        # Call Ollama API (non-blocking: other turns keep running while we wait)
+        log(f"Sending request to Ollama (Model: {data.model}, Context: {turn['num_ctx']})...")
+        ollama_data = await llm_client.chat(
+            data.model,  # Use model from request
+            turn["messages"],
+            options={
+                "num_ctx": turn["num_ctx"]
+            },
+            timeout=120
+        )
 
         # Parse Ollama response
         log("Received response from Ollama. Parsing...")
-        ollama_data = ollama_response.json()
+        log_prompt_eval(ollama_data)
         assistant_message = ollama_data.get("message", {}).get("content", "")
         
         # Check if response is empty
@@ -185,356 +1008,21 @@ async def process_turn(data: PlayerInput):
         # Parse the JSON response from the LLM
         try:
             game_response = json.loads(assistant_message)
-            
-            # Debug logging to see what the LLM returned
-            log(f"DEBUG: LLM Response keys: {list(game_response.keys())}")
-            
-            if "reasoning" in game_response:
-                log(f"🧠 AI REASONING: {game_response['reasoning']}")
-                
-            if "territory_updates" in game_response:
-                log(f"DEBUG: territory_updates received: {game_response['territory_updates']}")
-            else:
-                log("WARNING: No territory_updates field in LLM response")
-            
-            # Process military updates
-            if "military_updates" in game_response:
-                state_manager.update_military(game_response["military_updates"])
-
-            # Process territory updates
-            if "territory_updates" in game_response:
-                state_manager.update_territory(game_response["territory_updates"])
-
-            # Process global stats updates (Resources, Turn Count, etc.)
-            if "stats" in game_response:
-                # Update individual keys to preserve existing ones not returned
-                for key, value in game_response["stats"].items():
-                    state_manager.state[key] = value
-                
-                # Use budget/resources mapping fallback for backend consistency if needed
-                if "budget" in game_response["stats"]:
-                    state_manager.state["resources"] = game_response["stats"]["budget"]
-                
-                state_manager.save_state()
-
-            # Check for truncation and retry up to 2 times
-            max_retries = 2
-            retry_count = 0
-            narrative = game_response.get("narrative", "")
-            
-            while narrative.strip().endswith("...") and retry_count < max_retries:
-                retry_count += 1
-                log(f"WARNING: Detected truncated response (attempt {retry_count}/{max_retries}), requesting continuation...")
-                
-                # Add the truncated response to messages and ask for continuation
-                messages.append({
-                    "role": "assistant",
-                    "content": json.dumps(game_response)
-                })
-                messages.append({
-                    "role": "user",
-                    "content": "Your previous response was incomplete. Please continue and complete the narrative. Do not repeat what you already said, just continue from where you left off."
-                })
-                
-                # Retry with continuation request
-                retry_response = requests.post(
-                    OLLAMA_URL,
-                    json={
-                        "model": data.model,
-                        "messages": messages,
-                        "stream": False,
-                        "format": "json"
-                    },
-                    timeout=60
-                )
-                
-                if retry_response.status_code == 200:
-                    retry_data = retry_response.json()
-                    retry_message = retry_data.get("message", {}).get("content", "")
-                    
-                    try:
-                        # Parse the continuation
-                        continuation = json.loads(retry_message)
-                        # Combine narratives by removing ellipsis and adding continuation
-                        if "narrative" in continuation:
-                            continuation_text = continuation["narrative"].strip()
-                            # Remove leading ellipsis from continuation if present
-                            if continuation_text.startswith("..."):
-                                continuation_text = continuation_text[3:].strip()
-                            
-                            game_response["narrative"] = narrative.rstrip(".").rstrip() + " " + continuation_text
-                            narrative = game_response["narrative"]
-                            log(f"Combined narrative, new length: {len(narrative)}")
-                        else:
-                            log("WARNING: Continuation missing narrative field")
-                            break
-                    except json.JSONDecodeError as e:
-                        log(f"WARNING: Continuation failed to parse as JSON: {e}")
-                        break
-                else:
-                    log(f"WARNING: Retry request failed with status {retry_response.status_code}")
-                    break
-            
-            if retry_count > 0:
-                if narrative.strip().endswith("..."):
-                    log(f"WARNING: Response still truncated after {retry_count} retries")
-                else:
-                    log(f"SUCCESS: Completed truncated response after {retry_count} retries")
-            
-            # FIX: Handle common hallucinations where LLM wraps narrative in "response", "answer", etc.
-            if "narrative" not in game_response:
-                # Check for common hallucinated keys
-                for bad_key in ["response", "answer", "content", "result", "output"]:
-                    if bad_key in game_response:
-                        log(f"WARNING: Found hallucinated key '{bad_key}', mapping to 'narrative'")
-                        game_response["narrative"] = game_response[bad_key]
-                        break
-            
-            # FIX: Handle structured data responses (e.g. "forces" list or dict) by converting to Markdown table
-            # Normalize keys: check for forces, military_forces, and allied_territories
-            forces_list = []
-            should_convert = False
-            
-            # Helper to process a potential forces container (list or dict)
-            def process_forces_container(container, context_label=""):
-                items = []
-                if isinstance(container, list):
-                    items = container
-                elif isinstance(container, dict):
-                     for k, v in container.items():
-                         if isinstance(v, dict):
-                             v["country"] = v.get("country", k)
-                             items.append(v)
-                         # Handle single flat dict as one entry if it has troops
-                         elif isinstance(v, (int, float)) and "troops" in container:
-                             container["country"] = container.get("country", context_label)
-                             items.append(container)
-                             break
-                return items
-
-            # Check "forces"
-            if "forces" in game_response:
-                should_convert = True
-                forces_list.extend(process_forces_container(game_response["forces"]))
-            
-            # Check "military_forces"
-            if "military_forces" in game_response:
-                should_convert = True
-                forces_list.extend(process_forces_container(game_response["military_forces"], game_response.get("country", "Unknown")))
-
-            # Check "allied_territories"
-            if "allied_territories" in game_response:
-                should_convert = True
-                forces_list.extend(process_forces_container(game_response["allied_territories"]))
-
-            if should_convert and forces_list:
-                log("WARNING: Found structured military data. Converting to Markdown table.")
-                
-                # Create table header
-                table_md = "\n\n| Country | Troops | Navy (Ships) | Air Force (Jets) |\n|---|---|---|---|\n"
-                
-                # Deduplicate by country name if needed, but for now just list them
-                for force in forces_list:
-                    # Handle different potential keys the LLM might use
-                    country = force.get("country", force.get("name", "Unknown"))
-                    troops = force.get("troops", force.get("army", 0))
-                    navy = force.get("ships", force.get("navy", force.get("naval_vessels", force.get("naval_units", 0))))
-                    air = force.get("aircraft", force.get("air_force", force.get("jets", 0)))
-                    
-                    # Format numbers with commas
-                    table_md += f"| {country} | {troops:,} | {navy:,} | {air:,} |\n"
-                
-                # Append totals if available
-                if "total_troops" in game_response:
-                    table_md += f"\n**Total Strength**: {game_response.get('total_troops', 0):,} Troops, {game_response.get('total_ships', game_response.get('total_naval_units', 0)):,} Ships, {game_response.get('total_aircraft', 0):,} Aircraft"
-
-                # Use provided message or default intro
-                intro = game_response.get("message", "Here is the detailed breakdown of military forces:")
-                game_response["narrative"] = f"{intro}\n{table_md}"
-            
-            # Ensure stats object exists and inject current true values where possible
-            if "stats" not in game_response:
-                game_response["stats"] = {}
-                
-            # Inject current Intel Strength so frontend can display it
-            game_response["stats"]["intel"] = intel_strength
-            
-            # Validate required fields
-            if "narrative" not in game_response:
-                log("WARNING: Missing 'narrative' field in response")
-                # Fallback: If it's a string, use it. If it's a dict, try to convert to string
-                if isinstance(assistant_message, str):
-                    game_response["narrative"] = assistant_message
-                else:
-                     game_response["narrative"] = str(assistant_message)
-            
-            if "relationships" not in game_response:
-                game_response["relationships"] = {
-                    "usa": {"sentiment": 0, "status": "neutral"},
-                    "china": {"sentiment": 0, "status": "neutral"},
-                    "russia": {"sentiment": 0, "status": "neutral"},
-                    "eu": {"sentiment": 0, "status": "neutral"},
-                    "india": {"sentiment": 0, "status": "neutral"}
-                }
-            
-            # ------------------------------------------------------------------
-            # STATE UPDATE LOGIC (DELTAS)
-            # ------------------------------------------------------------------
-            # 1. Handle Global Stats (Absolute)
-            if "general_stats" in game_response:
-                gen_stats = game_response["general_stats"]
-                if "defcon" in gen_stats:
-                    state_manager.state["defcon"] = gen_stats["defcon"]
-                if "year" in gen_stats:
-                    state_manager.state["year"] = gen_stats["year"]
-            
-            # 2. Handle Resource Updates (Deltas)
-            if "resource_updates" in game_response:
-                updates = game_response["resource_updates"]
-                
-                # Helper to apply delta with clamp
-                def apply_delta(key, delta):
-                    current = state_manager.state.get(key, 0)
-                    new_val = max(0, current + delta)
-                    state_manager.state[key] = new_val
-                    return new_val
-
-                apply_delta("resources", updates.get("budget", 0)) # Mapped to 'resources' internally
-                apply_delta("oil", updates.get("oil", 0))
-                apply_delta("tech", updates.get("tech", 0))
-                apply_delta("influence", updates.get("influence", 0))
-
-                # Increment turn count if not explicit
-                state_manager.state["turn_count"] = state_manager.state.get("turn_count", 0) + 1
-            
-            # 2b. Apply Event Impact (if relevant)
-            # The AI might put negative costs in event.impact for Crises
-            if "event" in game_response and game_response["event"].get("triggered"):
-                 impact = game_response["event"].get("impact", {})
-                 if impact:
-                     log(f"EVENT IMPACT DETECTED: {impact}")
-                     apply_delta("resources", impact.get("budget", 0))
-                     apply_delta("oil", impact.get("oil", 0))
-                     apply_delta("tech", impact.get("tech", 0))
-                     apply_delta("influence", impact.get("influence", 0))
-
-            # 3. Fallback for legacy 'stats' object (if LLM ignores instructions)
-            elif "stats" in game_response:
-                # If LLM returns absolute stats, we try to use them but warn
-                log("WARNING: LLM returned absolute 'stats' instead of 'resource_updates'. Using as absolute values.")
-                old_stats = game_response["stats"]
-                for k, v in old_stats.items():
-                    if k == 'budget': k = 'resources' # Map back
-                    if k in state_manager.state:
-                         state_manager.state[k] = v
-            
-            # Save the updated state
-            state_manager.save_state()
-
-            # ------------------------------------------------------------------
-            # CONSTRUCT FRONTEND RESPONSE
-            # ------------------------------------------------------------------
-            # Frontend expects a single flattened 'stats' object with absolute values
-            final_stats = {
-                "defcon": state_manager.state.get("defcon", 5),
-                "year": state_manager.state.get("year", 2027),
-                "budget": state_manager.state.get("resources", 1000),
-                "oil": state_manager.state.get("oil", 100),
-                "tech": state_manager.state.get("tech", 50),
-                "influence": state_manager.state.get("influence", 50),
-                "turn_count": state_manager.state.get("turn_count", 0),
-                "intel": intel_strength # Inject current intel
-            }
-            
-            # Replace/Inject into game_response for frontend
-            game_response["stats"] = final_stats
-            
-            if "event" not in game_response:
-                game_response["event"] = {
-                    "type": "player_response",
-                    "triggered": False
-                }
-            else:
-                # Validate event type - if it looks like a direct response to player input, 
-                # it shouldn't be a random_event
-                event = game_response.get("event", {})
-                
-                # Safety check: if narrative seems to be answering the player's question,
-                # it should not be marked as random_event
-                if event.get("type") == "random_event":
-                    # Check if the recent player input is being directly addressed
-                    # BUT if we forced the event, trust the Director
-                    if not force_event:
-                        player_input = data.input.lower()
-                        
-                        # Common patterns that indicate a direct response
-                        question_words = ["what", "how", "why", "when", "where", "who", "is", "are", "can", "will", "would"]
-                        is_question = any(player_input.strip().startswith(word) for word in question_words)
-                        
-                        if is_question:
-                            log(f"WARNING: Correcting event type - player asked a question: '{data.input[:50]}'")
-                            game_response["event"] = {
-                                "type": "player_response",
-                                "triggered": False
-                            }
-                    
-                # Update Last Event Turn if a real event triggered
-                if game_response["event"].get("triggered") and game_response["event"].get("type") != "player_response":
-                    state_manager.state["last_event_turn"] = state_manager.state.get("turn_count", 0)
-                    state_manager.state["last_event_data"] = {
-                        "title": game_response["event"].get("title", "Unknown Event"),
-                        "description": game_response["event"].get("description", "No description provided.")
-                    }
-                    state_manager.save_state()
-                    log(f"EVENT TRIGGERED: Recorded at turn {state_manager.state['last_event_turn']}")
-
-            # Inject full territory state for frontend sync
-            game_response["current_territories"] = state_manager.state.get("ownership", {})
-            
-            # Inject military data for hover info panel
-            game_response["military_data"] = state_manager.state.get("military", {})
-            game_response["intel_strength"] = state_manager.get_intel_strength(data.faction)
-
-            return game_response
-            
         except json.JSONDecodeError as e:
-            # Fallback if LLM doesn't return valid JSON
+            # Salvage every completed field from a truncated/malformed response
             log(f"WARNING: Failed to parse JSON: {e}")
-            log(f"Raw response: {assistant_message[:200]}...")
-            return {
-                "narrative": assistant_message if assistant_message else "Error: The AI system encountered an issue generating a response. Please try again.",
-                "stats": {
-                    "defcon": 5,
-                    "year": 2027,
-                    "resources": 1000,
-                    "influence": 50,
-                    "turn_count": 1
-                },
-                "event": {
-                    "type": "player_response",
-                    "triggered": False
-                },
-                "relationships": {
-                    "usa": {"sentiment": 0, "status": "neutral"},
-                    "china": {"sentiment": 0, "status": "neutral"},
-                    "russia": {"sentiment": 0, "status": "neutral"},
-                    "eu": {"sentiment": 0, "status": "neutral"},
-                    "india": {"sentiment": 0, "status": "neutral"}
-                }
-            }
+            game_response = parse_partial(assistant_message)
+            if "narrative" not in game_response:
+                return fallback_turn_response(assistant_message)
+            log(f"Recovered fields from partial response: {list(game_response.keys())}")
+
+        return await complete_turn(data, game_response, assistant_message, turn)
     
-    except requests.exceptions.ConnectionError:
-        log("ERROR: Cannot connect to Ollama")
-        raise HTTPException(
-            status_code=503,
-            detail="Cannot connect to Ollama. Make sure Ollama is running (ollama serve)"
-        )
-    except requests.exceptions.Timeout:
-        log("ERROR: Ollama request timed out")
-        raise HTTPException(
-            status_code=504,
-            detail="Ollama request timed out. The model might be processing."
-        )
+    except HTTPException:
+        raise
+    except LLMError as e:
+        log(f"ERROR: LLM call failed: {e}")
+        raise HTTPException(status_code=e.status_code, detail=llm_error_detail(e))
     except Exception as e:
         log(f"ERROR: Unexpected error occurred: {type(e).__name__}: {str(e)}")
         import traceback
@@ -544,114 +1032,224 @@ async def process_turn(data: PlayerInput):
             detail=f"Unexpected error: {str(e)}"
         )
 
+# Top-level response fields previewed to the client as soon as they close
+STREAMED_DELTA_FIELDS = ("resource_updates", "territory_updates", "military_updates", "event")
+
+
+def sse_event(event, payload):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+async def turn_stream_events(data, session):
+    """SSE events for one streamed turn (see process_turn_stream)"""
+    try:
+        intent, pipeline, data = route_turn(data, session)
+        if pipeline == "local":
+            local = local_query_response(data, session, intent["query"])
+            yield sse_event("narrative", {"text": local["narrative"]})
+            yield sse_event("result", local)
+            return
+        turn = build_turn_messages(data, session, intent)
+        cached = await cached_turn(data, session, turn)
+    except HTTPException as e:
+        yield sse_event("error", {"detail": e.detail})
+        return
+    if cached is not None:
+        yield sse_event("narrative", {"text": cached["narrative"]})
+        yield sse_event("result", cached)
+        return
+    start_event_flavor(data, turn)
+
+    parser = StreamingJSONParser()
+    assistant_message = ""
+    stream_error = None
+    try:
+        log(f"Streaming request to Ollama (Model: {data.model}, Context: {turn['num_ctx']})...")
+        async for chunk in llm_client.chat_stream(
+            data.model,
+            turn["messages"],
+            options={
+                "num_ctx": turn["num_ctx"]
+            },
+            timeout=120
+        ):
+            if chunk.get("done"):
+                log_prompt_eval(chunk)
+            content = chunk.get("message", {}).get("content", "")
+            if not content:
+                continue
+            assistant_message += content
+            for parsed in parser.feed(content):
+                if parsed["type"] == FIELD_CHUNK and parsed["field"] == "narrative":
+                    yield sse_event("narrative", {"text": parsed["text"]})
+                elif parsed["type"] == FIELD_COMPLETE and parsed["field"] in STREAMED_DELTA_FIELDS:
+                    # Preview only: state is applied once the document is complete
+                    yield sse_event("field", {"field": parsed["field"], "value": parsed["value"]})
+    except LLMError as e:
+        log(f"ERROR: LLM stream failed: {e}")
+        stream_error = e
+
+    if parser.complete:
+        game_response = parser.result()
+    else:
+        # Cut off (stream error or malformed tail): keep every completed field
+        game_response = parser.salvage()
+        if "narrative" not in game_response:
+            if stream_error is not None:
+                yield sse_event("error", {"detail": llm_error_detail(stream_error)})
+            elif not assistant_message.strip():
+                log("WARNING: Empty response from Ollama")
+                yield sse_event("error", {"detail": "LLM returned empty response. Try again or check model."})
+            else:
+                log("WARNING: Failed to parse streamed JSON")
+                yield sse_event("result", fallback_turn_response(assistant_message))
+            return
+        log(f"Recovered fields from partial stream: {list(game_response.keys())}")
+
+    try:
+        result = await complete_turn(data, game_response, assistant_message, turn)
+    except Exception as e:
+        log(f"ERROR: Unexpected error occurred: {type(e).__name__}: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        yield sse_event("error", {"detail": f"Unexpected error: {str(e)}"})
+        return
+    yield sse_event("result", result)
+
+
+@app.post("/api/turn/stream")
+async def process_turn_stream(data: PlayerInput):
+    """
+    Streaming variant of /api/turn (Server-Sent Events).
+    Emits `narrative` events with text as it is generated, `field` events
+    as soon as each state delta subtree closes, then a single `result` event
+    carrying the same payload /api/turn would return (state deltas already
+    applied). Failures are reported as an `error` event.
+    """
+    log(f"--> RECEIVED /api/turn/stream REQUEST from {data.faction} (game {data.game_id})")
+    log(f"    Input: {data.input}")
+    check_game_id(data.game_id)
+
+    async def event_generator():
+        with sessions.use(data.game_id) as session:
+            async for event in turn_stream_events(data, session):
+                yield event
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def compose_briefing(faction_id, faction_name, model):
+    """
+    Ask the model for an opening briefing (plus a continuation if it was cut
+    off). Returns (briefing dict or None if unparsable, raw model output).
+    """
+    from prompts import get_briefing_prompt
+
+    messages = [
+        {
+            "role": "system",
+            "content": get_briefing_prompt(faction_id, faction_name)
+        },
+        {
+            "role": "user",
+            "content": "Generate the initial world briefing for my faction."
+        }
+    ]
+
+    # Call Ollama
+    assistant_message = await llm_client.chat_content(model, messages, timeout=60)
+
+    log(f"Ollama response received, length: {len(assistant_message)}")
+
+    try:
+        briefing_response = json.loads(assistant_message)
+    except json.JSONDecodeError as e:
+        log(f"WARNING: Failed to parse briefing JSON: {e}")
+        return None, assistant_message
+
+    # Check for truncation
+    narrative = briefing_response.get("narrative", "")
+    if narrative.strip().endswith("..."):
+        log("WARNING: Detected truncated briefing, requesting continuation...")
+
+        messages.append({
+            "role": "assistant",
+            "content": assistant_message
+        })
+        messages.append({
+            "role": "user",
+            "content": "Continue your briefing. Complete the narrative where you left off."
+        })
+
+        try:
+            retry_message = await llm_client.chat_content(model, messages, timeout=60)
+            continuation = json.loads(retry_message)
+            if "narrative" in continuation:
+                briefing_response["narrative"] = narrative.rstrip("...") + " " + continuation["narrative"]
+            log("Successfully retrieved briefing continuation")
+        except LLMError as e:
+            log(f"WARNING: Briefing continuation request failed: {e}")
+        except json.JSONDecodeError:
+            log("WARNING: Briefing continuation failed to parse")
+
+    if "relationships" not in briefing_response:
+        briefing_response["relationships"] = {
+            "usa": {"sentiment": 0, "status": "neutral"},
+            "china": {"sentiment": 0, "status": "neutral"},
+            "russia": {"sentiment": 0, "status": "neutral"},
+            "eu": {"sentiment": 0, "status": "neutral"},
+            "india": {"sentiment": 0, "status": "neutral"}
+        }
+    return briefing_response, assistant_message
+
+
+async def pregenerate_briefing(faction_id, faction_name, model):
+    """Background briefing for the pool (unparsable ones are not kept)"""
+    log(f"BRIEFINGS: Pre-generating a briefing for {faction_name} ({model})")
+    return (await compose_briefing(faction_id, faction_name, model))[0]
+
+
+briefing_pool = BriefingPool(pregenerate_briefing)
+
+
+def prefill_briefings():
+    """Fill the briefing pool for every faction on the default model"""
+    for faction_id, faction_name in BRIEFING_FACTIONS.items():
+        briefing_pool.fill(faction_id, faction_name, MODEL_NAME)
+
+
 @app.post("/api/briefing")
 async def generate_briefing(data: dict):
     """Generate initial world briefing based on selected faction"""
-    from prompts import get_briefing_prompt
-    
+    game_id = data.get("game_id", DEFAULT_GAME_ID)
+    check_game_id(game_id)
+    with sessions.use(game_id) as session:
+        return await run_briefing(data, session)
+
+
+async def run_briefing(data, session):
     try:
         faction_id = data.get("faction")
         faction_name = data.get("factionName")
         model = data.get("model", MODEL_NAME)
-        
-        log(f"Generating briefing for faction: {faction_name}")
-        
-        # Build the briefing request
-        messages = [
-            {
-                "role": "system",
-                "content": get_briefing_prompt(faction_id, faction_name)
-            },
-            {
-                "role": "user",
-                "content": "Generate the initial world briefing for my faction."
-            }
-        ]
-        
-        # Call Ollama
-        ollama_response = requests.post(
-            OLLAMA_URL,
-            json={
-                "model": model,
-                "messages": messages,
-                "stream": False,
-                "format": "json"
-            },
-            timeout=60
-        )
-        
-        if ollama_response.status_code != 200:
-            log(f"ERROR: Ollama API error: {ollama_response.text}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Ollama API error: {ollama_response.text}"
-            )
-        
-        # Parse response
-        ollama_data = ollama_response.json()
-        assistant_message = ollama_data.get("message", {}).get("content", "")
-        
-        log(f"Ollama response received, length: {len(assistant_message)}")
-        
-        try:
-            briefing_response = json.loads(assistant_message)
-            
-            # Check for truncation
-            narrative = briefing_response.get("narrative", "")
-            if narrative.strip().endswith("..."):
-                log("WARNING: Detected truncated briefing, requesting continuation...")
-                
-                messages.append({
-                    "role": "assistant",
-                    "content": assistant_message
-                })
-                messages.append({
-                    "role": "user",
-                    "content": "Continue your briefing. Complete the narrative where you left off."
-                })
-                
-                retry_response = requests.post(
-                    OLLAMA_URL,
-                    json={
-                        "model": model,
-                        "messages": messages,
-                        "stream": False,
-                        "format": "json"
-                    },
-                    timeout=60
-                )
-                
-                if retry_response.status_code == 200:
-                    retry_data = retry_response.json()
-                    retry_message = retry_data.get("message", {}).get("content", "")
-                    
-                    try:
-                        continuation = json.loads(retry_message)
-                        if "narrative" in continuation:
-                            briefing_response["narrative"] = narrative.rstrip("...") + " " + continuation["narrative"]
-                        log("Successfully retrieved briefing continuation")
-                    except json.JSONDecodeError:
-                        log("WARNING: Briefing continuation failed to parse")
-            
-            if "relationships" not in briefing_response:
-                briefing_response["relationships"] = {
-                    "usa": {"sentiment": 0, "status": "neutral"},
-                    "china": {"sentiment": 0, "status": "neutral"},
-                    "russia": {"sentiment": 0, "status": "neutral"},
-                    "eu": {"sentiment": 0, "status": "neutral"},
-                    "india": {"sentiment": 0, "status": "neutral"}
-                }
-            
-            # Inject full territory state for frontend sync
-            briefing_response["current_territories"] = state_manager.state.get("ownership", {})
-            
-            # Inject military data for hover info panel
-            briefing_response["military_data"] = state_manager.state.get("military", {})
-            briefing_response["intel_strength"] = state_manager.get_intel_strength(data.get("faction", "usa"))
+        state_manager = session.state
+        history_store = session.history
+        state_manager.refresh()
 
-            return briefing_response
-        except json.JSONDecodeError as e:
-            log(f"WARNING: Failed to parse briefing JSON: {e}")
+        briefing_response = None
+        if BRIEFING_POOL:
+            briefing_response = briefing_pool.take(faction_id, faction_name, model)
+        if briefing_response is not None:
+            log(f"Using a pre-generated briefing for faction: {faction_name}")
+        else:
+            log(f"Generating briefing for faction: {faction_name}")
+            briefing_response, assistant_message = await compose_briefing(faction_id, faction_name, model)
+
+        if briefing_response is None:
             return {
                 "narrative": assistant_message if assistant_message else f"Welcome, Commander of {faction_name}. The world is in a state of heightened tension. Your decisions will shape the future of global affairs.",
                 "stats": {
@@ -669,7 +1267,22 @@ async def generate_briefing(data: dict):
                     "india": {"sentiment": 0, "status": "neutral"}
                 }
             }
-    
+
+        # Inject full territory state for frontend sync
+        briefing_response["current_territories"] = state_manager.state.get("ownership", {})
+
+        # Inject military data for hover info panel
+        briefing_response["military_data"] = state_manager.state.get("military", {})
+        briefing_response["intel_strength"] = state_manager.get_intel_strength(data.get("faction", "usa"))
+
+        # The briefing opens the conversation memory for this game
+        history_store.reset(opening=briefing_response.get("narrative", ""))
+
+        return briefing_response
+
+    except LLMError as e:
+        log(f"ERROR: Briefing generation failed: {e}")
+        raise HTTPException(status_code=e.status_code, detail=f"Failed to generate briefing: {str(e)}")
     except Exception as e:
         log(f"ERROR: Briefing generation failed: {type(e).__name__}: {str(e)}")
         import traceback
@@ -679,21 +1292,33 @@ async def generate_briefing(data: dict):
             detail=f"Failed to generate briefing: {str(e)}"
         )
 
+def reset_session(session):
+    session.state.reset()
+    session.history.reset()
+
+
 @app.post("/api/reset")
-async def reset_game():
-    """Reset the game state to defaults"""
+async def reset_game(data: GameRef = None):
+    """Reset a game's state to defaults"""
     import os
     import datetime
     
     log_file = "debug_server.log"
     timestamp = datetime.datetime.now().isoformat()
     
-    log("--> RECEIVED /api/reset REQUEST")
+    game_id = data.game_id if data else DEFAULT_GAME_ID
+    log(f"--> RECEIVED /api/reset REQUEST (game {game_id})")
+    check_game_id(game_id)
     
     try:
-        # Use robustness reset method
-        state_manager.reset()
+        # Through the writer queue, so turns already waiting there apply to
+        # the old game first and later ones see the reset
+        with sessions.use(game_id) as session:
+            await session.writer.submit(reset_session, session)
         log("Game state explicitly reset to defaults")
+        if BRIEFING_POOL:
+            # A new game is about to start: have every pool full again
+            briefing_pool.refill()
         return {"status": "success", "message": "Game reset successfully"}
     except Exception as e:
         log(f"Error resetting game: {e}")
@@ -703,27 +1328,25 @@ async def reset_game():
 async def get_models():
     """Get list of available Ollama models"""
     try:
-        response = requests.get("http://localhost:11434/api/tags", timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            models = [model["name"] for model in data.get("models", [])]
-            return {"models": models}
-        else:
-            raise HTTPException(status_code=500, detail="Failed to fetch models from Ollama")
-    except requests.exceptions.ConnectionError:
-        raise HTTPException(status_code=503, detail="Cannot connect to Ollama")
-    except Exception as e:
+        models = await llm_client.list_models()
+        return {"models": models}
+    except LLMError as e:
+        if e.status_code == 503:
+            raise HTTPException(status_code=503, detail="Cannot connect to Ollama")
         raise HTTPException(status_code=500, detail=f"Error fetching models: {str(e)}")
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """Return in-process performance counters"""
+    snapshot = metrics.snapshot()
+    snapshot["sessions_in_memory"] = len(sessions.sessions)
+    return snapshot
+
 @app.get("/health")
 async def health_check():
     """Check if the server and Ollama are running"""
-    try:
-        # Test Ollama connection
-        response = requests.get("http://localhost:11434/api/tags", timeout=5)
-        ollama_status = "connected" if response.status_code == 200 else "error"
-    except:
-        ollama_status = "disconnected"
+    # Test Ollama connection
+    ollama_status = "connected" if await llm_client.ping() else "disconnected"
     
     return {
         "server": "running",
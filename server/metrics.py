@@ -0,0 +1,40 @@
+"""
+In-process performance counters, exposed on /api/metrics.
+"""
+import collections
+
+# Keep only the most recent samples of each series
+MAX_SAMPLES = 200
+
+_counters = collections.Counter()
+_series = collections.defaultdict(lambda: collections.deque(maxlen=MAX_SAMPLES))
+
+
+def incr(name, amount=1):
+    """Increment a counter"""
+    _counters[name] += amount
+
+
+def record(name, value):
+    """Append a numeric sample to a series"""
+    _series[name].append(value)
+
+
+def snapshot():
+    """Return all counters and a summary (count/last/avg/max) of every series"""
+    series = {}
+    for name, samples in _series.items():
+        if not samples:
+            continue
+        series[name] = {
+            "count": len(samples),
+            "last": samples[-1],
+            "avg": round(sum(samples) / len(samples), 2),
+            "max": max(samples)
+        }
+    return {"counters": dict(_counters), "series": series}
+
+
+def reset():
+    _counters.clear()
+    _series.clear()
@@ -0,0 +1,113 @@
+"""
+Columnar military store backed by NumPy arrays.
+
+Rows follow a stable country index (sorted country codes); columns are
+troops/navy/airforce plus an owner column holding a faction index. Batch
+deltas are applied in one vectorized step (clamped at zero) and per-faction
+totals are a bincount, so headless simulations over thousands of turns stay
+cheap. to_dict()/to_ownership() give back the JSON shapes stored in
+state['military'] and state['ownership'].
+
+The server does not use it: GameState keeps the dict state, so NumPy is
+only a development dependency (requirements-dev.txt).
+"""
+import numpy as np
+
+from prompts import FACTIONS, INITIAL_WORLD_STATE
+
+FORCE_COLUMNS = ("troops", "navy", "airforce")
+
+# Stable row order shared by every table
+COUNTRY_CODES = tuple(sorted(INITIAL_WORLD_STATE))
+
+
+class MilitaryTable:
+    def __init__(self, codes, forces, owners, factions):
+        """
+        codes: country code per row
+        forces: int64 array (rows, 3) in FORCE_COLUMNS order
+        owners: int array (rows,) of indexes into factions
+        factions: faction ids
+        """
+        self.codes = list(codes)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.forces = forces
+        self.owners = owners
+        self.factions = list(factions)
+        self.faction_index = {f: i for i, f in enumerate(self.factions)}
+
+    @classmethod
+    def from_state(cls, military, ownership, codes=COUNTRY_CODES):
+        """Build from the JSON shapes in state['military'] / state['ownership']"""
+        codes = list(codes) + sorted(set(military) - set(codes))
+        factions = list(FACTIONS)
+        faction_index = {f: i for i, f in enumerate(factions)}
+        owners = np.empty(len(codes), dtype=np.int32)
+        forces = np.zeros((len(codes), len(FORCE_COLUMNS)), dtype=np.int64)
+        for i, code in enumerate(codes):
+            faction = ownership.get(code, INITIAL_WORLD_STATE.get(code, 'neutral'))
+            if faction not in faction_index:
+                faction_index[faction] = len(factions)
+                factions.append(faction)
+            owners[i] = faction_index[faction]
+            row = military.get(code)
+            if row:
+                forces[i] = [row.get(col, 0) for col in FORCE_COLUMNS]
+        return cls(codes, forces, owners, factions)
+
+    def copy(self):
+        return MilitaryTable(self.codes, self.forces.copy(), self.owners.copy(), self.factions)
+
+    def to_dict(self):
+        """state['military'] shape: {code: {"troops": int, "navy": int, "airforce": int}}"""
+        rows = self.forces.tolist()
+        return {code: dict(zip(FORCE_COLUMNS, row)) for code, row in zip(self.codes, rows)}
+
+    def to_ownership(self):
+        """state['ownership'] shape: {code: faction}"""
+        return {code: self.factions[o] for code, o in zip(self.codes, self.owners.tolist())}
+
+    def get(self, code):
+        return dict(zip(FORCE_COLUMNS, self.forces[self.index[code]].tolist()))
+
+    def _faction_id(self, faction):
+        if faction not in self.faction_index:
+            self.faction_index[faction] = len(self.factions)
+            self.factions.append(faction)
+        return self.faction_index[faction]
+
+    def apply_deltas(self, updates):
+        """
+        Apply {code: {"troops": delta, ...}} in one vectorized step, clamping at 0.
+        Unknown countries are ignored. Returns the codes that were updated.
+        """
+        codes = [code for code in updates if code in self.index]
+        if not codes:
+            return []
+        rows = np.fromiter((self.index[c] for c in codes), dtype=np.intp, count=len(codes))
+        deltas = np.array([[updates[c].get(col, 0) for col in FORCE_COLUMNS] for c in codes], dtype=np.int64)
+        self.forces[rows] = np.maximum(self.forces[rows] + deltas, 0)
+        return codes
+
+    def apply_delta_array(self, deltas):
+        """Apply a full (rows, 3) delta array, clamping at 0 (simulation fast path)"""
+        np.maximum(self.forces + deltas, 0, out=self.forces)
+
+    def set_owners(self, updates):
+        """Apply {code: faction}; unknown countries are ignored"""
+        for code, faction in updates.items():
+            if code in self.index:
+                self.owners[self.index[code]] = self._faction_id(faction)
+
+    def totals_by_faction(self):
+        """{faction: {"countries", "troops", "navy", "airforce"}} for factions owning countries"""
+        n = len(self.factions)
+        counts = np.bincount(self.owners, minlength=n)
+        # Integer group-by sum: one add.at per call instead of a Python loop per country
+        sums = np.zeros((n, len(FORCE_COLUMNS)), dtype=np.int64)
+        np.add.at(sums, self.owners, self.forces)
+        totals = {}
+        for i in np.nonzero(counts)[0].tolist():
+            totals[self.factions[i]] = {"countries": int(counts[i]),
+                                        **dict(zip(FORCE_COLUMNS, sums[i].tolist()))}
+        return totals
@@ -0,0 +1,191 @@
+"""
+Token-budgeted assembly of the game master prompt.
+
+Each part of the prompt is a PromptSection with a priority. When the
+estimated size exceeds the budget, the lowest-priority sections are shrunk
+first (each section knows how to reduce itself: drop the oldest history
+message, fall back to faction totals, ...). Required sections are never
+touched.
+
+Rendered state fragments are memoized in a FragmentCache keyed by the
+GameState section versions they were rendered from, so unchanged sections
+are not rebuilt between turns.
+"""
+import re
+from collections import OrderedDict
+
+import metrics
+
+# Rough BPE approximation: short words are one token, numbers split every
+# 3 digits, punctuation counts alone
+TOKEN_PATTERN = re.compile(r"[A-Za-z]{1,7}|\d{1,3}|[^\sA-Za-z\d]")
+
+# Chat template overhead per message (role markers etc.)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+PROMPT_TOKEN_BUDGET = 10000
+
+# Room left in the context window for the model's answer
+RESPONSE_TOKEN_RESERVE = 1536
+
+# Allowed num_ctx values. Changing num_ctx makes Ollama reload the model,
+# so we only move between a few sizes and never shrink for a given model.
+NUM_CTX_BUCKETS = (4096, 8192, 12288, 16384, 32768)
+
+_num_ctx_by_model = {}
+
+# Rendered fragments kept across turns (all games share the cache)
+FRAGMENT_CACHE_SIZE = 512
+
+
+def estimate_tokens(text):
+    """Estimate the number of tokens in a string"""
+    if not text:
+        return 0
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def estimate_message_tokens(messages):
+    """Estimate the number of tokens of a chat message list"""
+    return sum(estimate_tokens(m.get("content", "")) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def choose_num_ctx(model, prompt_tokens):
+    """Smallest context bucket that fits the prompt plus the response reserve"""
+    needed = prompt_tokens + RESPONSE_TOKEN_RESERVE
+    size = NUM_CTX_BUCKETS[-1]
+    for bucket in NUM_CTX_BUCKETS:
+        if bucket >= needed:
+            size = bucket
+            break
+    # Sticky per model to avoid reloading the model between turns
+    size = max(size, _num_ctx_by_model.get(model, 0))
+    _num_ctx_by_model[model] = size
+    return size
+
+
+def _content_tokens(content):
+    if isinstance(content, list):
+        return estimate_message_tokens(content)
+    return estimate_tokens(content)
+
+
+def drop_oldest_message(messages):
+    """Reducer for message-list sections"""
+    return messages[1:]
+
+
+class PromptSection:
+    def __init__(self, name, content, priority=0, reducers=None, required=False, droppable=True):
+        """
+        content: a string or a list of chat messages
+        priority: lower values are trimmed first
+        reducers: callables returning a smaller version of the content,
+                  tried in order; a reducer may be reused while it shrinks
+        required: never trimmed
+        droppable: False keeps the last reducer's output instead of dropping
+                   the section (for sections whose absence would mislead)
+        """
+        self.name = name
+        self.content = content
+        self.priority = priority
+        self.reducers = list(reducers or [])
+        self.required = required
+        self.droppable = droppable
+        self.reduced = False
+
+    @property
+    def tokens(self):
+        return _content_tokens(self.content)
+
+    def reduce(self):
+        """Shrink the section one step. Returns False if it cannot shrink further."""
+        if self.required:
+            return False
+        before = self.tokens
+        while self.reducers:
+            smaller = self.reducers[0](self.content)
+            if _content_tokens(smaller) < before:
+                self.content = smaller
+                self.reduced = True
+                return True
+            # This reducer can't shrink it any more: move on to the next one
+            self.reducers.pop(0)
+        if before > 0 and self.droppable:
+            # Nothing left to try: drop the section entirely
+            self.content = [] if isinstance(self.content, list) else ""
+            self.reduced = True
+            return True
+        return False
+
+
+class PromptBuilder:
+    def __init__(self, budget=PROMPT_TOKEN_BUDGET):
+        self.budget = budget
+        self.sections = {}
+
+    def add(self, name, content, priority=0, reducers=None, required=False, droppable=True):
+        self.sections[name] = PromptSection(name, content, priority, reducers, required, droppable)
+        return self.sections[name]
+
+    def get(self, name):
+        return self.sections[name].content
+
+    def total_tokens(self):
+        return sum(section.tokens for section in self.sections.values())
+
+    def fit(self):
+        """Trim the lowest-priority sections until the prompt fits the budget"""
+        candidates = sorted(
+            (s for s in self.sections.values() if not s.required),
+            key=lambda s: s.priority
+        )
+        while self.total_tokens() > self.budget and candidates:
+            section = candidates[0]
+            if not section.reduce():
+                candidates.pop(0)
+        return self.total_tokens()
+
+    def report(self):
+        """Per-section token estimates, with the names of trimmed sections"""
+        return {
+            "total": self.total_tokens(),
+            "budget": self.budget,
+            "sections": {name: s.tokens for name, s in self.sections.items()},
+            "trimmed": [name for name, s in self.sections.items() if s.reduced]
+        }
+
+
+class FragmentCache:
+    """LRU cache of rendered prompt fragments"""
+    def __init__(self, max_entries=FRAGMENT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get(self, key, render):
+        """
+        Return the fragment for key, calling render() only on a miss.
+        key must include every version/parameter the fragment depends on,
+        e.g. (game_id, "military", state.get_section_version("military", "ownership"), faction).
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            metrics.incr("prompt_fragment_hits")
+            return self.entries[key]
+        metrics.incr("prompt_fragment_misses")
+        value = render()
+        self.entries[key] = value
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self.entries.clear()
+
+
+_fragment_cache = FragmentCache()
+
+
+def cached_fragment(key, render):
+    """Memoize a rendered prompt fragment in the shared cache"""
+    return _fragment_cache.get(key, render)
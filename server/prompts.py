@@ -23,7 +23,6 @@ GAME STATE VARIABLES:
 RESPONSE FORMAT:
 You MUST respond with valid JSON in this exact structure. DO NOT ADD ANY OTHER KEYS:
 {
-    "reasoning": "Step-by-step logic: 1. Identify Action Cost (e.g. 40 Tech). 2. Check Current Tech (e.g. 10). 3. Compare: 10 < 40. 4. Result: Deny action due to insufficient funds.",
     "narrative": "Your narrative response here (2-4 sentences, dramatic and tense)",
     "resource_updates": {
         "budget": -100,
@@ -73,6 +72,7 @@ MILITARY SYSTEM (MANDATORY):
 - `military_updates` is a dictionary where keys are country codes and values are objects with DELTA values (negative for losses, positive for reinforcements).
 - **FORMAT**: `"military_updates": { "KZ": { "troops": -50000, "airforce": -20 }, "US": { "troops": -15000, "airforce": -30 } }`
 - Example: If USA invades Kazakhstan, BOTH countries must appear in military_updates with appropriate casualties.
+- **EXCEPTION**: If a COMBAT RESOLUTION directive is present, the war engine has already computed and applied the casualties, transfers and territory changes. Narrate that outcome with its numbers and omit `military_updates` and `territory_updates`.
 
 TERRITORY CONTROL (MANDATORY):
 - **CRITICAL**: If a country's allegiance changes (e.g., successful invasion, coup, annexation), you MUST include it in `territory_updates`. Failure to do so will cause the map to be incorrect.
@@ -91,8 +91,7 @@ TERRITORY CONTROL (MANDATORY):
 - Only include the countries that are changing in this specific turn.
 
 RANDOM EVENT SYSTEM:
-- Generate unprompted random events to create dynamic gameplay
-- Events should occur approximately every 3-5 turns
+- Random events are scheduled and chosen by the server. Only generate one when a SYSTEM DIRECTIVE tells you to.
 - **CRITICAL**: Random events should be UNPROMPTED and NOT directly related to the player's current action
 - When generating an event, set event.type to **"CRISIS", "BREAKTHROUGH", "DIPLOMATIC", or "RESOURCE_SHOCK"**.
 - Start the `title` with the type, e.g., "CRISIS: Earthquake in Tokyo".
@@ -121,8 +120,8 @@ RULES:
 5. Influence changes based on diplomatic moves and crisis management
 6. Year advances when player explicitly requests or after major events
 7. Create consequences for player decisions
-8. Generate random events dynamically to keep gameplay engaging
-9. Track turn_count and use it to help determine when events occur
+8. Generate random events only when a SYSTEM DIRECTIVE asks for one
+9. Track turn_count
 10. ALWAYS return valid JSON - no extra text before or after
 11. **MILITARY UPDATES ARE MANDATORY**: When you describe any combat, invasion, battle, or conflict in your narrative, you MUST include the `military_updates` field showing casualties for ALL combatants. Example: `"military_updates": {"KZ": {"troops": -50000}, "US": {"troops": -15000}}`. Both attacker and defender must take losses.
 12. **TERRITORY UPDATES ARE MANDATORY**: When you describe a successful invasion, annexation, or coup in your narrative, you MUST include the `territory_updates` field in your JSON response. Example: `"territory_updates": {"KZ": "usa"}`. Failure to include this will break the game.
@@ -133,6 +132,7 @@ RULES:
     - **Advanced Ops** (cyber warfare, research, nukes): MUST consume **TECH** (e.g., -10 Tech).
     - **General Actions** (infrastructure, diplomacy): MUST consume **BUDGET** (e.g., -50 Budget).
     - **Influence**: Award/deduct based on success.
+    - If a COST CHECK directive is present, the server has already priced the action and checked the player's resources: follow its verdict and use its exact costs.
 14. **TROOP MOVEMENT & LOGISTICS (CRITICAL)**:
     - **TRANSOCEANIC MOVEMENT**: Moving troops across oceans (e.g., US to South Korea) REQUIRES Naval transport. You MUST move Navy ships along with troops.
       - **Ratio**: Approximately 1 Transport Ship for every 2,000 troops. (e.g., Moving 100,000 troops requires moving ~50 Ships).
@@ -158,13 +158,6 @@ RULES:
       |---|---|---|---|
       | US | 1,200,000 | 450 | 4,000 |
       ```
-19. **REASONING REQUIREMENT (MANDATORY)**: You MUST populate the `reasoning` field first.
-    - **Step 1**: Identify the player's intent and any associated costs (e.g., "Attack needs 40 Tech").
-    - **Step 2**: Check current resources (e.g., "Player has 10 Tech").
-    - **Step 3**: Perform the comparison (e.g., "10 < 40").
-    - **Step 4**: Determine outcome: **IF cost > current, YOU MUST REJECT.** Do not proceed.
-    - **Step 5**: Only THEN generate the narrative and updated stats.
-    - This internal monologue helps you avoid logic errors.
     - **TERRITORIES**: When asked "What are my forces?", you MUST report ALL countries that are currently owned by the player's faction according to the "CURRENT WORLD GEOPOLITICAL STATE" section above. This includes BOTH traditional alliance members AND recently conquered/annexed territories. If the player has conquered a country (e.g., Kazakhstan), it MUST appear in your force report.
     - **FACTION-SPECIFIC REPORTS**: When asked about another faction's forces (e.g., "What are Russia's forces?"), you MUST use the "MILITARY FORCES BY FACTION" data section below. This section groups countries by their CURRENT owner in brackets like [RUSSIA] or [USA]. Report ONLY the countries listed under that specific faction's bracket. Do NOT use your general knowledge of which countries traditionally belong to which faction. If the data shows `[RUSSIA]: RU: ... | SY: ...` (no KZ listed), then Kazakhstan is NOT Russian anymore.
     - **COMPLETENESS**: You must include EVERY SINGLE country owned by the player's faction with NO EXCEPTIONS. Do not cherry-pick or omit countries. If the player's faction owns 10 countries, your table must have 10 rows (plus header). Partial reports are not acceptable.
@@ -274,7 +267,7 @@ Player: "Invade Venezuela to secure oil reserves."
     }
 }
 
-Remember: ALWAYS output ONLY valid JSON. Create dynamic, unpredictable events to challenge the player.
+Remember: ALWAYS output ONLY valid JSON.
 """
 
 INITIAL_WORLD_STATE = {
@@ -492,31 +485,191 @@ COUNTRY_NAMES = {
     'YE': 'Yemen', 'ZM': 'Zambia', 'ZW': 'Zimbabwe'
 }
 
-def get_game_master_prompt(faction, state, military_state_str="", intel_strength=50):
-    """Generate the system prompt for the Game Master persona based on current state"""
-    import json
-    
-    # Get faction description
-    FACTIONS = {
-        'usa': {'name': 'North American Alliance'},
-        'china': {'name': 'Tianxia Federation'},
-        'russia': {'name': 'New Soviet Union'},
-        'eu': {'name': 'European Directorate'},
-        'india': {'name': 'Non-Aligned Movement'},
-        'corporate': {'name': 'Global Corporate Alliance'},
-        'rogue': {'name': 'Rogue AI Entities'},
-        'neutral': {'name': 'Unaligned Nations'}
-    }
-    faction_desc = FACTIONS.get(faction, FACTIONS['neutral'])
+# Faction display names used in the game master prompt
+FACTIONS = {
+    'usa': {'name': 'North American Alliance'},
+    'china': {'name': 'Tianxia Federation'},
+    'russia': {'name': 'New Soviet Union'},
+    'eu': {'name': 'European Directorate'},
+    'india': {'name': 'Non-Aligned Movement'},
+    'corporate': {'name': 'Global Corporate Alliance'},
+    'rogue': {'name': 'Rogue AI Entities'},
+    'neutral': {'name': 'Unaligned Nations'}
+}
+
+INTELLIGENCE_RULES = """INTELLIGENCE NETWORK RULES:
+The player's Intelligence Network Strength is given in the CURRENT GAME STATE section.
+- 80-100: You have NEAR OMNISCIENCE. Reports on other factions are highly accurate and detailed.
+- 50-79: You have REASONABLE INSIGHT. Major troop movements are known, but specifics may be slightly off.
+- 20-49: You have LIMITED INTELLIGENCE. Reports are estimates. Emphasize uncertainty (e.g., "estimates suggest...", "approximately...").
+- 0-19: You are BLIND. Military data on enemies is highly unreliable or unknown. Reports should be vague rumors.
+
+CRITICAL INSTRUCTION: When the player asks for information about OTHER factions (not their own), you must qualify the reliability of the data based on your Intelligence Network Strength. If strength is low, warn the player that the numbers could be inaccurate."""
+
+FORMATTING_RULES = """RESPONSE FORMAT:
+You must respond with a JSON object containing the `narrative`, `stats`, `event` (optional), `relationships` (if changed), and `military_updates` (if conflict occurs).
+
+**CRITICAL FORMATTING RULES (NO EXCEPTIONS)**:
+1. **DATA TABLES**: When the player asks for ANY list of data (e.g., "my forces", "territories", "resources", "enemy strength"), you **MUST** present the data in a Markdown Table within the `narrative` field.
+2. **NO PROSE LISTS**: Do NOT write paragraphs listing numbers (e.g., "You have 100 troops..."). This is strictly forbidden.
+3. **Example Table**:
+   | Country | Troops | Navy | Air Force |
+   |---|---|---|---|
+   | USA | 100,000 | 250 | 500 |
+   | Canada | 45,000 | 20 | 50 |
+
+Total Prompt Compliance is required."""
+
+def _build_baseline_blocs_string():
+    """Describe INITIAL_WORLD_STATE once, grouped by faction"""
+    groups = {}
+    for code, faction_val in INITIAL_WORLD_STATE.items():
+        groups.setdefault(faction_val, []).append(f"{COUNTRY_NAMES.get(code, code)} [{code}]")
+
+    blocs_str = "BASELINE ALLIANCE BLOCS (ownership at the start of the game):\n"
+    for faction_val, countries in groups.items():
+        blocs_str += f"- {faction_val}: {', '.join(countries)}\n"
+    blocs_str += "A country's CURRENT owner is its baseline faction above UNLESS it is listed under TERRITORY CHANGES in the current state section. The TERRITORY CHANGES list always wins."
+    return blocs_str
+
+
+BASELINE_BLOCS_STRING = _build_baseline_blocs_string()
+
+# Byte-identical across turns and factions so Ollama can reuse its KV cache.
+# Everything that changes between turns goes in get_dynamic_state_prompt().
+STATIC_SYSTEM_PROMPT = f"""{GAME_MASTER_SYSTEM_PROMPT}
+
+{BASELINE_BLOCS_STRING}
+
+{INTELLIGENCE_RULES}
+
+{FORMATTING_RULES}
+
+The TERRITORY CHANGES (current world geopolitical state), CURRENT GAME STATE and MILITARY FORCES DATA sections are provided in a later system message, just before the player's command. Always use those values.
+"""
+
+
+def get_static_system_prompt():
+    """Return the cacheable, state-independent part of the game master prompt"""
+    return STATIC_SYSTEM_PROMPT
+
 
+def get_world_state_string(state):
+    """Ownership section: one line per country"""
     # Use current ownership from state, falling back to initial state if missing
     current_ownership = state.get('ownership', INITIAL_WORLD_STATE)
 
-    # Append the CURRENT world state to the prompt
     world_state_str = "CURRENT WORLD GEOPOLITICAL STATE (Country Name [Code]: Faction):\n"
     for code, faction_val in current_ownership.items():
         name = COUNTRY_NAMES.get(code, code)
         world_state_str += f"- {name} [{code}]: {faction_val}\n"
+    return world_state_str
+
+
+def get_ownership_changes(state):
+    """Return {code: (baseline_faction, current_faction)} for every conquered/annexed country"""
+    current_ownership = state.get('ownership', INITIAL_WORLD_STATE)
+    return {
+        code: (INITIAL_WORLD_STATE.get(code, 'neutral'), faction_val)
+        for code, faction_val in current_ownership.items()
+        if INITIAL_WORLD_STATE.get(code) != faction_val
+    }
+
+
+def get_ownership_changes_string(state):
+    """
+    Ownership section, delta-encoded against BASELINE_BLOCS_STRING:
+    only countries whose owner differs from INITIAL_WORLD_STATE are listed.
+    """
+    changes = get_ownership_changes(state)
+    world_state_str = "TERRITORY CHANGES SINCE GAME START (Country Name [Code]: baseline -> CURRENT owner):\n"
+    if not changes:
+        return world_state_str + "- None. Every country is still held by its baseline faction.\n"
+    for code, (baseline, current) in changes.items():
+        name = COUNTRY_NAMES.get(code, code)
+        world_state_str += f"- {name} [{code}]: {baseline} -> {current}\n"
+    return world_state_str
+
+
+def get_ownership_changes_compact_string(state):
+    """Ownership changes, compact form (codes only)"""
+    changes = get_ownership_changes(state)
+    entries = [f"{code}:{current}" for code, (_, current) in changes.items()]
+    return "TERRITORY CHANGES (Code:CURRENT owner): " + (", ".join(entries) if entries else "none") + "\n"
+
+
+def get_game_state_string(faction, state, intel_strength=50):
+    """Player faction and scalar stats section"""
+    faction_desc = FACTIONS.get(faction, FACTIONS['neutral'])
+    return f"""CURRENT GAME STATE:
+- Player Faction: [{faction.upper()}] {faction_desc['name']}
+- Year: {state['year']}
+- DEFCON: {state['defcon']}
+- Budget: ${state.get('resources', 1000)}
+- Oil: {state.get('oil', 100)} bbl
+- Tech: {state.get('tech', 50)} pts
+- Global Influence: {state['influence']}
+- Intelligence Network Strength: {intel_strength}/100"""
+
+
+def get_relationships_string(state, compact=False):
+    """Relationships section"""
+    import json
+
+    if compact:
+        relationships = json.dumps(state['relationships'], separators=(',', ':'))
+    else:
+        relationships = json.dumps(state['relationships'], indent=2)
+    return f"""Global Relationships:
+{relationships}"""
+
+
+def assemble_dynamic_state_prompt(world_state_str, game_state_str, relationships_str, military_state_str, directives=None, summary_str=""):
+    """Join pre-rendered dynamic sections (any of them may be empty)"""
+    prompt = ""
+    if summary_str:
+        prompt += f"{summary_str}\n\n"
+    if world_state_str:
+        prompt += f"{world_state_str}\n\n"
+    prompt += f"{game_state_str}\n\n"
+    if relationships_str:
+        prompt += f"{relationships_str}\n\n"
+    if military_state_str:
+        prompt += f"""MILITARY FORCES DATA:
+{military_state_str}
+"""
+    for directive in directives or []:
+        prompt += f"\n{directive}\n"
+    return prompt
+
+
+def get_dynamic_state_prompt(faction, state, military_state_str="", intel_strength=50, directives=None):
+    """
+    Return the volatile part of the game master prompt (world state, stats,
+    military data and any director directives). Sent after the history so
+    the static prefix stays cacheable.
+    """
+    return assemble_dynamic_state_prompt(
+        get_ownership_changes_string(state),
+        get_game_state_string(faction, state, intel_strength),
+        get_relationships_string(state),
+        military_state_str,
+        directives
+    )
+
+
+def get_game_master_prompt(faction, state, military_state_str="", intel_strength=50):
+    """
+    Generate the system prompt for the Game Master persona based on current state
+    (legacy single-message layout, state interleaved with the rules)
+    """
+    import json
+    
+    # Get faction description
+    faction_desc = FACTIONS.get(faction, FACTIONS['neutral'])
+
+    # Append the CURRENT world state to the prompt
+    world_state_str = get_world_state_string(state)
     
     # Construct prompt
     prompt = f"""{GAME_MASTER_SYSTEM_PROMPT}
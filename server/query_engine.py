@@ -0,0 +1,216 @@
+"""
+Local answers for data queries ("my forces", "territories owned by China",
+"resources"), rendered straight from the game state without the LLM.
+
+match_query() recognizes a read-only data request and returns what it asks
+for, or None for anything else (orders, diplomacy, open questions), which
+then goes to the game master model as before. render_query() builds the
+same Markdown tables the prompt asks the model for. Figures for other
+factions carry intel-strength-based noise, seeded per game/turn/country so
+asking twice in the same turn gives the same estimates.
+"""
+import random
+import re
+
+from entity_matcher import match_entities, strip_entities
+from prompts import COUNTRY_NAMES, FACTIONS
+
+# Topic words -> query kind (first match wins). Ownership verbs come last:
+# "troops owned by Iran" asks for forces, "what does China control" for land.
+QUERY_TOPICS = (
+    ("territories", re.compile(r"\b(territor(y|ies)|countries|lands?|holdings)\b")),
+    ("forces", re.compile(r"\b(forces|military|troops|army|armies|navy|air ?force|strength|strong|units)\b")),
+    ("resources", re.compile(r"\b(resources|budget|oil|tech|influence|stats|economy|treasury)\b")),
+    ("territories", re.compile(r"\b(owns?|owned|controls?|controlled)\b")),
+)
+
+# A lookup is made only of these words plus country/faction names; any other
+# verb or adjective ("border", "want", "dangerous", "options", "need rest")
+# makes it an order or an open question for the model
+LOOKUP_WORDS = frozenset("""
+    what which how many much strong show list display report give check view status current currently
+    me us i we my our their its 's s the a an of by in for to is are do does have has all total
+    forces military troops army armies navy air force airforce strength units
+    territory territories countries country land lands holdings own owns owned control controls controlled
+    resources budget oil tech influence stats economy treasury
+""".split())
+
+# Intel strength floor -> (relative noise, caveat shown under foreign figures)
+INTEL_NOISE = (
+    (80, 0.03, "High-confidence intelligence: figures are near exact."),
+    (50, 0.15, "Intelligence estimate: specifics may be off by up to ~15%."),
+    (20, 0.35, "Limited intelligence: rough estimates only, errors of ~35% are likely."),
+    (0, 0.60, "Intelligence blackout: these numbers are little more than rumors."),
+)
+
+FORCES_HEADER = "| Country | Troops | Navy (Ships) | Air Force (Jets) |\n|---|---|---|---|\n"
+
+
+def match_query(text, player_faction):
+    """
+    Return {"kind": "forces"|"territories"|"resources", "factions": [...],
+    "countries": [...]} for a data query, or None.
+    """
+    lowered = " ".join(text.lower().split()).rstrip("?!. ")
+    if not lowered:
+        return None
+    if any(word not in LOOKUP_WORDS for word in re.findall(r"[a-z']+", strip_entities(text))):
+        return None
+    # Long inputs are rarely plain lookups; leave them to the model
+    if len(lowered.split()) > 10:
+        return None
+    kind = next((k for k, pattern in QUERY_TOPICS if pattern.search(lowered)), None)
+    if kind is None:
+        return None
+
+    found = match_entities(text)
+    factions = sorted(f for f in found["factions"] if f in FACTIONS)
+    # A faction name that is also a country ("China") refers to the faction
+    countries = sorted(c for c in found["countries"]
+                       if not any(COUNTRY_NAMES.get(c, "").lower() == f for f in factions))
+    if kind == "resources":
+        # Only the player's own resources are tracked
+        if factions and factions != [player_faction] or countries:
+            return None
+        return {"kind": kind, "factions": [player_faction], "countries": []}
+    if not factions and not countries:
+        factions = [player_faction]
+    return {"kind": kind, "factions": factions, "countries": countries}
+
+
+def _noise_for(intel_strength):
+    for floor, noise, caveat in INTEL_NOISE:
+        if intel_strength >= floor:
+            return noise, caveat
+    return INTEL_NOISE[-1][1:]
+
+
+def _round2(value):
+    """Round to 2 significant figures (estimates shouldn't look exact)"""
+    return int(float(f"{value:.2g}")) if value else value
+
+
+def _estimate(value, noise, rng):
+    """value perturbed by up to +/- noise, rounded to 2 significant figures"""
+    return _round2(max(0, value * (1 + rng.uniform(-noise, noise))))
+
+
+def _forces_rows(state_manager, codes, noise, seed):
+    military = state_manager.state.get("military", {})
+    rows = ""
+    totals = [0, 0, 0]
+    for code in codes:
+        forces = military.get(code, {})
+        values = [forces.get(k, 0) for k in ("troops", "navy", "airforce")]
+        if noise:
+            rng = random.Random(f"{seed}:{code}")
+            values = [_estimate(v, noise, rng) for v in values]
+        totals = [t + v for t, v in zip(totals, values)]
+        prefix = "~" if noise else ""
+        rows += f"| {COUNTRY_NAMES.get(code, code)} | " + " | ".join(f"{prefix}{v:,}" for v in values) + " |\n"
+    return rows, totals
+
+
+def _by_name(codes):
+    return sorted(codes, key=lambda code: COUNTRY_NAMES.get(code, code))
+
+
+def render_forces(query, state_manager, player_faction, seed):
+    intel_strength = state_manager.get_intel_strength(player_faction)
+    noise, caveat = _noise_for(intel_strength)
+    ownership = state_manager.state.get("ownership", {})
+    sections = []
+    foreign = False
+    for faction in query["factions"]:
+        codes = _by_name(state_manager.get_faction_countries(faction))
+        name = FACTIONS.get(faction, {}).get("name", faction)
+        if not codes:
+            sections.append(f"**{name}** controls no territory.")
+            continue
+        own = faction == player_faction
+        foreign = foreign or not own
+        rows, totals = _forces_rows(state_manager, codes, 0 if own else noise, f"{seed}:{faction}")
+        prefix = "" if own else "~"
+        if own:
+            # Exact: the totals the game state keeps up to date
+            own_totals = state_manager.get_faction_totals(faction)
+            totals = [own_totals["troops"], own_totals["navy"], own_totals["airforce"]]
+        else:
+            totals = [_round2(t) for t in totals]
+        sections.append(
+            f"**{name}** military forces:\n\n" + FORCES_HEADER + rows +
+            f"| **Total** | **{prefix}{totals[0]:,}** | **{prefix}{totals[1]:,}** | **{prefix}{totals[2]:,}** |"
+        )
+    if query["countries"]:
+        codes = _by_name(query["countries"])
+        rows = ""
+        for code in codes:
+            own = ownership.get(code) == player_faction
+            foreign = foreign or not own
+            rows += _forces_rows(state_manager, [code], 0 if own else noise, f"{seed}:country")[0]
+        sections.append("Requested countries:\n\n" + FORCES_HEADER + rows.rstrip("\n"))
+    if foreign:
+        sections.append(f"*{caveat}* (Intelligence Network Strength: {intel_strength}/100)")
+    return "\n\n".join(sections)
+
+
+def render_territories(query, state_manager, player_faction, seed):
+    ownership = state_manager.state.get("ownership", {})
+    sections = []
+    for faction in query["factions"]:
+        codes = _by_name(state_manager.get_faction_countries(faction))
+        name = FACTIONS.get(faction, {}).get("name", faction)
+        if not codes:
+            sections.append(f"**{name}** controls no territory.")
+            continue
+        rows = "".join(f"| {COUNTRY_NAMES.get(code, code)} | {code} |\n" for code in codes)
+        noun = "territory" if len(codes) == 1 else "territories"
+        sections.append(f"**{name}** controls {len(codes)} {noun}:\n\n"
+                        "| Country | Code |\n|---|---|\n" + rows.rstrip("\n"))
+    if query["countries"]:
+        rows = "".join(
+            f"| {COUNTRY_NAMES.get(code, code)} | {FACTIONS.get(ownership.get(code, 'neutral'), {}).get('name', ownership.get(code))} |\n"
+            for code in _by_name(query["countries"])
+        )
+        sections.append("| Country | Controlled By |\n|---|---|\n" + rows.rstrip("\n"))
+    return "\n\n".join(sections)
+
+
+def render_resources(query, state_manager, player_faction, seed):
+    state = state_manager.state
+    name = FACTIONS.get(player_faction, {}).get("name", player_faction)
+    rows = [
+        ("Budget", f"${state.get('resources', 1000):,}"),
+        ("Oil", f"{state.get('oil', 100):,} bbl"),
+        ("Tech", f"{state.get('tech', 50):,} pts"),
+        ("Global Influence", f"{state.get('influence', 50):,}"),
+        ("Intelligence Network", f"{state_manager.get_intel_strength(player_faction)}/100"),
+        ("DEFCON", f"{state.get('defcon', 5)}"),
+        ("Year", f"{state.get('year', 2027)}"),
+    ]
+    return (f"**{name}** strategic resources:\n\n| Resource | Value |\n|---|---|\n" +
+            "\n".join(f"| {label} | {value} |" for label, value in rows))
+
+
+RENDERERS = {
+    "forces": render_forces,
+    "territories": render_territories,
+    "resources": render_resources,
+}
+
+
+def render_query(query, state_manager, player_faction, seed=""):
+    """Markdown answer for a query from match_query()"""
+    return RENDERERS[query["kind"]](query, state_manager, player_faction, seed)
+
+
+def answer_query(text, player_faction, state_manager, game_id="default", query=None):
+    """
+    Markdown answer if text is a data query this engine handles, else None.
+    query: an already matched query for text (skips matching again)
+    """
+    query = query or match_query(text, player_faction)
+    if query is None:
+        return None
+    seed = f"{game_id}:{state_manager.state.get('turn_count', 0)}:{player_faction}"
+    return render_query(query, state_manager, player_faction, seed)
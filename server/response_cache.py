@@ -0,0 +1,72 @@
+"""
+Opt-in cache of LLM turn responses for informational queries.
+
+Keyed by (game, world version, faction, model, normalized input): asking
+the same question again before anything in the world changed returns the
+earlier answer without an Ollama round-trip. Only responses that change
+nothing (no force/territory/resource changes, no event) are stored.
+Bounded by size (LRU) and age (TTL).
+"""
+import re
+import time
+from collections import OrderedDict
+
+import metrics
+
+RESPONSE_CACHE_SIZE = 128
+RESPONSE_CACHE_TTL = 600  # seconds
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_input(text):
+    """Case/whitespace/trailing punctuation insensitive form of a player input"""
+    return _WHITESPACE.sub(" ", text.lower()).strip().rstrip("?!. ")
+
+
+def is_non_mutating(response, reported_stats, state):
+    """True if applying this response would not change the world"""
+    if response.get("military_updates") or response.get("territory_updates"):
+        return False
+    if any(response.get("resource_updates", {}).get(k) for k in ("budget", "oil", "tech", "influence")):
+        return False
+    event = response.get("event") or {}
+    if event.get("triggered") and event.get("type") != "player_response":
+        return False
+    if reported_stats:
+        return False
+    for key, value in (response.get("general_stats") or {}).items():
+        if state.get(key) != value:
+            return False
+    return True
+
+
+class ResponseCache:
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (stored_at, value)
+
+    @staticmethod
+    def make_key(game_id, world_version, faction, model, text):
+        return (game_id, world_version, faction, model, normalize_input(text))
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            if entry is not None:
+                del self.entries[key]
+            metrics.incr("response_cache_misses")
+            return None
+        self.entries.move_to_end(key)
+        metrics.incr("response_cache_hits")
+        return entry[1]
+
+    def put(self, key, value):
+        self.entries[key] = (time.monotonic(), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
@@ -0,0 +1,125 @@
+"""
+Game sessions: one GameState + HistoryStore per game id.
+
+Sessions are loaded lazily from their own files and kept in an LRU cache.
+When the cache is full, or a session has been idle too long, it is flushed
+to disk and dropped from memory, so memory stays bounded no matter how many
+games exist. An evicted game is simply reloaded from disk on its next request.
+"""
+import os
+import re
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import metrics
+from event_director import EventSlot
+from game_state import GameState, STATE_FILE, STORAGE_MODE, open_storage
+from history_store import HistoryStore, HISTORY_FILE
+from turn_scheduler import StateWriter
+
+DEFAULT_GAME_ID = "default"
+GAMES_DIR = "games"
+
+# Upper bound on games held in memory, and idle time before a game is unloaded
+MAX_SESSIONS = 32
+SESSION_IDLE_TIMEOUT = 30 * 60
+SESSION_SWEEP_INTERVAL = 60
+
+GAME_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class GameSession:
+    def __init__(self, game_id, state, history):
+        self.game_id = game_id
+        self.state = state
+        self.history = history
+        self.writer = StateWriter(game_id)
+        self.event_slot = EventSlot()
+        self.in_use = 0
+        self.last_used = time.monotonic()
+
+    def flush(self):
+        # The history is saved on every change
+        self.state.flush()
+
+
+class SessionManager:
+    def __init__(self, games_dir=GAMES_DIR, max_sessions=MAX_SESSIONS, idle_timeout=SESSION_IDLE_TIMEOUT):
+        self.games_dir = games_dir
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = OrderedDict()
+
+    def paths(self, game_id):
+        """(state file, history file) for a game"""
+        if game_id == DEFAULT_GAME_ID:
+            # The default game keeps the original single-game file names
+            return STATE_FILE, HISTORY_FILE
+        return (os.path.join(self.games_dir, f"{game_id}.json"),
+                os.path.join(self.games_dir, f"{game_id}.history.json"))
+
+    def get(self, game_id=DEFAULT_GAME_ID):
+        """Return the session for game_id, loading it on first use"""
+        if not GAME_ID_PATTERN.match(game_id or ""):
+            raise ValueError(f"Invalid game id: {game_id!r}")
+
+        session = self.sessions.get(game_id)
+        if session is None:
+            metrics.incr("session_loads")
+            state_file, history_file = self.paths(game_id)
+            if game_id != DEFAULT_GAME_ID:
+                os.makedirs(self.games_dir, exist_ok=True)
+            state = GameState(state_file, storage=open_storage(STORAGE_MODE, state_file, game_id))
+            # A shared backend keeps the history too, so all workers see it
+            history = HistoryStore(history_file, storage=state.storage if state.storage.shared else None)
+            session = GameSession(game_id, state, history)
+            self.sessions[game_id] = session
+        else:
+            metrics.incr("session_hits")
+        self.sessions.move_to_end(game_id)
+        session.last_used = time.monotonic()
+        self._evict_over_capacity()
+        return session
+
+    @contextmanager
+    def use(self, game_id=DEFAULT_GAME_ID):
+        """Hold a session for the duration of a request (it won't be evicted meanwhile)"""
+        session = self.get(game_id)
+        session.in_use += 1
+        try:
+            yield session
+        finally:
+            session.in_use -= 1
+            session.last_used = time.monotonic()
+
+    def _evict(self, game_id):
+        session = self.sessions.pop(game_id)
+        session.flush()
+        metrics.incr("session_evictions")
+        print(f"Unloaded game session {game_id}")
+
+    def _evict_over_capacity(self):
+        # Least recently used first; sessions serving a request are skipped
+        for game_id in list(self.sessions):
+            if len(self.sessions) <= self.max_sessions:
+                break
+            if self.sessions[game_id].in_use == 0:
+                self._evict(game_id)
+
+    def evict_idle(self):
+        """Unload sessions idle for longer than idle_timeout. Returns the count."""
+        now = time.monotonic()
+        idle = [gid for gid, s in self.sessions.items()
+                if s.in_use == 0 and now - s.last_used > self.idle_timeout]
+        for game_id in idle:
+            self._evict(game_id)
+        return len(idle)
+
+    def flush_all(self):
+        for session in self.sessions.values():
+            session.state.flush()
+
+    def close(self):
+        for game_id in list(self.sessions):
+            self._evict(game_id)
@@ -0,0 +1,320 @@
+"""
+Storage backends for GameState.
+
+A backend persists one game's state dict. GameState tracks what changed and
+calls save() with either None (write everything) or a change set:
+    {"set": {key: value}, "military": {code: {...}}, "ownership": {code: faction}}
+always carrying absolute values, so re-applying a change set is harmless.
+
+FileStorage   - JSON snapshot file plus an optional append-only journal
+                (single process only)
+SQLiteStorage - normalized tables in a shared SQLite database in WAL mode,
+                with a per-game version number; safe to share between
+                several uvicorn worker processes. Also holds each game's
+                conversation history (see HistoryStore).
+"""
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager, nullcontext
+
+import metrics
+
+JOURNAL_SUFFIX = ".journal"
+SNAPSHOT_EVERY = 20
+
+SQLITE_DB = "world_state.db"
+SQLITE_BUSY_TIMEOUT_MS = 5000
+
+# Top-level keys stored in their own tables; everything else goes to `stats`
+TABLE_KEYS = ("military", "ownership", "relationships")
+
+
+class StateConflictError(Exception):
+    """Another process saved the game since this process last loaded it"""
+
+
+class FileStorage:
+    shared = False
+
+    def __init__(self, save_file, journal=True):
+        self.save_file = save_file
+        self.journal_file = os.path.splitext(save_file)[0] + JOURNAL_SUFFIX
+        self.journal = journal
+        self.journal_records = 0
+
+    def exists(self):
+        return os.path.exists(self.save_file)
+
+    def load(self):
+        """Return the saved state dict, or None if there is none"""
+        if os.path.exists(self.save_file):
+            try:
+                with open(self.save_file, 'r') as f:
+                    state = json.load(f)
+                self.journal_records = self._replay_journal(state)
+                return state
+            except json.JSONDecodeError:
+                print("Error decoding state file, starting fresh.")
+        # A journal without its base snapshot can't be replayed
+        self._remove_journal()
+        return None
+
+    def version(self):
+        """Stored version (None: this backend is single-process, never changes underneath)"""
+        return None
+
+    def transaction(self):
+        return nullcontext()
+
+    def save(self, state, changes=None, version=0, base_version=None):
+        if changes is None or not self.journal or self.journal_records >= SNAPSHOT_EVERY:
+            self._write_snapshot(state)
+        else:
+            self._append_journal(state.get("turn_count", 0), changes)
+
+    def clear(self):
+        if os.path.exists(self.save_file):
+            try:
+                os.remove(self.save_file)
+            except OSError as e:
+                print(f"Warning: Could not remove save file (might be locked): {e}")
+                # Wait a beat in case it helps
+                time.sleep(0.1)
+        self._remove_journal()
+
+    def _write_snapshot(self, state):
+        temp_file = f"{self.save_file}.tmp"
+        try:
+            data = json.dumps(state, separators=(',', ':'))
+            with open(temp_file, 'w') as f:
+                f.write(data)
+            # Atomic replace: a crash leaves either the old or the new file
+            os.replace(temp_file, self.save_file)
+        except Exception:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+        # A crash before this point only leaves records the snapshot already contains
+        self._remove_journal()
+        self.journal_records = 0
+        metrics.incr("state_saves")
+        metrics.record("state_write_bytes", len(data))
+
+    def _append_journal(self, turn, changes):
+        """Append one change set as a JSON line"""
+        record = {"turn": turn}
+        record.update({k: v for k, v in changes.items() if v})
+        line = json.dumps(record, separators=(',', ':')) + "\n"
+        with open(self.journal_file, 'a') as f:
+            f.write(line)
+        self.journal_records += 1
+        metrics.incr("state_journal_appends")
+        metrics.record("state_write_bytes", len(line))
+
+    def _replay_journal(self, state):
+        """Apply journal records written since the last snapshot. Returns the record count."""
+        if not os.path.exists(self.journal_file):
+            return 0
+        count = 0
+        with open(self.journal_file, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn last line from a crash mid-append: everything before it is intact
+                    print("Warning: Skipping incomplete journal record.")
+                    break
+                state.update(record.get('set', {}))
+                state.setdefault('military', {}).update(record.get('military', {}))
+                state.setdefault('ownership', {}).update(record.get('ownership', {}))
+                count += 1
+        if count:
+            print(f"Replayed {count} journal records (turn {state.get('turn_count', 0)}).")
+        return count
+
+    def _remove_journal(self):
+        if os.path.exists(self.journal_file):
+            try:
+                os.remove(self.journal_file)
+            except OSError as e:
+                print(f"Warning: Could not remove journal file: {e}")
+
+
+# One connection per database file per process, shared by all games
+_connections = {}
+
+
+def get_connection(db_path=SQLITE_DB):
+    conn = _connections.get(db_path)
+    if conn is None:
+        # Autocommit mode: transactions are opened explicitly
+        conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS games (
+                game_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                updated_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS stats (
+                game_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT,
+                PRIMARY KEY (game_id, key)
+            );
+            CREATE TABLE IF NOT EXISTS ownership (
+                game_id TEXT NOT NULL,
+                code TEXT NOT NULL,
+                faction TEXT NOT NULL,
+                PRIMARY KEY (game_id, code)
+            );
+            CREATE TABLE IF NOT EXISTS military (
+                game_id TEXT NOT NULL,
+                code TEXT NOT NULL,
+                troops INTEGER NOT NULL,
+                navy INTEGER NOT NULL,
+                airforce INTEGER NOT NULL,
+                PRIMARY KEY (game_id, code)
+            );
+            CREATE TABLE IF NOT EXISTS relationships (
+                game_id TEXT NOT NULL,
+                faction TEXT NOT NULL,
+                sentiment INTEGER,
+                status TEXT,
+                PRIMARY KEY (game_id, faction)
+            );
+            CREATE TABLE IF NOT EXISTS history (
+                game_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                data TEXT NOT NULL
+            );
+        """)
+        _connections[db_path] = conn
+    return conn
+
+
+class SQLiteStorage:
+    shared = True
+
+    def __init__(self, game_id, db_path=SQLITE_DB):
+        self.game_id = game_id
+        self.conn = get_connection(db_path)
+
+    def exists(self):
+        return self.version() is not None
+
+    def version(self):
+        row = self.conn.execute("SELECT version FROM games WHERE game_id = ?", (self.game_id,)).fetchone()
+        return row[0] if row else None
+
+    @contextmanager
+    def transaction(self):
+        """Exclusive write transaction (blocks other processes' writers, not readers)"""
+        if self.conn.in_transaction:
+            yield
+            return
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def load(self):
+        if self.version() is None:
+            return None
+        gid = (self.game_id,)
+        state = {key: json.loads(value) for key, value in
+                 self.conn.execute("SELECT key, value FROM stats WHERE game_id = ?", gid)}
+        state["ownership"] = dict(self.conn.execute(
+            "SELECT code, faction FROM ownership WHERE game_id = ?", gid))
+        state["military"] = {
+            code: {"troops": troops, "navy": navy, "airforce": airforce}
+            for code, troops, navy, airforce in self.conn.execute(
+                "SELECT code, troops, navy, airforce FROM military WHERE game_id = ?", gid)
+        }
+        state["relationships"] = {
+            faction: {"sentiment": sentiment, "status": status}
+            for faction, sentiment, status in self.conn.execute(
+                "SELECT faction, sentiment, status FROM relationships WHERE game_id = ?", gid)
+        }
+        return state
+
+    def save(self, state, changes=None, version=0, base_version=None):
+        """
+        Write the full state (changes=None) or only the changed rows.
+        Raises StateConflictError if the stored version is no longer
+        base_version, i.e. another process saved in between.
+        """
+        with self.transaction():
+            stored = self.version()
+            if base_version is not None and stored is not None and stored != base_version:
+                raise StateConflictError(f"game {self.game_id}: stored v{stored}, expected v{base_version}")
+
+            if changes is None:
+                for table in ("stats", "ownership", "military", "relationships"):
+                    self.conn.execute(f"DELETE FROM {table} WHERE game_id = ?", (self.game_id,))
+                stats = {k: v for k, v in state.items() if k not in TABLE_KEYS}
+                military = state.get("military", {})
+                ownership = state.get("ownership", {})
+                relationships = state.get("relationships", {})
+            else:
+                changed = changes.get("set", {})
+                stats = {k: v for k, v in changed.items() if k not in TABLE_KEYS}
+                # A whole table replaced with set_value() is written in full
+                military = changed.get("military", changes.get("military", {}))
+                ownership = changed.get("ownership", changes.get("ownership", {}))
+                relationships = changed.get("relationships", {})
+
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO stats (game_id, key, value) VALUES (?, ?, ?)",
+                [(self.game_id, k, json.dumps(v)) for k, v in stats.items()])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO ownership (game_id, code, faction) VALUES (?, ?, ?)",
+                [(self.game_id, c, f) for c, f in ownership.items()])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO military (game_id, code, troops, navy, airforce) VALUES (?, ?, ?, ?, ?)",
+                [(self.game_id, c, m.get("troops", 0), m.get("navy", 0), m.get("airforce", 0))
+                 for c, m in military.items()])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO relationships (game_id, faction, sentiment, status) VALUES (?, ?, ?, ?)",
+                [(self.game_id, f, r.get("sentiment"), r.get("status")) for f, r in relationships.items()])
+            self.conn.execute(
+                "INSERT OR REPLACE INTO games (game_id, version, updated_at) VALUES (?, ?, ?)",
+                (self.game_id, version, time.time()))
+
+        rows = len(stats) + len(ownership) + len(military) + len(relationships)
+        metrics.incr("state_saves" if changes is None else "state_row_updates")
+        metrics.record("state_rows_written", rows)
+
+    def clear(self):
+        # The history row is kept: its version must keep counting up so
+        # other workers notice the reset history HistoryStore writes next
+        with self.transaction():
+            for table in ("games", "stats", "ownership", "military", "relationships"):
+                self.conn.execute(f"DELETE FROM {table} WHERE game_id = ?", (self.game_id,))
+
+    def history_version(self):
+        row = self.conn.execute("SELECT version FROM history WHERE game_id = ?", (self.game_id,)).fetchone()
+        return row[0] if row else None
+
+    def load_history(self):
+        """(version, history dict), or (None, None) if none was saved"""
+        row = self.conn.execute("SELECT version, data FROM history WHERE game_id = ?", (self.game_id,)).fetchone()
+        if row is None:
+            return None, None
+        return row[0], json.loads(row[1])
+
+    def save_history(self, data):
+        """Store the conversation history and return its new version"""
+        with self.transaction():
+            version = (self.history_version() or 0) + 1
+            self.conn.execute(
+                "INSERT OR REPLACE INTO history (game_id, version, data) VALUES (?, ?, ?)",
+                (self.game_id, version, json.dumps(data)))
+        return version
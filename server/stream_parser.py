@@ -0,0 +1,239 @@
+"""
+Incremental parser for the LLM's JSON output.
+
+The game master answers with one JSON object. StreamingJSONParser consumes
+it chunk by chunk as Ollama streams it and reports field-level events as
+soon as they are known:
+
+- FIELD_CHUNK:    new text of a top-level string field (e.g. "narrative")
+- FIELD_COMPLETE: a top-level field whose value has fully closed
+- DOCUMENT_COMPLETE: the closing brace of the object
+
+If generation is cut off, result() still returns every completed field.
+"""
+import json
+
+FIELD_CHUNK = "field_chunk"
+FIELD_COMPLETE = "field_complete"
+DOCUMENT_COMPLETE = "document_complete"
+
+WHITESPACE = " \t\r\n"
+
+# Top-level parser phases
+_BEFORE_OBJECT = 0
+_EXPECT_KEY = 1
+_IN_KEY = 2
+_EXPECT_COLON = 3
+_EXPECT_VALUE = 4
+_IN_STRING_VALUE = 5
+_IN_CONTAINER_VALUE = 6
+_IN_SCALAR_VALUE = 7
+_AFTER_VALUE = 8
+_DONE = 9
+
+
+class StreamingJSONParser:
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.phase = _BEFORE_OBJECT
+        self.fields = {}          # completed top-level fields
+        self.partial_text = {}    # decoded text so far of top-level strings
+        self.complete = False
+
+        self._key_start = 0
+        self._key = None
+        self._value_start = 0
+        self._decoded_to = 0      # raw index decoded so far in a string value
+        self._depth = 0           # nesting depth inside a container value
+        self._in_string = False   # inside a string nested in a container
+        self._escape = False
+
+    def feed(self, chunk):
+        """Consume a chunk of text and return the list of events it produced"""
+        self.buffer += chunk
+        events = []
+        buf = self.buffer
+        n = len(buf)
+
+        while self.pos < n and self.phase != _DONE:
+            c = buf[self.pos]
+            phase = self.phase
+
+            if phase == _BEFORE_OBJECT:
+                if c == "{":
+                    self.phase = _EXPECT_KEY
+                self.pos += 1
+
+            elif phase == _EXPECT_KEY:
+                if c == '"':
+                    self.phase = _IN_KEY
+                    self._key_start = self.pos + 1
+                    self._escape = False
+                elif c == "}":
+                    self._finish_document(events)
+                self.pos += 1
+
+            elif phase == _IN_KEY:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._key = _decode_string(buf[self._key_start:self.pos])
+                    self.phase = _EXPECT_COLON
+                self.pos += 1
+
+            elif phase == _EXPECT_COLON:
+                if c == ":":
+                    self.phase = _EXPECT_VALUE
+                self.pos += 1
+
+            elif phase == _EXPECT_VALUE:
+                if c in WHITESPACE:
+                    self.pos += 1
+                elif c == '"':
+                    self.phase = _IN_STRING_VALUE
+                    self._value_start = self.pos + 1
+                    self._decoded_to = self._value_start
+                    self.partial_text[self._key] = ""
+                    self.pos += 1
+                elif c in "{[":
+                    self.phase = _IN_CONTAINER_VALUE
+                    self._value_start = self.pos
+                    self._depth = 1
+                    self._in_string = False
+                    self._escape = False
+                    self.pos += 1
+                else:
+                    self.phase = _IN_SCALAR_VALUE
+                    self._value_start = self.pos
+
+            elif phase == _IN_STRING_VALUE:
+                self._scan_string_value(events)
+                if self.phase == _IN_STRING_VALUE:
+                    break  # need more data (possibly a split escape sequence)
+
+            elif phase == _IN_CONTAINER_VALUE:
+                if self._in_string:
+                    if self._escape:
+                        self._escape = False
+                    elif c == "\\":
+                        self._escape = True
+                    elif c == '"':
+                        self._in_string = False
+                elif c == '"':
+                    self._in_string = True
+                elif c in "{[":
+                    self._depth += 1
+                elif c in "}]":
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self._complete_field(buf[self._value_start:self.pos + 1], events)
+                self.pos += 1
+
+            elif phase == _IN_SCALAR_VALUE:
+                if c in ",}" or c in WHITESPACE:
+                    self._complete_field(buf[self._value_start:self.pos], events)
+                    # Let _AFTER_VALUE handle the delimiter itself
+                else:
+                    self.pos += 1
+
+            elif phase == _AFTER_VALUE:
+                if c == ",":
+                    self.phase = _EXPECT_KEY
+                elif c == "}":
+                    self._finish_document(events)
+                self.pos += 1
+
+        return events
+
+    def result(self):
+        """Every completed top-level field parsed so far"""
+        return dict(self.fields)
+
+    def salvage(self):
+        """
+        Best-effort document for a truncated response: all completed fields
+        plus the partial text of a string field that was cut off. A cut-off
+        string gets a trailing "..." so the caller's continuation logic can
+        pick it up.
+        """
+        recovered = self.result()
+        if self.phase == _IN_STRING_VALUE and self._key not in recovered:
+            text = self.partial_text.get(self._key, "").rstrip()
+            if text:
+                recovered[self._key] = text + "..."
+        return recovered
+
+    # ------------------------------------------------------------------
+
+    def _scan_string_value(self, events):
+        buf = self.buffer
+        n = len(buf)
+        i = self.pos
+        safe_end = self._decoded_to
+        closed = False
+
+        while i < n:
+            c = buf[i]
+            if c == "\\":
+                seq_len = 6 if buf[i + 1:i + 2] == "u" else 2
+                # Keep a high surrogate together with its low half
+                if seq_len == 6 and buf[i + 2:i + 4].lower() in ("d8", "d9", "da", "db"):
+                    seq_len = 12
+                if i + seq_len > n:
+                    break
+                i += seq_len
+                safe_end = i
+            elif c == '"':
+                closed = True
+                break
+            else:
+                i += 1
+                safe_end = i
+
+        if safe_end > self._decoded_to:
+            text = _decode_string(buf[self._decoded_to:safe_end])
+            self.partial_text[self._key] += text
+            self._decoded_to = safe_end
+            events.append({"type": FIELD_CHUNK, "field": self._key, "text": text})
+
+        if closed:
+            value = self.partial_text[self._key]
+            self.fields[self._key] = value
+            events.append({"type": FIELD_COMPLETE, "field": self._key, "value": value})
+            self.phase = _AFTER_VALUE
+            self.pos = i + 1
+        else:
+            self.pos = i
+
+    def _complete_field(self, raw, events):
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            # Malformed subtree: skip the field but keep parsing the rest
+            self.phase = _AFTER_VALUE
+            return
+        self.fields[self._key] = value
+        events.append({"type": FIELD_COMPLETE, "field": self._key, "value": value})
+        self.phase = _AFTER_VALUE
+
+    def _finish_document(self, events):
+        self.phase = _DONE
+        self.complete = True
+        events.append({"type": DOCUMENT_COMPLETE, "value": self.result()})
+
+
+def _decode_string(raw):
+    try:
+        return json.loads(f'"{raw}"')
+    except json.JSONDecodeError:
+        return raw
+
+
+def parse_partial(text):
+    """Parse a (possibly truncated) JSON response, returning what can be recovered"""
+    parser = StreamingJSONParser()
+    parser.feed(text)
+    return parser.salvage()
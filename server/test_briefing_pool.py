@@ -0,0 +1,71 @@
+import asyncio
+
+import metrics
+from briefing_pool import BriefingPool
+
+
+def test_pool_fill_and_take():
+    metrics.reset()
+    calls = []
+
+    async def generate(faction_id, faction_name, model):
+        calls.append((faction_id, faction_name, model))
+        await asyncio.sleep(0)
+        return {"narrative": f"Briefing {len(calls)} for {faction_name}"}
+
+    async def main():
+        pool = BriefingPool(generate, size=2)
+        assert pool.fill("usa", "North American Alliance", "m1") == 2
+        assert pool.fill("usa", "North American Alliance", "m1") == 0  # already in flight
+        await asyncio.gather(*pool.tasks)
+        assert len(pool.pools[("usa", "m1")]) == 2
+
+        first = pool.take("usa", "North American Alliance", "m1")
+        assert first["narrative"] == "Briefing 1 for North American Alliance"
+        # Another model is a separate pool
+        assert pool.take("usa", "North American Alliance", "m2") is None
+        await asyncio.gather(*pool.tasks)
+        # The taken briefing was replaced, and m2 got its own pool
+        assert len(pool.pools[("usa", "m1")]) == 2
+        assert len(pool.pools[("usa", "m2")]) == 2
+        second = pool.take("usa", "North American Alliance", "m1")
+        assert second["narrative"] != first["narrative"]
+
+        # Briefings written for another faction name are not handed out
+        assert pool.take("usa", "United States", "m1") is None
+        await asyncio.gather(*pool.tasks)
+        assert all(name == "United States" for f, name, m in calls[-2:])
+        assert len(pool.pools[("usa", "m1")]) == 2
+        assert pool.refill() == 0
+
+    asyncio.run(main())
+    counters = metrics.snapshot()["counters"]
+    assert counters["briefing_pool_hits"] == 2
+    assert counters["briefing_pool_misses"] == 2
+    print("SUCCESS: Pool fills per (faction, model) and refills as it is consumed.")
+
+
+def test_failures_are_not_pooled():
+    async def generate(faction_id, faction_name, model):
+        if faction_id == "rogue":
+            raise RuntimeError("Ollama unavailable")
+        return None  # unparsable output
+
+    async def main():
+        pool = BriefingPool(generate, size=2)
+        pool.fill("rogue", "Rogue AI Collective", "m1")
+        pool.fill("eu", "European Union", "m1")
+        await asyncio.gather(*pool.tasks)
+        assert not pool.pools[("rogue", "m1")] and not pool.pools[("eu", "m1")]
+        assert pool.pending[("rogue", "m1", "Rogue AI Collective")] == 0
+        # Nothing in flight, so a refill tries again
+        assert pool.refill() == 4
+        await asyncio.gather(*pool.tasks)
+
+    asyncio.run(main())
+    print("SUCCESS: Failed generations leave the pool empty and retryable.")
+
+
+if __name__ == "__main__":
+    test_pool_fill_and_take()
+    test_failures_are_not_pooled()
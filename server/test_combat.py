@@ -0,0 +1,102 @@
+import copy
+
+from combat import parse_action, parse_amount, resolve_action, resolve_order, is_overseas, TROOPS_PER_SHIP
+from fixtures import make_state
+
+
+def test_parse_action():
+    print("Testing order parsing...")
+    state = make_state().state
+    assert parse_action("Attack Kazakhstan from the US with 50k troops", "usa", state) == \
+        {"type": "attack", "origin": "US", "target": "KZ", "troops": 50000}
+    assert parse_action("Move 20,000 troops from the US to South Korea", "usa", state) == \
+        {"type": "move", "origin": "US", "target": "KR", "troops": 20000}
+    # No origin named: the strongest own country
+    assert parse_action("Invade Kazakhstan", "usa", state)["origin"] == "US"
+    # Left to the LLM: several targets, own country attacked, non-kinetic ops
+    assert parse_action("Attack Russia and China", "usa", state) is None
+    assert parse_action("Invade Canada", "usa", state) is None
+    assert parse_action("Launch a cyber attack on Iran", "usa", state) is None
+    assert parse_action("Launch an attack on Kazakhstan", "usa", state)["target"] == "KZ"
+    # Diplomacy, and attack verbs whose object is not the country
+    assert parse_action("Strike a trade deal with India", "usa", state) is None
+    assert resolve_order("Strike a trade deal with India", "usa", state, "g1:1") is None
+    assert parse_action("Strike a bargain with India", "usa", state) is None
+    assert parse_action("Send an envoy to South Korea", "usa", state) is None
+    print("SUCCESS: Orders parsed into action intents.")
+
+
+def test_attack_is_reproducible_and_applied():
+    print("Testing attack resolution...")
+    gs = make_state()
+    action = {"type": "attack", "origin": "US", "target": "KZ", "troops": 300000}
+    first = resolve_action(action, gs.state, "usa", "g1:3")
+    assert resolve_action(action, gs.state, "usa", "g1:3") == first
+    assert first["military_updates"]["US"]["troops"] < 0
+
+    before = copy.deepcopy(gs.state["military"])
+    gs.update_military(first["military_updates"])
+    gs.update_territory(first["territory_updates"])
+    for code, row in gs.state["military"].items():
+        assert min(row.values()) >= 0, code
+    if first["success"]:
+        assert gs.state["ownership"]["KZ"] == "usa"
+        # Only part of the invading force survives the battle
+        assert 0 < gs.state["military"]["KZ"]["troops"] < 300000
+    else:
+        assert gs.state["ownership"]["KZ"] == "russia"
+        assert gs.state["military"]["KZ"]["troops"] < before["KZ"]["troops"]
+    print(f"  {first['summary']}")
+    print("SUCCESS: Same seed, same outcome; deltas apply cleanly.")
+
+
+def test_overseas_move_needs_transports():
+    print("Testing logistics...")
+    gs = make_state()
+    assert is_overseas("US", "KR") and not is_overseas("RU", "KZ")
+    outcome = resolve_order("Move 20,000 troops from the US to South Korea", "usa", gs.state, "g1:1")
+    updates = outcome["military_updates"]
+    assert updates["US"]["troops"] == -20000 and updates["KR"]["troops"] == 20000
+    assert updates["KR"]["navy"] >= 20000 // TROOPS_PER_SHIP
+    assert updates["US"]["navy"] == -updates["KR"]["navy"]
+
+    gs.state["military"]["US"]["navy"] = 0
+    blocked = resolve_order("Move 20,000 troops from the US to South Korea", "usa", gs.state, "g1:1")
+    assert not blocked["success"] and blocked["military_updates"] == {}
+    assert "transports" in blocked["summary"]
+    print("SUCCESS: Overseas moves carry ships and need them.")
+
+
+def test_amounts_and_proportional_losses():
+    print("Testing troop counts and losses against weak attacks...")
+    assert parse_amount("Attack Iran with 100 jets") is None
+    assert parse_amount("Send 40 ships and 5,000 troops") == 5000
+    assert parse_amount("Invade with 50k") == 50000
+    assert parse_amount("Invade with 300 men") == 300
+
+    gs = make_state()
+    iran = gs.state["military"]["IR"]
+    # A token force is wiped out and barely scratches the defender
+    for seed in range(5):
+        action = {"type": "attack", "origin": "US", "target": "IR", "troops": 100}
+        outcome = resolve_action(action, gs.state, "usa", f"g1:{seed}")
+        assert not outcome["success"]
+        assert -outcome["military_updates"]["IR"]["troops"] <= 100, outcome["summary"]
+        assert -outcome["military_updates"]["US"]["troops"] <= 100
+
+    # A crushing attack loses little against a token garrison
+    gs.state["military"]["CU"] = {"troops": 100, "navy": 0, "airforce": 0}
+    action = {"type": "attack", "origin": "US", "target": "CU", "troops": 200000}
+    outcome = resolve_action(action, gs.state, "usa", "g1:1")
+    assert outcome["success"]
+    survivors = outcome["military_updates"]["CU"]["troops"] + 100
+    assert 200000 - survivors <= 100, outcome["summary"]
+    assert iran == gs.state["military"]["IR"]
+    print("SUCCESS: Losses bounded by the opposing strength.")
+
+
+if __name__ == "__main__":
+    test_parse_action()
+    test_attack_is_reproducible_and_applied()
+    test_overseas_move_needs_transports()
+    test_amounts_and_proportional_losses()
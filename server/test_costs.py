@@ -0,0 +1,51 @@
+from costs import check_cost, enforce_cost
+from intent_classifier import classify
+
+STATE = {"resources": 1000, "oil": 100, "tech": 10, "influence": 50}
+
+
+def check(text, state=STATE):
+    return check_cost(text, classify(text, "usa"), state)
+
+
+def test_cost_check():
+    print("Testing cost table and affordability...")
+    attack = check("Invade Kazakhstan with 50k troops")
+    assert attack["category"] == "attack" and attack["affordable"]
+    assert "AFFORDABLE" in attack["verdict"] and "oil: -30" in attack["verdict"]
+
+    cyber = check("Launch a cyber attack on Iran's grid")
+    assert cyber["category"] == "cyber"
+    assert not cyber["affordable"] and cyber["shortfall"] == {"tech": 10}
+    assert "NOT AFFORDABLE" in cyber["verdict"]
+
+    assert check("Propose a trade deal to the EU")["category"] == "diplomacy"
+    # Diplomatic orders are diplomacy even with a movement or attack verb
+    for text in ["Send aid to Romania", "Send an envoy to Beijing", "Move our embassy to Jerusalem",
+                 "Strike a trade deal with India"]:
+        assert check(text)["category"] == "diplomacy", text
+    assert check("Send 10k troops to Poland")["category"] == "deployment"
+    # Questions and data queries are free
+    assert check("Should I attack Iran?") is None
+    assert check("What are my forces?") is None
+    print("SUCCESS: Orders priced, shortfalls detected.")
+
+
+def test_enforce_cost():
+    print("Testing verdict enforcement...")
+    attack = check("Invade Kazakhstan with 50k troops")
+    response = {"resource_updates": {"budget": -500, "oil": 0, "influence": 3}}
+    enforce_cost(response, attack)
+    assert response["resource_updates"] == {"budget": -50, "oil": -30, "influence": 3}
+
+    cyber = check("Launch a cyber attack on Iran's grid")
+    response = {"resource_updates": {"tech": -20, "influence": -2},
+                "military_updates": {"IR": {"troops": -100}}, "territory_updates": {"IR": "usa"}}
+    enforce_cost(response, cyber)
+    assert response == {"resource_updates": {"tech": 0, "influence": 0}}
+    print("SUCCESS: Affordable actions charged exactly, rejected ones change nothing.")
+
+
+if __name__ == "__main__":
+    test_cost_check()
+    test_enforce_cost()
@@ -0,0 +1,53 @@
+from entity_matcher import match_entities, strip_entities, get_relevant_entities
+from prompts import INITIAL_WORLD_STATE
+import time
+
+
+def test_entity_matcher():
+    print("Testing country/faction entity matcher...")
+    cases = {
+        "Invade Kazakhstan": ({"KZ"}, set()),
+        "Negotiate with Iran and the Russians": ({"IR", "RU"}, set()),
+        "Attack KZ from RU with 50k troops": ({"KZ", "RU"}, set()),
+        "Send aid to Romania in the European Union": ({"RO"}, {"eu"}),
+        "Talk to North Korea": ({"KP"}, set()),
+        "What are my forces?": (set(), set()),
+        "it is in the region": (set(), set()),
+    }
+    for text, (countries, factions) in cases.items():
+        found = match_entities(text)
+        print(f"  {text!r}: {found}")
+        assert found["countries"] == countries, text
+        assert found["factions"] == factions, text
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        match_entities("Deploy troops from the United States to South Korea and negotiate with China")
+    per_call_ms = (time.perf_counter() - start)
+    print(f"  {per_call_ms:.3f} ms per match")
+    print("SUCCESS: Entities matched.")
+
+
+def test_strip_entities():
+    print("Testing name stripping...")
+    assert strip_entities("What are Russia's forces in KZ?").split() == ["what", "are", "'s", "forces", "in", "?"]
+    # Longest phrase wins, and only upper-case ISO codes are names
+    assert strip_entities("Show us North Korea").split() == ["show", "us"]
+    print("SUCCESS: Names removed, other words kept.")
+
+
+def test_relevant_entities():
+    print("Testing relevance expansion...")
+    ownership = dict(INITIAL_WORLD_STATE)
+    ownership['KZ'] = 'china'
+    factions, countries = get_relevant_entities(["Invade Kazakhstan and Peru"], 'usa', ownership)
+    assert countries == {'KZ', 'PE'}
+    # Current owner of KZ is pulled in; the neutral bloc is not
+    assert factions == {'usa', 'china'}
+    print("SUCCESS: Owners and player faction included.")
+
+
+if __name__ == "__main__":
+    test_entity_matcher()
+    test_strip_entities()
+    test_relevant_entities()
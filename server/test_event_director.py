@@ -0,0 +1,114 @@
+import asyncio
+import random
+
+import fixtures
+import metrics
+from event_director import EVENT_LIBRARY, EventSlot, direct_event, pick_event, should_fire, get_event_flavor_messages
+
+
+def make_state():
+    return fixtures.make_state().state
+
+
+def test_schedule():
+    print("Testing event schedule...")
+    state = make_state()
+    state["turn_count"], state["last_event_turn"] = 5, 3
+    assert not any(should_fire(state, random.Random(i)) for i in range(50))
+    state["turn_count"] = 8  # 5 turns since the last event: always fires
+    assert all(should_fire(state, random.Random(i)) for i in range(50))
+    print("SUCCESS: Events wait for the minimum gap, then become certain.")
+
+
+def test_reproducible_events():
+    print("Testing seeded event selection...")
+    state = make_state()
+    state["turn_count"] = 10
+    first = direct_event(state, "usa", "game1:10")
+    assert first is not None
+    assert direct_event(state, "usa", "game1:10") == first
+    titles = {direct_event(state, "usa", f"game{i}:10")["title"] for i in range(30)}
+    assert len(titles) > 5
+    print(f"  {first['title']}: {first['description']} {first['impact']}")
+    print("SUCCESS: Same game and turn, same event; different games vary.")
+
+
+def test_templates_respect_state():
+    print("Testing template parameters...")
+    state = make_state()
+    ids = {t["id"] for t in EVENT_LIBRARY}
+    for i in range(200):
+        rng = random.Random(i)
+        event = pick_event(state, "usa", rng)
+        assert event["template"] in ids and "{" not in event["title"] + event["description"]
+        template = next(t for t in EVENT_LIBRARY if t["id"] == event["template"])
+        owner = state["ownership"][event["country"]]
+        if template["scope"] == "own":
+            assert owner == "usa"
+        elif template["scope"] == "rival":
+            assert owner not in ("usa", "neutral")
+        # Only templates allowed at the current DEFCON
+        low, high = template.get("defcon", (1, 5))
+        assert low <= state["defcon"] <= high
+
+    # Higher tension, harsher impact
+    calm = pick_event(state, "usa", random.Random(7))
+    state["defcon"] = 2
+    tense = pick_event(state, "usa", random.Random(7))
+    if calm["template"] == tense["template"]:
+        assert sum(abs(v) for v in tense["impact"].values()) >= sum(abs(v) for v in calm["impact"].values())
+
+    # The last template isn't repeated
+    state["last_event_data"] = {"template": "earthquake"}
+    assert all(pick_event(state, "usa", random.Random(i))["template"] != "earthquake" for i in range(100))
+    print("SUCCESS: Scope, DEFCON range and repeats respected.")
+
+
+def test_flavor_messages():
+    state = make_state()
+    event = pick_event(state, "usa", random.Random(1))
+    messages = get_event_flavor_messages(event, "usa", 2027)
+    assert event["title"] in messages[-1]["content"]
+
+
+def test_event_slot():
+    metrics.reset()
+    state = make_state()
+    event = pick_event(state, "usa", random.Random(1))
+    calls = []
+
+    async def narrate():
+        calls.append(1)
+        return "Breaking news."
+
+    async def main():
+        slot = EventSlot()
+        key = ("g:5", 7, "usa", "model")
+        assert slot.park(key, event, narrate)
+        assert not slot.park(key, dict(event), narrate)  # already parked
+        task = slot.claim(key, dict(event))
+        assert task is not None and await task == "Breaking news."
+        assert slot.claim(key, event) is None  # handed over once
+
+        # The state changed since the event was predicted: discard it
+        slot.park(key, event, narrate)
+        parked = slot.task
+        assert slot.claim(("g:5", 8, "usa", "model"), event) is None
+        await asyncio.sleep(0)
+        assert parked.cancelled() and slot.task is None
+
+    asyncio.run(main())
+    counters = metrics.snapshot()["counters"]
+    assert counters["event_speculations"] == 2
+    assert counters["event_speculation_hits"] == 1
+    assert counters["event_speculation_misses"] == 1
+    assert len(calls) == 1
+    print("SUCCESS: Parked narratives are reused only for the same event and state.")
+
+
+if __name__ == "__main__":
+    test_schedule()
+    test_reproducible_events()
+    test_templates_respect_state()
+    test_flavor_messages()
+    test_event_slot()
@@ -0,0 +1,118 @@
+from game_state import GameState
+import fixtures
+import metrics
+
+
+def make_state(**kwargs):
+    gs = fixtures.make_state(**kwargs)
+    gs.state = gs.initialize_default_state()
+    return gs
+
+
+def test_military_table_string():
+    print("Testing compact military table...")
+    gs = make_state()
+    gs.state['military']['US'] = {'troops': 1234567, 'navy': 450, 'airforce': 4012}
+    gs.update_territory({'KZ': 'usa'})
+
+    table = gs.get_military_table_string()
+    lines = table.split("\n")
+    start = lines.index("[USA]") + 1
+    end = next(i for i in range(start, len(lines)) if not lines[i] or lines[i].startswith("["))
+    usa_rows = lines[start:end]
+    assert "US 1234567 450 4012" in usa_rows
+    # Conquered country is listed under its current owner
+    assert any(row.startswith("KZ ") for row in usa_rows)
+
+    rounded = gs.get_military_table_string(sig_figs=2)
+    assert "US 1200k 450 4k" in rounded
+
+    focused = gs.get_military_table_string(focus_factions=['usa'], focus_countries=['RU'])
+    assert "US 1234567 450 4012" in focused
+    assert "\nRU " in focused
+    assert "\nCN " not in focused
+    assert "OTHER FACTIONS, TOTALS ONLY" in focused and "[CHINA]" in focused
+    print("SUCCESS: Compact table groups by current owner and supports focus/rounding.")
+
+
+def test_write_behind_single_save_per_turn():
+    print("Testing write-behind persistence...")
+    gs = make_state(storage_mode="snapshot")
+    metrics.reset()
+    gs.update_military({'US': {'troops': -1000}})
+    gs.update_territory({'KZ': 'usa'})
+    gs.apply_delta('resources', -50)
+    gs.set_value('turn_count', 3)
+    assert gs.dirty
+    assert metrics.snapshot()["counters"].get("state_saves", 0) == 0
+
+    gs.end_turn()
+    assert not gs.dirty
+    assert metrics.snapshot()["counters"]["state_saves"] == 1
+    # Nothing changed since: no write
+    assert gs.flush() is False
+    assert GameState(gs.SAVE_FILE, storage_mode="snapshot").state['ownership']['KZ'] == 'usa'
+
+    immediate = fixtures.make_state(durability="immediate", storage_mode="snapshot")
+    saves = metrics.snapshot()["counters"]["state_saves"]
+    immediate.set_value('defcon', 3)
+    assert not immediate.dirty
+    assert metrics.snapshot()["counters"]["state_saves"] == saves + 1
+    print("SUCCESS: One coalesced save per turn.")
+
+
+def test_journal_replay_and_compaction():
+    print("Testing journaled storage...")
+    import game_state
+    gs = make_state(storage_mode="journal")
+    gs.save_state()
+    metrics.reset()
+
+    gs.update_military({'US': {'troops': -1000}})
+    gs.update_territory({'KZ': 'china'})
+    gs.apply_delta('resources', -50)
+    gs.end_turn()
+    counters = metrics.snapshot()["counters"]
+    assert counters["state_journal_appends"] == 1 and "state_saves" not in counters
+    # The record only carries what changed
+    assert metrics.snapshot()["series"]["state_write_bytes"]["last"] < 200
+
+    reloaded = GameState(gs.SAVE_FILE, storage_mode="journal")
+    assert reloaded.state == gs.state
+    assert reloaded.journal_records == 1
+
+    # Compacts into a full snapshot every SNAPSHOT_EVERY records
+    for i in range(game_state.SNAPSHOT_EVERY):
+        gs.set_value('turn_count', i)
+        gs.end_turn()
+    assert metrics.snapshot()["counters"]["state_saves"] == 1
+    assert gs.journal_records == 0
+    assert GameState(gs.SAVE_FILE, storage_mode="journal").state == gs.state
+    print("SUCCESS: Journal replays on load and compacts periodically.")
+
+
+def test_faction_index_is_incremental():
+    print("Testing faction -> countries index...")
+    gs = make_state()
+    gs.get_military_table_string()  # caches each faction's listing order
+    gs.update_territory({'KZ': 'usa', 'PE': 'china'})
+    gs.update_military({'KZ': {'troops': -5000, 'navy': -10**6}, 'US': {'airforce': 12}})
+    table = gs.get_military_table_string()
+    assert 'KZ' in gs.get_faction_countries('usa')
+    assert 'KZ' not in gs.get_faction_countries('russia')
+    assert 'PE' in gs.get_faction_countries('china')
+
+    incremental = {f: dict(t) for f, t in gs.faction_totals.items()}
+    gs.rebuild_index()
+    assert incremental == gs.faction_totals
+    assert gs.get_military_table_string() == table
+    assert gs.get_faction_totals('usa')['countries'] == len(gs.get_faction_countries('usa'))
+    assert gs.get_faction_totals('nobody')['countries'] == 0
+    print("SUCCESS: Index and totals match a full rebuild.")
+
+
+if __name__ == "__main__":
+    test_military_table_string()
+    test_write_behind_single_save_per_turn()
+    test_journal_replay_and_compaction()
+    test_faction_index_is_incremental()
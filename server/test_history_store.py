@@ -0,0 +1,74 @@
+import asyncio
+
+from fixtures import temp_path
+from history_store import HistoryStore
+
+
+def test_rolling_summary():
+    print("Testing rolling history summary...")
+    path = temp_path("history.json")
+    store = HistoryStore(path=path, keep_recent=4)
+    for i in range(4):
+        store.add_exchange(f"Command {i}", f"Turn {i} happened. Details follow.")
+    # Only the last 2 exchanges stay verbatim
+    assert [m["content"] for m in store.get_recent_messages()] == [
+        "Command 2", "Turn 2 happened. Details follow.", "Command 3", "Turn 3 happened. Details follow."
+    ]
+    assert len(store.pending) == 4
+    assert "Turn 0 happened." in store.get_summary_string()
+
+    async def summarize(messages):
+        assert "Command 1" in messages[-1]["content"]
+        return "The player issued two commands."
+
+    asyncio.run(store.update_summary(summarize))
+    assert store.pending == []
+    assert store.summary == "The player issued two commands."
+
+    # Persisted across restarts
+    reloaded = HistoryStore(path=path, keep_recent=4)
+    assert reloaded.summary == store.summary
+    assert reloaded.recent == store.recent
+
+    # LLM failure falls back to the first sentence of each evicted answer
+    store.add_exchange("Command 4", "Turn 4 happened. More text.")
+
+    async def failing(messages):
+        raise RuntimeError("offline")
+
+    asyncio.run(store.update_summary(failing))
+    assert store.summary.endswith("Turn 2 happened.")
+    print("SUCCESS: History kept bounded with summary.")
+
+
+def test_reset_discards_summary_in_flight():
+    print("Testing reset during a summary update...")
+    store = HistoryStore(path=temp_path("history.json"), keep_recent=2)
+    store.add_exchange("Invade Kazakhstan", "OLD GAME: Kazakhstan was conquered.")
+    store.add_exchange("Hold the line", "The front is quiet.")
+
+    async def main():
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_summarize(messages):
+            started.set()
+            await release.wait()
+            return "OLD GAME: Kazakhstan was conquered."
+
+        update = asyncio.create_task(store.update_summary(slow_summarize))
+        await started.wait()
+        store.reset()  # /api/reset or a new briefing
+        release.set()
+        await update
+
+    asyncio.run(main())
+    assert store.summary == "" and store.pending == []
+    assert store.get_summary_string() == ""
+    assert HistoryStore(path=store.path).summary == ""
+    print("SUCCESS: The previous game's summary is not written back.")
+
+
+if __name__ == "__main__":
+    test_rolling_summary()
+    test_reset_discards_summary_in_flight()
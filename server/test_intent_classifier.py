@@ -0,0 +1,76 @@
+import json
+import time
+
+from fixtures import temp_path
+import intent_classifier
+from intent_classifier import (
+    classify, classify_and_log, route, is_question,
+    DATA_QUERY, QUESTION, DIPLOMATIC, MILITARY, OTHER
+)
+
+
+def test_labels():
+    print("Testing intent labels...")
+    cases = {
+        "What are my forces?": DATA_QUERY,
+        "Is Russia a threat?": QUESTION,
+        "Should I attack Iran?": QUESTION,
+        "What is happening in the Middle East?": QUESTION,
+        "Propose a trade deal to the EU": DIPLOMATIC,
+        "Can we negotiate peace with China?": DIPLOMATIC,
+        "Impose sanctions on Russia": DIPLOMATIC,
+        "Attack Iran": MILITARY,
+        "Deploy 50k troops to the border": MILITARY,
+        "Strike Iran's nuclear sites": MILITARY,
+        "Launch missiles at Tehran": MILITARY,
+        # "strike"/"launch" in a diplomatic phrase
+        "Strike a trade deal with India": DIPLOMATIC,
+        "Launch peace talks with Russia": DIPLOMATIC,
+        # Ambiguous: the riskier label wins
+        "Can we attack Kazakhstan with our troops?": MILITARY,
+        "Increase funding for AI research": OTHER,
+    }
+    for text, label in cases.items():
+        assert classify(text, "usa")["label"] == label, (text, classify(text, "usa"))
+    print("SUCCESS: Inputs labelled as expected.")
+
+
+def test_routes():
+    print("Testing routes...")
+    assert route(classify("resources", "usa")) == "local"
+    assert route(classify("Is Russia a threat?", "usa")) == "fast"
+    assert route(classify("Attack Iran", "usa")) == "full"
+    assert route(classify("Increase funding for AI research", "usa")) == "full"
+    assert is_question(classify("Is Russia a threat?", "usa"))
+    assert not is_question(classify("Attack Iran", "usa"))
+    print("SUCCESS: Each label routed to its pipeline.")
+
+
+def test_speed_and_log():
+    print("Testing classification speed and decision log...")
+    start = time.perf_counter()
+    for _ in range(1000):
+        classify("Can we negotiate peace with China and stop the war?", "usa")
+    per_call_ms = (time.perf_counter() - start)
+    print(f"  {per_call_ms:.4f} ms per classification")
+    assert per_call_ms < 1
+
+    log_file = temp_path("intent_log.jsonl")
+    old = intent_classifier.INTENT_LOG_FILE
+    intent_classifier.INTENT_LOG_FILE = log_file
+    try:
+        classify_and_log("Attack Iran", "usa", "g1")
+        classify_and_log("What are my forces?", "usa", "g1")
+    finally:
+        intent_classifier.INTENT_LOG_FILE = old
+    with open(log_file) as f:
+        records = [json.loads(line) for line in f]
+    assert [(r["label"], r["route"]) for r in records] == [(MILITARY, "full"), (DATA_QUERY, "local")]
+    assert records[0]["input"] == "Attack Iran" and records[0]["game_id"] == "g1"
+    print("SUCCESS: Sub-millisecond, decisions logged.")
+
+
+if __name__ == "__main__":
+    test_labels()
+    test_routes()
+    test_speed_and_log()
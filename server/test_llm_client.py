@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+import httpx
+
+from llm_client import OllamaClient, LLMError, LLMConnectionError, LLMTimeoutError
+
+
+def make_client(handler):
+    return OllamaClient("http://ollama.test", transport=httpx.MockTransport(handler))
+
+
+def ndjson(*chunks):
+    return "".join(json.dumps(c) + "\n" for c in chunks)
+
+
+def expect_error(coro, error_type, status_code):
+    try:
+        asyncio.run(coro)
+    except error_type as e:
+        assert e.status_code == status_code, e.status_code
+        return str(e)
+    raise AssertionError(f"{error_type.__name__} not raised")
+
+
+def test_error_mapping():
+    print("Testing transport error mapping...")
+
+    def refuse(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    def stall(request):
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    def fail(request):
+        return httpx.Response(500, text="model 'nope' not found")
+
+    messages = [{"role": "user", "content": "hi"}]
+    expect_error(make_client(refuse).chat("m", messages), LLMConnectionError, 503)
+    expect_error(make_client(stall).chat("m", messages), LLMTimeoutError, 504)
+    detail = expect_error(make_client(fail).chat("m", messages), LLMError, 500)
+    assert "model 'nope' not found" in detail
+    expect_error(make_client(fail).list_models(), LLMError, 500)
+    assert asyncio.run(make_client(refuse).ping()) is False
+    print("SUCCESS: Connect -> 503, timeout -> 504, non-200 -> LLMError.")
+
+
+def test_chat_request_and_content():
+    print("Testing non-streaming chat...")
+    seen = {}
+
+    def answer(request):
+        seen.update(json.loads(request.content))
+        return httpx.Response(200, json={"message": {"role": "assistant", "content": '{"narrative": "ok"}'}, "done": True})
+
+    content = asyncio.run(make_client(answer).chat_content("m", [], options={"num_ctx": 4096}))
+    assert content == '{"narrative": "ok"}'
+    assert seen["stream"] is False and seen["format"] == "json"
+    assert seen["options"] == {"num_ctx": 4096} and seen["keep_alive"]
+    print("SUCCESS: Payload built and content extracted.")
+
+
+def collect(client):
+    async def main():
+        return [chunk async for chunk in client.chat_stream("m", [])]
+    return asyncio.run(main())
+
+
+def test_chat_stream_chunks_and_done():
+    print("Testing streamed chat...")
+    body = (ndjson({"message": {"content": '{"narr'}, "done": False},
+                   {"message": {"content": 'ative": "x"}'}, "done": False}) +
+            "\nnot json\n" +
+            ndjson({"message": {"content": ""}, "done": True, "eval_count": 7},
+                   {"message": {"content": "after done"}, "done": False}))
+    chunks = collect(make_client(lambda request: httpx.Response(200, text=body)))
+    # Blank and undecodable lines skipped, nothing read after "done"
+    assert "".join(c["message"]["content"] for c in chunks) == '{"narrative": "x"}'
+    assert chunks[-1]["done"] and chunks[-1]["eval_count"] == 7
+
+    # Errors reported mid-stream, non-200 answers and transport failures
+    error_body = ndjson({"message": {"content": "{"}, "done": False}, {"error": "out of memory"})
+    try:
+        collect(make_client(lambda request: httpx.Response(200, text=error_body)))
+        raise AssertionError("stream error not raised")
+    except LLMError as e:
+        assert "out of memory" in str(e)
+
+    def refuse(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    def stall(request):
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    for handler, error_type, status in [
+        (lambda request: httpx.Response(404, text="no such model"), LLMError, 500),
+        (refuse, LLMConnectionError, 503),
+        (stall, LLMTimeoutError, 504),
+    ]:
+        try:
+            collect(make_client(handler))
+            raise AssertionError("stream error not raised")
+        except error_type as e:
+            assert e.status_code == status
+    print("SUCCESS: Chunks yielded up to done; failures mapped.")
+
+
+if __name__ == "__main__":
+    test_error_mapping()
+    test_chat_request_and_content()
+    test_chat_stream_chunks_and_done()
@@ -0,0 +1,59 @@
+import time
+
+import numpy as np
+
+from fixtures import make_state
+from military_table import MilitaryTable
+
+
+def make_table():
+    state = make_state().state
+    return state, MilitaryTable.from_state(state['military'], state['ownership'])
+
+
+def test_round_trip_and_deltas():
+    print("Testing columnar military table...")
+    state, table = make_table()
+    assert table.to_dict() == state['military']
+    assert table.to_ownership() == state['ownership']
+
+    us_troops = state['military']['US']['troops']
+    updated = table.apply_deltas({
+        'US': {'troops': -1000, 'navy': 5},
+        'KZ': {'troops': -10**9},  # Clamped at zero
+        'XX': {'troops': 5},       # Unknown country ignored
+    })
+    assert updated == ['US', 'KZ']
+    assert table.get('US')['troops'] == us_troops - 1000
+    assert table.get('US')['navy'] == state['military']['US']['navy'] + 5
+    assert table.get('KZ')['troops'] == 0
+    print("SUCCESS: JSON round trip and clamped batch deltas.")
+
+
+def test_totals_by_faction():
+    print("Testing group-by totals...")
+    state, table = make_table()
+    table.set_owners({'KZ': 'usa'})
+    state['ownership']['KZ'] = 'usa'
+
+    expected = {}
+    for code, forces in state['military'].items():
+        t = expected.setdefault(state['ownership'][code], {'countries': 0, 'troops': 0, 'navy': 0, 'airforce': 0})
+        t['countries'] += 1
+        for col in ('troops', 'navy', 'airforce'):
+            t[col] += forces[col]
+    assert table.totals_by_faction() == expected
+
+    start = time.perf_counter()
+    deltas = np.full(table.forces.shape, -10, dtype=np.int64)
+    for _ in range(1000):
+        table.apply_delta_array(deltas)
+        table.totals_by_faction()
+    print(f"  {(time.perf_counter() - start):.3f} ms per simulated turn (delta + totals)")
+    assert table.forces.min() >= 0
+    print("SUCCESS: Totals match a per-country scan.")
+
+
+if __name__ == "__main__":
+    test_round_trip_and_deltas()
+    test_totals_by_faction()
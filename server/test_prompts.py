@@ -0,0 +1,112 @@
+from fixtures import make_state
+import metrics
+from prompts import get_static_system_prompt, get_dynamic_state_prompt
+
+
+def test_static_prefix_is_stable():
+    print("Testing static prompt prefix stability...")
+    gs = make_state()
+    state = gs.initialize_default_state()
+
+    prefix = get_static_system_prompt()
+
+    # Mutate everything volatile: the static prefix must not change
+    state['ownership']['KZ'] = 'usa'
+    state['resources'] = 12
+    state['defcon'] = 2
+    assert get_static_system_prompt() == prefix
+    assert "Player Faction:" not in prefix
+
+    usa = get_dynamic_state_prompt('usa', state, "", 90)
+    china = get_dynamic_state_prompt('china', state, "", 85, ["SYSTEM DIRECTIVE: test"])
+    assert "Kazakhstan [KZ]: russia -> usa" in usa
+    assert "Russia [RU]" not in usa  # unchanged countries come from the static baseline
+    assert "Russia [RU]" in prefix
+    assert "Budget: $12" in usa
+    assert "[CHINA]" in china and "SYSTEM DIRECTIVE: test" in china
+    print("SUCCESS: Static prefix is identical across turns and factions.")
+
+
+def test_prompt_budget_trims_lowest_priority_first():
+    print("Testing token-budgeted prompt builder...")
+    from prompt_builder import PromptBuilder, drop_oldest_message, estimate_tokens
+
+    history = [{"role": "user", "content": f"message number {i} " * 20} for i in range(10)]
+    builder = PromptBuilder(budget=0)
+    builder.add("static", "rules " * 100, required=True)
+    builder.add("history", history, priority=20, reducers=[drop_oldest_message])
+    builder.add("military", "troops " * 300, priority=30, reducers=[lambda _: "totals"])
+
+    # Budget just below the full size: only the oldest history messages go
+    full = builder.total_tokens()
+    builder.budget = full - 50
+    builder.fit()
+    assert builder.total_tokens() <= builder.budget
+    assert builder.get("military") == "troops " * 300
+    assert 0 < len(builder.get("history")) < 10
+    assert builder.get("history")[-1] == history[-1]
+
+    # Tight budget: history dropped, military reduced, static untouched
+    builder.budget = estimate_tokens("rules " * 100) + 5
+    builder.fit()
+    assert builder.get("history") == []
+    assert builder.get("military") == "totals"
+    assert builder.get("static") == "rules " * 100
+    assert builder.report()["trimmed"] == ["history", "military"]
+    print("SUCCESS: Sections trimmed in priority order.")
+
+
+def test_ownership_delta_is_never_dropped():
+    print("Testing that the territory changes survive trimming...")
+    from prompt_builder import PromptBuilder, drop_oldest_message
+    from prompts import get_ownership_changes_string, get_ownership_changes_compact_string
+
+    state = {"ownership": {"KZ": "usa", "UA": "russia", "TW": "china"}}
+    history = [{"role": "assistant", "content": "| Country | Troops |\n" * 40} for _ in range(6)]
+    builder = PromptBuilder(budget=0)
+    builder.add("static", "rules " * 100, required=True)
+    builder.add("ownership", get_ownership_changes_string(state), priority=10, droppable=False,
+                reducers=[lambda _: get_ownership_changes_compact_string(state)])
+    builder.add("history", history, priority=20, reducers=[drop_oldest_message])
+    builder.add("summary", "STORY SO FAR: " + "events " * 50, priority=25)
+    builder.fit()
+
+    # Reduced to the compact form, then the lower-value sections went instead
+    assert builder.get("ownership") == get_ownership_changes_compact_string(state)
+    assert "KZ:usa" in builder.get("ownership") and "TW:china" in builder.get("ownership")
+    assert builder.get("history") == [] and builder.get("summary") == ""
+    print("SUCCESS: Territory changes kept in compact form.")
+
+
+def test_fragments_rerendered_only_when_section_changes():
+    print("Testing versioned prompt fragment cache...")
+    from prompt_builder import FragmentCache
+    gs = make_state()
+    gs.state = gs.initialize_default_state()
+    cache = FragmentCache()
+    renders = []
+
+    def military_fragment():
+        key = ("g", "military", gs.get_section_version("military", "ownership"))
+        return cache.get(key, lambda: renders.append(1) or gs.get_military_table_string())
+
+    metrics.reset()
+    first = military_fragment()
+    assert military_fragment() is first
+    gs.set_value('defcon', 2)            # Other section: still cached
+    assert military_fragment() is first
+    gs.update_territory({'KZ': 'usa'})   # Ownership regroups the table
+    military_fragment()
+    gs.update_military({'US': {'troops': -1}})
+    military_fragment()
+    assert len(renders) == 3
+    counters = metrics.snapshot()["counters"]
+    assert counters["prompt_fragment_hits"] == 2 and counters["prompt_fragment_misses"] == 3
+    print("SUCCESS: Fragments cached per section version.")
+
+
+if __name__ == "__main__":
+    test_static_prefix_is_stable()
+    test_prompt_budget_trims_lowest_priority_first()
+    test_ownership_delta_is_never_dropped()
+    test_fragments_rerendered_only_when_section_changes()
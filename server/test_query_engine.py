@@ -0,0 +1,69 @@
+from fixtures import make_state
+from query_engine import match_query, answer_query
+
+
+def test_match_query():
+    print("Testing data query recognition...")
+    assert match_query("What are my forces?", "usa") == {"kind": "forces", "factions": ["usa"], "countries": []}
+    assert match_query("Show territories owned by China", "usa")["factions"] == ["china"]
+    assert match_query("resources", "eu")["kind"] == "resources"
+    assert match_query("How strong is Russia?", "usa")["factions"] == ["russia"]
+    assert match_query("troops in Kazakhstan", "usa")["countries"] == ["KZ"]
+    # The phrases from the request, and lookups without an opener
+    assert match_query("my forces", "usa") == {"kind": "forces", "factions": ["usa"], "countries": []}
+    assert match_query("territories owned by China", "usa") == {"kind": "territories", "factions": ["china"], "countries": []}
+    assert match_query("troops owned by Iran", "usa") == {"kind": "forces", "factions": [], "countries": ["IR"]}
+    assert match_query("What does China control?", "usa")["kind"] == "territories"
+    # Orders and open questions go to the model
+    for text in ["Move my forces to Poland", "Invade Kazakhstan", "What should I do about Iran?",
+                 "Tell me about the EU", "Status report",
+                 # Not lookups, though they name a topic
+                 "Which countries border Russia?", "What countries does China want?",
+                 "Which countries are most dangerous?", "Our troops need rest",
+                 "What military options do I have?"]:
+        assert match_query(text, "usa") is None, text
+    print("SUCCESS: Queries recognized, orders left to the LLM.")
+
+
+def test_own_forces_exact():
+    print("Testing own forces table...")
+    gs = make_state()
+    gs.update_territory({'KZ': 'usa'})
+    answer = answer_query("What are my forces?", "usa", gs, "g1")
+    us = gs.state['military']['US']
+    assert f"| United States | {us['troops']:,} | {us['navy']:,} | {us['airforce']:,} |" in answer
+    # Conquered territories are included
+    assert "| Kazakhstan |" in answer
+    assert "~" not in answer
+    total = gs.get_faction_totals('usa')['troops']
+    assert f"**{total:,}**" in answer
+    print("SUCCESS: Own forces are exact and complete.")
+
+
+def test_foreign_forces_noise():
+    print("Testing intel noise on foreign forces...")
+    gs = make_state()
+    gs.state['intel_network']['usa'] = 10
+    first = answer_query("What are Russia's forces?", "usa", gs, "g1")
+    assert "~" in first and "rumors" in first
+    # Same game and turn: same estimates
+    assert answer_query("What are Russia's forces?", "usa", gs, "g1") == first
+    gs.set_value('turn_count', gs.state['turn_count'] + 1)
+    assert answer_query("What are Russia's forces?", "usa", gs, "g1") != first
+    print("SUCCESS: Foreign figures are noisy, stable within a turn.")
+
+
+def test_resources():
+    print("Testing resources table...")
+    gs = make_state()
+    answer = answer_query("What is our budget?", "usa", gs, "g1")
+    assert f"| Budget | ${gs.state['resources']:,} |" in answer
+    assert "| DEFCON | 5 |" in answer
+    print("SUCCESS: Resources rendered from state.")
+
+
+if __name__ == "__main__":
+    test_match_query()
+    test_own_forces_exact()
+    test_foreign_forces_noise()
+    test_resources()
@@ -0,0 +1,76 @@
+import time
+
+import metrics
+from fixtures import make_state
+from response_cache import ResponseCache, is_non_mutating, normalize_input
+
+
+def test_keys():
+    print("Testing response cache keys...")
+    assert normalize_input("  What is   our DEFCON? ") == "what is our defcon"
+
+    a = ResponseCache.make_key("g1", 7, "usa", "m", "What is our DEFCON?")
+    b = ResponseCache.make_key("g1", 7, "usa", "m", "what is our defcon")
+    assert a == b
+    assert a != ResponseCache.make_key("g1", 8, "usa", "m", "what is our defcon")
+    assert a != ResponseCache.make_key("g2", 7, "usa", "m", "what is our defcon")
+    print("SUCCESS: Normalized keys.")
+
+
+def test_lru_and_ttl():
+    print("Testing response cache eviction...")
+    metrics.reset()
+    cache = ResponseCache(max_entries=2, ttl=600)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # Evicts "b", the least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert metrics.snapshot()["counters"]["response_cache_hits"] == 3
+
+    cache = ResponseCache(ttl=0.01)
+    cache.put("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    print("SUCCESS: LRU bound and TTL expiry.")
+
+
+def test_world_version():
+    print("Testing world version...")
+    gs = make_state(durability="turn")
+    v = gs.world_version
+
+    # Turn bookkeeping and no-op updates leave the world version alone
+    gs.set_value('turn_count', gs.state['turn_count'] + 1)
+    gs.set_value('defcon', gs.state['defcon'])
+    gs.apply_delta('resources', 0)
+    gs.end_turn()
+    assert gs.world_version == v
+
+    gs.update_military({'US': {'troops': -10}})
+    assert gs.world_version != v
+    v = gs.world_version
+    gs.set_value('defcon', gs.state['defcon'] - 1)
+    assert gs.world_version != v
+    print("SUCCESS: Only real world changes bump the world version.")
+
+
+def test_non_mutating():
+    print("Testing non-mutating detection...")
+    state = {'defcon': 5, 'year': 2027}
+    quiet = {"narrative": "All calm.", "resource_updates": {"budget": 0}, "general_stats": {"defcon": 5},
+             "event": {"triggered": False}}
+    assert is_non_mutating(quiet, {}, state)
+    assert not is_non_mutating({**quiet, "general_stats": {"defcon": 4}}, {}, state)
+    assert not is_non_mutating({**quiet, "military_updates": {"US": {"troops": -5}}}, {}, state)
+    assert not is_non_mutating({**quiet, "resource_updates": {"oil": 3}}, {}, state)
+    assert not is_non_mutating(quiet, {"budget": 900}, state)
+    print("SUCCESS: Only answers that change nothing are cacheable.")
+
+
+if __name__ == "__main__":
+    test_keys()
+    test_lru_and_ttl()
+    test_world_version()
+    test_non_mutating()
@@ -0,0 +1,36 @@
+import tempfile
+
+from sessions import SessionManager
+
+
+def test_lru_eviction_flushes_to_disk():
+    print("Testing game session LRU...")
+    manager = SessionManager(games_dir=tempfile.mkdtemp(), max_sessions=2, idle_timeout=0)
+    a = manager.get("game-a")
+    a.state.update_territory({'KZ': 'china'})
+    a.history.add_exchange("Invade Kazakhstan", "Kazakhstan falls.")
+    manager.get("game-b")
+    manager.get("game-c")
+    # game-a was least recently used: unloaded, with its changes on disk
+    assert list(manager.sessions) == ["game-b", "game-c"]
+    reloaded = manager.get("game-a")
+    assert reloaded is not a
+    assert reloaded.state.state['ownership']['KZ'] == 'china'
+    assert reloaded.history.recent[-1]["content"] == "Kazakhstan falls."
+    # Games are independent
+    assert manager.get("game-c").state.state['ownership']['KZ'] != 'china'
+
+    # Sessions serving a request are never evicted
+    with manager.use("game-b"):
+        assert manager.evict_idle() == 1
+        assert "game-b" in manager.sessions
+    try:
+        manager.get("../etc")
+        assert False, "path traversal accepted"
+    except ValueError:
+        pass
+    print("SUCCESS: Sessions bounded and persisted on eviction.")
+
+
+if __name__ == "__main__":
+    test_lru_eviction_flushes_to_disk()
@@ -0,0 +1,92 @@
+import asyncio
+
+import metrics
+import storage
+from fixtures import temp_path
+from game_state import GameState
+from history_store import HistoryStore
+from prompts import INITIAL_WORLD_STATE
+from storage import SQLiteStorage
+
+
+def make_worker(db_path, game_id="g1"):
+    """A GameState as a separate uvicorn worker would hold it"""
+    # Each worker process opens its own connection
+    storage._connections.pop(db_path, None)
+    return GameState(storage=SQLiteStorage(game_id, db_path=db_path))
+
+
+def make_history(worker):
+    return HistoryStore(temp_path("history.json"), keep_recent=2, storage=worker.storage)
+
+
+def test_sqlite_shared_between_workers():
+    print("Testing SQLite storage shared by two workers...")
+    db_path = temp_path("state.db")
+    a = make_worker(db_path)
+    b = make_worker(db_path)
+    assert a.state == b.state
+    assert a.version == b.version
+
+    metrics.reset()
+    with a.transaction():
+        a.update_military({'US': {'troops': -1000}})
+        a.update_territory({'KZ': 'china'})
+        a.apply_delta('resources', -50)
+    # Row-level update: only the changed rows are written
+    assert metrics.snapshot()["series"]["state_rows_written"]["last"] == 3
+
+    assert b.refresh() is True
+    assert b.state == a.state
+    assert b.version == a.version
+    assert b.refresh() is False
+
+    # A write based on an outdated version is rejected and the newer state kept
+    with a.transaction():
+        a.set_value('defcon', 2)
+    b.set_value('defcon', 4)
+    b.flush()
+    assert metrics.snapshot()["counters"]["state_conflicts"] == 1
+    assert b.state['defcon'] == 2
+
+    # Other games in the same database are untouched
+    other = make_worker(db_path, "g2")
+    assert other.state['ownership']['KZ'] == INITIAL_WORLD_STATE['KZ']
+    a.reset()
+    assert b.refresh() and b.state['ownership']['KZ'] == a.state['ownership']['KZ']
+    assert a.storage.conn is not b.storage.conn
+    print("SUCCESS: Workers share state through SQLite with version checks.")
+
+
+def test_history_shared_between_workers():
+    print("Testing conversation history shared by two workers...")
+    db_path = temp_path("state.db")
+    a, b = make_worker(db_path), make_worker(db_path)
+    history_a, history_b = make_history(a), make_history(b)
+
+    history_a.add_exchange("Invade Kazakhstan", "Kazakhstan falls.")
+    # Each exchange starts from the other worker's latest history
+    history_b.add_exchange("Fortify it", "Bunkers are built.")
+    assert history_a.refresh() is True
+    assert [m["content"] for m in history_a.pending] == ["Invade Kazakhstan", "Kazakhstan falls."]
+    assert history_a.recent == history_b.recent
+    assert history_a.refresh() is False
+
+    # A summary started before another worker's reset is dropped
+    async def summarize(messages):
+        history_b.reset(opening="A new crisis begins.")
+        return "Kazakhstan was taken."
+    asyncio.run(history_a.update_summary(summarize))
+    assert history_a.summary == "" and history_a.pending == []
+    assert history_a.recent == [{"role": "assistant", "content": "A new crisis begins."}]
+
+    # The state reset keeps the history's version counting up
+    a.reset()
+    history_a.add_exchange("Status?", "Calm.")
+    assert history_b.refresh() and history_b.recent[-1]["content"] == "Calm."
+    print("SUCCESS: Exchanges and resets reach every worker.")
+
+
+if __name__ == "__main__":
+    test_sqlite_shared_between_workers()
+    test_history_shared_between_workers()
@@ -0,0 +1,57 @@
+from stream_parser import StreamingJSONParser, parse_partial, FIELD_CHUNK, FIELD_COMPLETE, DOCUMENT_COMPLETE
+import json
+
+SAMPLE = {
+    "narrative": "Forces cross the border.\nCasualties are \"heavy\" — café burns \U0001F525.",
+    "resource_updates": {"budget": -100, "oil": -20, "tech": 0, "influence": 2},
+    "event": {"type": "player_response", "triggered": False},
+    "territory_updates": {"KZ": "usa"},
+    "military_updates": {"KZ": {"troops": -50000}, "US": {"troops": -15000, "navy": [1, 2]}},
+    "turn": 3,
+    "ok": True
+}
+
+
+def feed_in_chunks(text, size):
+    parser = StreamingJSONParser()
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(parser.feed(text[i:i + size]))
+    return parser, events
+
+
+def test_stream_parser_chunk_sizes():
+    print("Testing incremental parser with various chunk sizes...")
+    for encoded in (json.dumps(SAMPLE), json.dumps(SAMPLE, indent=4, ensure_ascii=False)):
+        for size in (1, 2, 3, 7, 64, len(encoded)):
+            parser, events = feed_in_chunks(encoded, size)
+            assert parser.complete
+            assert parser.result() == SAMPLE
+
+            narrative = "".join(e["text"] for e in events if e["type"] == FIELD_CHUNK and e["field"] == "narrative")
+            assert narrative == SAMPLE["narrative"]
+
+            completed = [e["field"] for e in events if e["type"] == FIELD_COMPLETE]
+            assert completed == list(SAMPLE.keys())
+            assert events[-1]["type"] == DOCUMENT_COMPLETE
+    print("SUCCESS: All chunk sizes produce identical results.")
+
+
+def test_stream_parser_truncated():
+    print("Testing salvage of a truncated response...")
+    encoded = json.dumps(SAMPLE)
+    cut = encoded.index('"military_updates"') + 30
+    recovered = parse_partial(encoded[:cut])
+    assert recovered["narrative"] == SAMPLE["narrative"]
+    assert recovered["territory_updates"] == {"KZ": "usa"}
+    assert "military_updates" not in recovered
+
+    # Cut inside the narrative: partial text comes back with an ellipsis
+    recovered = parse_partial('{"narrative": "Your forces adv')
+    assert recovered == {"narrative": "Your forces adv..."}
+    print("SUCCESS: Completed fields survive truncation.")
+
+
+if __name__ == "__main__":
+    test_stream_parser_chunk_sizes()
+    test_stream_parser_truncated()
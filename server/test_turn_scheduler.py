@@ -0,0 +1,45 @@
+import asyncio
+
+import metrics
+from turn_scheduler import StateWriter
+
+
+def test_state_writer_serializes_application():
+    print("Testing per-game state writer...")
+    metrics.reset()
+    applied = []
+
+    async def apply(name):
+        # Yields mid-application: another turn must not interleave
+        applied.append(f"{name}:start")
+        await asyncio.sleep(0.01)
+        applied.append(f"{name}:end")
+        return name
+
+    def fail():
+        raise RuntimeError("bad turn")
+
+    async def main():
+        writer = StateWriter("test")
+        results = await asyncio.gather(
+            writer.submit(apply, "t1"),
+            writer.submit(apply, "t2"),
+            writer.submit(fail),
+            writer.submit(lambda: "sync"),
+            return_exceptions=True
+        )
+        assert writer._worker is None
+        return results
+
+    results = asyncio.run(main())
+    assert results[:2] == ["t1", "t2"] and results[3] == "sync"
+    assert isinstance(results[2], RuntimeError)
+    assert applied == ["t1:start", "t1:end", "t2:start", "t2:end"]
+    series = metrics.snapshot()["series"]
+    assert series["state_queue_depth"]["max"] == 4
+    assert series["state_queue_wait_ms"]["count"] == 4
+    print("SUCCESS: Turns applied one at a time, in order.")
+
+
+if __name__ == "__main__":
+    test_state_writer_serializes_application()
@@ -0,0 +1,166 @@
+import asyncio
+import json
+import os
+
+import httpx
+
+import intent_classifier
+import main
+from fixtures import temp_path
+from llm_client import OllamaClient
+from sessions import SessionManager
+
+DOCUMENT = {
+    "narrative": "Funding flows into the national AI labs. Results are expected within the year.",
+    "resource_updates": {"budget": -100, "tech": -5},
+    "territory_updates": {},
+    "military_updates": {},
+    "event": {"type": "none", "triggered": False},
+}
+
+
+def ollama(stream_body=None, stream_error=None):
+    """Mock Ollama: /api/chat streams stream_body as NDJSON (split in small chunks) or raises stream_error"""
+    def handler(request):
+        payload = json.loads(request.content)
+        if not payload.get("stream"):
+            # Background calls (history summary, event narrative)
+            return httpx.Response(200, json={"message": {"content": "Summary."}, "done": True})
+        if stream_error is not None:
+            raise stream_error("connection refused", request=request)
+        pieces = [stream_body[i:i + 9] for i in range(0, len(stream_body), 9)]
+        lines = [json.dumps({"message": {"content": p}, "done": False}) for p in pieces]
+        lines.append(json.dumps({"message": {"content": ""}, "done": True, "prompt_eval_count": 10}))
+        return httpx.Response(200, text="\n".join(lines) + "\n")
+    return handler
+
+
+def run_turns(handler, texts):
+    """Events ([(name, payload)]) of each streamed turn, played in one game, and the game session"""
+    intent_classifier.INTENT_LOG_FILE = None
+    main.llm_client = OllamaClient("http://ollama.test", transport=httpx.MockTransport(handler))
+    manager = main.sessions = SessionManager(games_dir=os.path.dirname(temp_path()))
+
+    async def collect():
+        turns = []
+        with manager.use("g1") as session:
+            for text in texts:
+                # No random event this turn
+                session.state.set_value("last_event_turn", session.state.state["turn_count"])
+                data = main.PlayerInput(input=text, faction="usa", game_id="g1")
+                events = []
+                async for raw in main.turn_stream_events(data, session):
+                    lines = dict(line.split(": ", 1) for line in raw.strip().split("\n"))
+                    events.append((lines["event"], json.loads(lines["data"])))
+                turns.append(events)
+            return turns, session
+
+    turns, session = asyncio.run(collect())
+    manager.close()
+    return turns, session
+
+
+def run_turn(handler, text="Increase funding for AI research"):
+    """Events one streamed turn emits, and the game session"""
+    turns, session = run_turns(handler, [text])
+    return turns[0], session
+
+
+def test_stream_sequence():
+    print("Testing SSE event sequence...")
+    events, session = run_turn(ollama(json.dumps(DOCUMENT)))
+    names = [name for name, _ in events]
+    # Narrative text first, field previews as subtrees close, one result last
+    assert names[0] == "narrative" and names[-1] == "result" and names.count("result") == 1
+    assert "error" not in names
+    streamed = "".join(payload["text"] for name, payload in events if name == "narrative")
+    assert streamed == DOCUMENT["narrative"]
+    fields = [payload["field"] for name, payload in events if name == "field"]
+    assert fields == ["resource_updates", "territory_updates", "military_updates", "event"]
+    result = events[-1][1]
+    assert result["narrative"].startswith(DOCUMENT["narrative"])
+    assert result["stats"]["budget"] == session.state.state["resources"]
+    assert result["stats"]["turn_count"] == 1
+    print("SUCCESS: narrative -> field -> result.")
+
+
+def test_stream_salvage():
+    print("Testing salvage of a cut-off stream...")
+    text = json.dumps(DOCUMENT)
+    cut = text[:text.index('"event"') + 12]  # dies inside the event object
+    events, _ = run_turn(ollama(cut))
+    assert events[-1][0] == "result"
+    assert events[-1][1]["narrative"].startswith(DOCUMENT["narrative"])
+    print("SUCCESS: Completed fields kept from a truncated document.")
+
+
+def test_stream_errors():
+    print("Testing stream failures...")
+    events, _ = run_turn(ollama(stream_error=httpx.ConnectError))
+    assert [name for name, _ in events] == ["error"]
+    assert "Cannot connect to Ollama" in events[0][1]["detail"]
+
+    events, _ = run_turn(ollama(""))
+    assert [name for name, _ in events] == ["error"]
+    assert "empty response" in events[0][1]["detail"]
+
+    # Not JSON at all: the raw text is returned as the narrative
+    events, _ = run_turn(ollama("The model ignored the format."))
+    assert events[-1][0] == "result"
+    assert events[-1][1]["narrative"] == "The model ignored the format."
+    print("SUCCESS: Errors reported as error events, plain text falls back.")
+
+
+def test_reset_during_turn():
+    print("Testing a reset while a turn is generating...")
+    stream = ollama(json.dumps(DOCUMENT))
+
+    async def handler(request):
+        if json.loads(request.content).get("stream"):
+            # The player starts a new game before the model answers
+            await main.reset_game(main.GameRef(game_id="g1"))
+        return stream(request)
+
+    events, session = run_turn(handler)
+    assert events[-1][0] == "result"
+    state = session.state.state
+    assert state["reset_count"] == 1
+    # Nothing from the old game's turn reaches the new one
+    assert state["turn_count"] == 0 and state["resources"] == 1000
+    assert events[-1][1]["stats"]["turn_count"] == 0
+    assert session.history.is_empty()
+    print("SUCCESS: Turn built before the reset was discarded.")
+
+
+def test_stream_response_cache():
+    print("Testing the response cache on the streaming path...")
+    answer = {"narrative": "Russia is massing troops on its border.", "event": {"type": "none", "triggered": False}}
+    stream = ollama(json.dumps(answer))
+    streamed = []
+
+    def handler(request):
+        if json.loads(request.content).get("stream"):
+            streamed.append(request)
+        return stream(request)
+
+    main.RESPONSE_CACHE = True
+    main.response_cache.clear()
+    try:
+        question = "What is Russia planning next?"
+        (first, second, third), _ = run_turns(handler, [question, question, "Increase funding for AI research"])
+    finally:
+        main.RESPONSE_CACHE = False
+    # Asked twice in an unchanged world: the model only answers once
+    assert [name for name, _ in second] == ["narrative", "result"]
+    assert second[-1][1]["narrative"] == first[-1][1]["narrative"] == answer["narrative"]
+    assert len(streamed) == 2
+    assert main.metrics.snapshot()["counters"]["response_cache_hits"] >= 1
+    print("SUCCESS: Repeated question answered from the cache.")
+
+
+if __name__ == "__main__":
+    test_stream_sequence()
+    test_stream_salvage()
+    test_stream_errors()
+    test_reset_during_turn()
+    test_stream_response_cache()
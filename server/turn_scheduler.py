@@ -0,0 +1,49 @@
+"""
+Per-game single-writer queue for applying turns.
+
+LLM generation for different turns (and different games) runs concurrently;
+only the short state-application step goes through a game's StateWriter, so
+each game's state is modified by one turn at a time, in arrival order.
+Queue depth and wait time are recorded in metrics to show contention.
+"""
+import asyncio
+import inspect
+import time
+
+import metrics
+
+
+class StateWriter:
+    def __init__(self, name=""):
+        self.name = name
+        self.queue = asyncio.Queue()
+        self._worker = None
+
+    @property
+    def depth(self):
+        return self.queue.qsize()
+
+    async def submit(self, fn, *args):
+        """Queue fn(*args) (sync or async) and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((fn, args, future, time.perf_counter()))
+        metrics.record("state_queue_depth", self.queue.qsize())
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+        return await future
+
+    async def _run(self):
+        # Exits when the queue drains, so idle games hold no task
+        while not self.queue.empty():
+            fn, args, future, enqueued = self.queue.get_nowait()
+            metrics.record("state_queue_wait_ms", round((time.perf_counter() - enqueued) * 1000, 2))
+            try:
+                result = fn(*args)
+                if inspect.isawaitable(result):
+                    result = await result
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+        self._worker = None